@@ -80,6 +80,26 @@ async def main():
         except Exception as e:
             print(f"  Erro ao limpar {coll}: {e}")
 
+    # V11.19: Running aggregates (lifetime PnL / win-loss) follow the cleared history
+    print("\nZerando agregados: vault_management/trade_aggregates...")
+    try:
+        await asyncio.to_thread(
+            db.collection("vault_management").document("trade_aggregates").set,
+            {"total_pnl": 0.0, "total_trades": 0, "wins": 0, "losses": 0, "symbols": {}},
+        )
+        print("  Sucesso: agregados zerados.")
+    except Exception as e:
+        print(f"  Erro ao zerar agregados: {e}")
+
+    # V11.18: Local SQLite mirror of trade_history (otherwise analytics keep the deleted trades)
+    print("\nLimpando espelho local: trade_history.db...")
+    try:
+        from services.trade_store import reset_local_store
+        removed = reset_local_store()
+        print(f"  Sucesso: {removed} trades removidos (backfill refeito no próximo start).")
+    except Exception as e:
+        print(f"  Erro ao limpar trade_history.db: {e}")
+
     print("\n" + "=" * 50)
     print("HISTÓRICO LIMPO COM SUCESSO")
     print("=" * 50)
@@ -37,6 +37,62 @@ class Settings(BaseSettings):
     BREAKEVEN_TRIGGER_PERCENT: float = 5.0 # Increased to 5% ROI to avoid premature exits
     WIN_ROI_THRESHOLD: float = 100.0 # V11.0: ROI mínimo para contar como WIN no ciclo 1/10
     
+    # V11.2: Time-based CVD (columnar ring buffers)
+    CVD_DEFAULT_WINDOW: str = "5m" # 1m | 5m | 15m | 1h
+    CVD_BUCKET_MS: int = 1000 # Trades folded per bucket (fixes memory per symbol)
+
+    # V11.5: Shared Price Board (WS-fed, coalesced REST fallback)
+    PRICE_MAX_AGE_SEC: float = 5.0 # Consumers reject prices older than this
+    PRICE_SNAPSHOT_TTL_SEC: float = 1.0 # Min spacing between all-tickers REST snapshots
+
+    # V11.6: Elite universe refresher
+    ELITE_REFRESH_INTERVAL_SEC: int = 900
+
+    # V11.9: Parallel kline fan-out
+    KLINE_BATCH_CONCURRENCY: int = 8
+
+    # V11.13: Event-driven signals (CVD threshold crossings from the WS layer)
+    SIGNAL_EVENT_MODE: bool = True
+    CVD_EVENT_THRESHOLD_USD: float = 50000.0 # cvd_score is 0 up to |CVD| = 50k: nothing at or below can reach score 90
+    CVD_EVENT_HYSTERESIS: float = 0.2 # Re-arm once |CVD| drops 20% under the threshold
+    CVD_EVENT_ESCALATION: float = 1.5 # Re-fire while armed-off if |CVD| grows 50% past the last event
+    SIGNAL_SAFETY_SCAN_SEC: float = 15.0 # Periodic full scan interval in event mode
+
+    # V11.14: Signal priority queue (score + recency, one entry per symbol)
+    SIGNAL_QUEUE_MAXSIZE: int = 20
+    SIGNAL_TTL_SEC: float = 30.0
+
+    # V11.15: Market Radar diff publisher
+    RADAR_INTERVAL_SEC: float = 1.5
+    RADAR_SCORE_STEP: int = 2 # Re-publish a symbol once its radar score moves 2 points ($10k CVD)
+
+    # V11.16: slots_ativos snapshot mirror
+    SLOTS_RESYNC_SEC: float = 60.0 # Safety-net read when no snapshot arrived for this long
+
+    # V11.17: Slot write-behind batcher
+    SLOT_FLUSH_INTERVAL_SEC: float = 1.0
+
+    # V11.18: Local SQLite mirror of trade_history
+    TRADE_STORE_PATH: str = "trade_history.db"
+
+    # V11.19: Running aggregates (full rebuild from history only via /api/system/reconcile)
+    RECONCILE_ON_STARTUP: bool = False
+
+    # V11.21: Tick-driven paper matching (SL/TP fill on the first crossing trade print)
+    PAPER_TICK_MATCHING: bool = True
+
+    # V11.22: Paper write-ahead journal (batched fsync + periodic snapshot compaction)
+    PAPER_JOURNAL_PATH: str = "paper_journal.log"
+    PAPER_JOURNAL_FLUSH_SEC: float = 0.25
+    PAPER_SNAPSHOT_EVERY: int = 500 # Records between snapshots
+    PAPER_SNAPSHOT_SEC: float = 300.0
+
+    # V11.23: Private WS account state (REAL mode; REST only as a consistency check)
+    PRIVATE_WS_ENABLED: bool = True
+    PRIVATE_WS_RESYNC_SEC: float = 300.0
+    PRIVATE_WS_CHECK_SEC: float = 1.0 # Connection poll: reseed from REST after a reconnect
+    POSITION_REAPER_IDLE_SEC: float = 120.0 # Reaper safety pass while the private stream is live
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -140,6 +140,10 @@ async def main():
         doc.reference.delete()
         deleted_trades += 1
     print(f"  ✅ {deleted_trades} trades removidos")
+
+    # V11.19: Running aggregates (bankroll lucro_total_acumulado is served from them)
+    fs.collection("vault_management").document("trade_aggregates").set({"total_pnl": 0.0, "total_trades": 0, "wins": 0, "losses": 0, "symbols": {}})
+    print("  ✅ trade_aggregates zerados")
     
     # ============================================
     # PARTE 2: REALTIME DATABASE
@@ -252,6 +256,11 @@ async def main():
             "history": []
         }, f, indent=2)
     print(f"  ✅ paper_storage.json (balance: ${INITIAL_BALANCE:.2f})")
+
+    # V11.18: Local SQLite mirror of trade_history (backfilled again on the next start)
+    from services.trade_store import reset_local_store
+    removed_local = reset_local_store()
+    print(f"  ✅ trade_history.db ({removed_local} trades removidos)")
     
     # ============================================
     # RESUMO FINAL
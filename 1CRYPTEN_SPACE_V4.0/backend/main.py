@@ -88,6 +88,9 @@ async def lifespan(app: FastAPI):
             
             logger.info("Step 1: Connecting Firebase...")
             await firebase_service.initialize()
+            # V11.18: Local trade store (one-time backfill from trade_history runs in background)
+            trade_store = importlib.import_module("services.trade_store").trade_store
+            asyncio.create_task(trade_store.initialize())
             
             logger.info("Step 2: Syncing Bybit Instruments...")
             symbols = ["BTCUSDT.P", "ETHUSDT.P", "SOLUSDT.P"]
@@ -105,6 +108,8 @@ async def lifespan(app: FastAPI):
                         logger.error(f"Step 2: Symbol Scan or WS Start Error: {e}")
                         await bybit_ws_service.start(symbols)
                 asyncio.create_task(fetch_and_start_ws())
+                # V11.6: Elite universe maintained in background (scans read it from memory)
+                asyncio.create_task(bybit_rest_service.run_elite_refresh_loop())
                 # Skip slot sync on startup - slots must be cleared by Vault button
                 logger.info("Skipping slot sync on startup - waiting for Vault authorization")
             except Exception as e:
@@ -117,6 +122,7 @@ async def lifespan(app: FastAPI):
                 
                 # Start Agent Loops
                 asyncio.create_task(sig_gen.monitor_and_generate())
+                asyncio.create_task(sig_gen.candidate_event_loop()) # V11.13: CVD crossing events
                 asyncio.create_task(sig_gen.track_outcomes())
                 asyncio.create_task(sig_gen.radar_loop())
                 asyncio.create_task(captain.monitor_signals())
@@ -128,8 +134,13 @@ async def lifespan(app: FastAPI):
                 async def initial_sync():
                     try:
                         from services.vault_service import vault_service
+                        from services.trade_aggregates import trade_aggregates
                         logger.info("Step 3.1: Running initial Vault & Banca Synchronization...")
-                        await vault_service.sync_vault_with_history()
+                        # V11.19: Cycle counters and PnL aggregates are maintained per trade;
+                        # the full rebuild from history is on demand (/api/system/reconcile)
+                        await trade_aggregates.load()
+                        if settings.RECONCILE_ON_STARTUP:
+                            await vault_service.sync_vault_with_history()
                         await bankroll_manager.update_banca_status()
                         logger.info("Step 3.1: Initial Sync COMPLETE ✅")
                     except Exception as e:
@@ -141,6 +152,14 @@ async def lifespan(app: FastAPI):
                 if bybit_rest_service.execution_mode == "PAPER":
                     logger.info("Step 4: Paper Execution Engine ACTIVATING...")
                     asyncio.create_task(bybit_rest_service.run_paper_execution_loop())
+                    # V11.22: Paper journal writer (batched fsync + snapshot compaction)
+                    from services.paper_journal import paper_journal
+                    asyncio.create_task(paper_journal.run())
+                else:
+                    # V11.23: Private WS account state (positions/orders/fills/wallet pushed)
+                    from services.bybit_private_ws import bybit_private_ws
+                    asyncio.create_task(bybit_private_ws.start())
+                    asyncio.create_task(bybit_private_ws.run_consistency_loop())
 
                 # Pulse & Bankroll Loops
                 async def pulse_loop():
@@ -150,6 +169,9 @@ async def lifespan(app: FastAPI):
                         await asyncio.sleep(2)
                 asyncio.create_task(pulse_loop())
 
+                # V11.17: Coalesced slot writes (Firestore WriteBatch + RTDB multi-path per tick)
+                asyncio.create_task(firebase_service.slot_write_loop())
+
                 async def bankroll_loop():
                     while True:
                         try: await bankroll_manager.update_banca_status()
@@ -169,6 +191,23 @@ async def lifespan(app: FastAPI):
     
     yield
     logger.info("Shutting down...")
+    # V11.7: Release pooled Bybit connections
+    if bybit_rest_service is not None:
+        await bybit_rest_service.http.close()
+    # V11.16: Stop the slots_ativos snapshot listener | V11.17: Flush pending slot writes
+    from services.firebase_service import firebase_service
+    firebase_service.stop_slots_listener()
+    # V11.20: Stop the current_cycle listener
+    from services.vault_service import vault_service
+    vault_service.stop_cycle_listener()
+    await firebase_service.flush_slot_writes()
+    # V11.23: Close the private stream
+    from services.bybit_private_ws import bybit_private_ws
+    bybit_private_ws.stop()
+    # V11.22: Final paper snapshot (next start replays nothing)
+    if bybit_rest_service is not None and bybit_rest_service.execution_mode == "PAPER":
+        from services.paper_journal import paper_journal
+        await paper_journal.close()
 
 app = FastAPI(
     title=f"1CRYPTEN SPACE {VERSION} API",
@@ -446,6 +485,18 @@ async def get_history(limit: int = 50, last_timestamp: str = None):
         logger.error(f"Error fetching trade history: {e}")
         return []
 
+@app.get("/api/history/symbol-stats")
+async def get_symbol_stats(since: str = None, min_trades: int = 1):
+    """V11.18: Per-symbol trades, win rate and PnL from the local trade store."""
+    from services.trade_store import trade_store
+    try:
+        if not trade_store.ready:
+            return []
+        return await trade_store.symbol_stats(since=since, min_trades=min_trades)
+    except Exception as e:
+        logger.error(f"Error fetching symbol stats: {e}")
+        return []
+
 @app.post("/api/history/report")
 async def get_trade_report(payload: dict):
     """[V5.2.5] Generates a full AI report for a specific trade in PT-BR."""
@@ -776,6 +827,19 @@ async def start_new_cycle():
         logger.error(f"Error starting new cycle: {e}")
         return {"error": str(e)}
 
+@app.post("/api/system/reconcile")
+async def reconcile_aggregates():
+    """V11.19: On-demand rebuild of the running PnL aggregates and vault cycle counters from history."""
+    from services.trade_aggregates import trade_aggregates
+    from services.vault_service import vault_service
+    try:
+        aggregates = await trade_aggregates.reconcile()
+        await vault_service.sync_vault_with_history()
+        return {"status": "success", "aggregates": aggregates}
+    except Exception as e:
+        logger.error(f"Error reconciling aggregates: {e}")
+        return {"error": str(e)}
+
 @app.post("/api/system/cautious-mode")
 async def toggle_cautious_mode(payload: dict):
     """Toggles cautious mode (increased score threshold)."""
@@ -820,6 +884,54 @@ async def get_system_state():
         logger.error(f"Error in system state endpoint: {e}")
         return {"current": "PAUSED", "message": "Erro API", "slots_occupied": 0}
 
+@app.get("/api/system/rest-metrics")
+async def get_rest_metrics():
+    """V11.8: Bybit REST scheduler queue depth, wait times and rate-limit hits."""
+    from services.rest_scheduler import rest_scheduler
+    return rest_scheduler.get_metrics()
+
+@app.get("/api/system/signal-latency")
+async def get_signal_latency():
+    """V11.13: Trade print → queued signal latency for the event-driven signal path."""
+    from services.signal_generator import signal_generator
+    return signal_generator.get_event_metrics()
+
+@app.get("/api/system/radar-metrics")
+async def get_radar_metrics():
+    """V11.15: Market Radar diff publisher (bytes per push, symbols per push)."""
+    from services.radar_publisher import radar_publisher
+    return radar_publisher.get_metrics()
+
+@app.get("/api/system/slot-write-metrics")
+async def get_slot_write_metrics():
+    """V11.17: Slot write-behind batcher (coalescing, round-trips saved)."""
+    from services.firebase_service import firebase_service
+    return firebase_service.get_slot_write_metrics()
+
+@app.get("/api/system/paper-matching")
+async def get_paper_matching_metrics():
+    """V11.21: Tick-driven paper matching engine (armed bands, fills, print → fill latency)."""
+    from services.paper_matching import paper_matching_engine
+    return paper_matching_engine.get_metrics()
+
+@app.get("/api/system/paper-journal")
+async def get_paper_journal_metrics():
+    """V11.22: Paper write-ahead journal (records per fsync, pending, snapshots)."""
+    from services.paper_journal import paper_journal
+    return paper_journal.get_metrics()
+
+@app.get("/api/system/private-ws")
+async def get_private_ws_metrics():
+    """V11.23: Private account stream (live flag, event latency, REST resync drift)."""
+    from services.bybit_private_ws import bybit_private_ws
+    return bybit_private_ws.get_metrics()
+
+@app.get("/api/system/trigger-book")
+async def get_trigger_book_metrics():
+    """V11.25: Smart SL trigger book (armed boundaries, fired vs skipped evaluations)."""
+    from services.trigger_book import trigger_book
+    return trigger_book.get_metrics()
+
 @app.get("/api/version")
 async def get_version():
     """V10.2: Unified version reporting."""
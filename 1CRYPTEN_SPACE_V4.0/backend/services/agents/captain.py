@@ -10,6 +10,8 @@ from services.agents.guardian import guardian_agent
 from services.agents.news_sensor import news_sensor
 from services.bybit_rest import bybit_rest_service
 from services.execution_protocol import execution_protocol
+from services.price_board import price_board
+from services.trigger_book import trigger_book
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -89,7 +91,8 @@ class CaptainAgent:
                 slot_id = await bankroll_manager.can_open_new_slot()
                 if not slot_id:
                     # System is full (active position exists), skip signal processing
-                    await asyncio.sleep(1) # Fast check for slot availability
+                    # V11.16: Wake as soon as the slots mirror reports a change (5s safety timeout)
+                    await firebase_service.wait_slots_change(timeout=5.0)
                     continue
 
                 # 2. Fetch signal from Zero-Latency Queue
@@ -99,13 +102,14 @@ class CaptainAgent:
                 while not hasattr(signal_generator, "signal_queue") or signal_generator.signal_queue is None:
                     await asyncio.sleep(1)
                     
+                # V11.14: Priority queue → best live signal (score, then recency); stale ones already evicted
                 best_signal = await signal_generator.signal_queue.get()
                 
                 # Filter signals: Elite only (Score > 90) and no BTC
                 symbol = best_signal["symbol"]
                 score = best_signal["score"]
                 
-                # Stale Signal Protection: Skip if signal is older than 30s
+                # Stale Signal Protection: Skip if signal is older than 30s (safety net, queue TTL handles it)
                 ts_str = best_signal.get("timestamp", "")
                 if ts_str:
                     try:
@@ -196,7 +200,10 @@ class CaptainAgent:
                 logger.error(f"Captain Loop Error: {e}")
             
             interval = self.overclock_interval if self.overclock_active else self.normal_interval
-            await asyncio.sleep(interval)
+            # V11.16: Idle until a slot changes when nothing is open; otherwise react to changes within the interval
+            if not any(s.get("symbol") for s in firebase_service.slots_cache):
+                interval = 5.0
+            await firebase_service.wait_slots_change(timeout=interval)
 
     async def manage_positions(self):
         """
@@ -210,9 +217,14 @@ class CaptainAgent:
                 self.overclock_active = False
                 return
 
-            # Batch Ticker Update
-            tickers_resp = await bybit_rest_service.get_tickers()
-            price_map = {t["symbol"].replace(".P", "").replace("USDT", "").upper(): float(t.get("lastPrice", 0)) for t in tickers_resp.get("result", {}).get("list", [])}
+            # Batch Ticker Update - V11.5: Shared price board (WS-fed, stale prices dropped)
+            price_map = await price_board.get_prices([s["symbol"] for s in active_slots])
+
+            # V11.25: Trigger book - one bisect per symbol; only crossed positions reach the protocol
+            fired = set()
+            for sym in {s["symbol"] for s in active_slots}:
+                fired |= trigger_book.crossed(sym, price_map.get(sym, 0))
+            trigger_book.prune("captain", {("captain", s["id"]) for s in active_slots})
 
             has_flash_zone = False
             for slot in active_slots:
@@ -224,8 +236,7 @@ class CaptainAgent:
                 slot_type = slot.get("slot_type", "SNIPER")
                 
                 if entry == 0: continue
-                norm_key = symbol.replace(".P", "").replace("USDT", "").upper()
-                last_price = price_map.get(norm_key, 0)
+                last_price = price_map.get(symbol, 0)
                 if last_price == 0: continue
 
                 leverage = getattr(settings, 'LEVERAGE', 50)
@@ -250,15 +261,22 @@ class CaptainAgent:
                     self.last_update_data[slot_id] = {"pnl": pnl_pct, "status": visual_status, "time": time.time()}
 
                 # Logic Branch
+                key = ("captain", slot_id)
                 if slot_type == "SNIPER":
+                    if not trigger_book.should_evaluate(key, slot, fired):
+                        continue
                     should_close, reason, new_sl = await execution_protocol.process_sniper_logic(slot, last_price, pnl_pct)
                 else:
                     should_close, reason, new_sl = await execution_protocol.process_surf_logic(slot, last_price, pnl_pct)
 
                 if should_close:
+                    trigger_book.disarm(key)
                     await self._execute_closure(slot, last_price, pnl_pct, reason)
                 elif new_sl:
                     await self._update_sl(symbol, side, new_sl, slot_id, pnl_pct)
+                    trigger_book.arm_position(key, {**slot, "current_stop": new_sl})
+                elif slot_type == "SNIPER":
+                    trigger_book.arm_position(key, slot)
 
             self.overclock_active = has_flash_zone
         except Exception as e:
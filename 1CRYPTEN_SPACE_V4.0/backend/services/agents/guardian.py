@@ -20,6 +20,8 @@ import time
 from services.bybit_rest import bybit_rest_service
 from services.firebase_service import firebase_service
 from services.execution_protocol import execution_protocol
+from services.price_board import price_board
+from services.trigger_book import trigger_book
 from config import settings
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
@@ -53,7 +55,7 @@ class GuardianAgent:
         self.last_health_check = now
         try:
             start_time = time.time()
-            await asyncio.to_thread(bybit_rest_service.session.get_server_time)
+            await bybit_rest_service.http.get_server_time()
             latency = (time.time() - start_time) * 1000
             
             threshold = 5000 if settings.BYBIT_TESTNET else self.max_latency_ms
@@ -86,21 +88,19 @@ class GuardianAgent:
                 self.overclock_active = False
                 return
 
-            # Batch Ticker Update - V4.9.4.3: Surgical Normalization
+            # Batch Ticker Update - V11.5: Shared price board (WS-fed, stale prices dropped)
             try:
-                tickers_resp = await bybit_rest_service.get_tickers()
-                ticker_list = tickers_resp.get("result", {}).get("list", [])
-                
-                # Normalize ALL keys: remove .P, remove USDT, uppercase
-                price_map = {}
-                for t in ticker_list:
-                    base_sym = t["symbol"].replace(".P", "").replace("USDT", "").upper()
-                    price_map[base_sym] = float(t.get("lastPrice", 0))
-                
+                price_map = await price_board.get_prices([s["symbol"] for s in active_slots])
             except Exception as te:
                 logger.error(f"Guardian batch ticker failure: {te}")
                 return
 
+            # V11.25: Trigger book - SNIPER positions reach the protocol only when a boundary was crossed
+            fired = set()
+            for sym in {s["symbol"] for s in active_slots}:
+                fired |= trigger_book.crossed(sym, price_map.get(sym, 0))
+            trigger_book.prune("guardian", {("guardian", s["id"]) for s in active_slots})
+
             has_flash_zone = False
             
             for slot in active_slots:
@@ -114,12 +114,11 @@ class GuardianAgent:
                 if entry == 0: 
                     continue
                     
-                # Get current price using Normalized Key
-                norm_key = symbol.replace(".P", "").replace("USDT", "").upper()
-                last_price = price_map.get(norm_key, 0)
+                # Get current price (missing = unknown or stale on the board)
+                last_price = price_map.get(symbol, 0)
                 
                 if last_price == 0: 
-                    logger.warning(f"Guardian: Price not found for {symbol} (key: {norm_key})")
+                    logger.warning(f"Guardian: Fresh price not found for {symbol}")
                     continue
 
                 # ROI Sanity Guard: Block impossible jumps (e.g. 40x price move due to naming mismatch)
@@ -134,13 +133,7 @@ class GuardianAgent:
                 side_norm = (side or "").lower()
                 pnl_pct = ((last_price - entry) / entry if side_norm == "buy" else (entry - last_price) / entry) * 100 * leverage
                 
-                # V6.0: ROI Sanity Guard - Cap extreme value and re-verify naming if suspicious
-                if abs(pnl_pct) > 500:
-                    # Double check if we might be using the wrong symbol's price
-                    # Example: PEPE vs 1000PEPE
-                    if "1000" in symbol and "1000" not in norm_key: # Unlikely with current logic but good to have
-                        logger.warning(f"⚠️ Possible naming collision detected for {symbol}. Re-evaluating.")
-                
+                # V6.0: ROI Sanity Guard - Cap extreme value (the board is keyed by the exact symbol, no naming collisions)
                 if pnl_pct > 5000: pnl_pct = 5000
                 if pnl_pct < -5000: pnl_pct = -5000
 
@@ -158,8 +151,16 @@ class GuardianAgent:
                 logger.debug(f"   ROI: {pnl_pct:.2f}% | PnL $: {pnl_usd:.2f} | Target: {execution_protocol.sniper_target_roi}%")
 
                 # V5.0: SNIPER ADAPTIVE SL LOGIC (TP, SL & Trailing)
+                key = ("guardian", slot_id)
                 if slot_type == "SNIPER":
-                    should_close, close_reason, new_stop = await execution_protocol.process_sniper_logic(slot, last_price, pnl_pct)
+                    if trigger_book.should_evaluate(key, slot, fired):
+                        should_close, close_reason, new_stop = await execution_protocol.process_sniper_logic(slot, last_price, pnl_pct)
+                        if should_close:
+                            trigger_book.disarm(key)
+                        else:
+                            trigger_book.arm_position(key, {**slot, "current_stop": new_stop} if new_stop is not None else slot)
+                    else:
+                        should_close, close_reason, new_stop = False, None, None  # Between boundaries: no-op
                 else: # SURF
                     should_close, close_reason, new_stop = await execution_protocol.process_surf_logic(slot, last_price, pnl_pct)
 
@@ -420,6 +421,9 @@ class GuardianAgent:
                 logger.info(f"💓 Guardian Heartbeat | Mode: {mode} | Interval: {interval}s")
                 self.loops_since_log = 0
             
-            await asyncio.sleep(interval)
+            # V11.16: React to slot changes immediately (listener-driven), idle longer when nothing is open
+            if not any(s.get("symbol") for s in firebase_service.slots_cache):
+                interval = 5.0
+            await firebase_service.wait_slots_change(timeout=interval)
 
 guardian_agent = GuardianAgent()
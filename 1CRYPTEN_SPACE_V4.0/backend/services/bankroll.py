@@ -6,7 +6,9 @@ import math
 from typing import Optional, List, Dict, Any, Tuple
 from services.firebase_service import firebase_service
 from services.bybit_rest import bybit_rest_service
+from services.bybit_private_ws import bybit_private_ws
 from services.vault_service import vault_service
+from services.execution_protocol import execution_protocol
 from config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -79,8 +81,9 @@ class BankrollManager:
                 slot_id = slot["id"]
 
                 # V4.2.6: Persistence Shield - Don't even touch if opened in the last 10 seconds
+                # V11.23: Unless the private stream already confirmed the close
                 entry_ts = slot.get("timestamp_last_update") or 0
-                if (time.time() - entry_ts) < 10:
+                if (time.time() - entry_ts) < 10 and norm_symbol not in bybit_private_ws.closed:
                      continue
 
                 if norm_symbol in exchange_map:
@@ -92,15 +95,19 @@ class BankrollManager:
                     
                     unrealised_pnl = float(pos.get("unrealisedPnl", 0))
                     pnl_pct = (unrealised_pnl / real_margin * 100) if real_margin > 0 else 0
+                    avg_price = float(pos.get("avgPrice", 0))
                     
                     await firebase_service.update_slot(slot_id, {
                         "entry_margin": real_margin,
                         "pnl_percent": pnl_pct,
                         "qty": float(pos.get("size", 0)),
-                        "entry_price": float(pos.get("avgPrice", 0)),
+                        "entry_price": avg_price,
                         "liq_price": float(pos.get("liqPrice", 0)),
                         "timestamp_last_update": time.time()
                     })
+                    # V11.24: The ladder was prepared from the pre-fill ticker price; re-key it on the fill
+                    if avg_price > 0 and slot.get("side"):
+                        await execution_protocol.rekey_ladder(symbol, slot["side"], float(slot.get("entry_price", 0) or 0), avg_price)
                     continue
 
                 if bybit_rest_service.execution_mode == "PAPER":
@@ -145,12 +152,17 @@ class BankrollManager:
                         
                         # V5.2.2: Register closed trade before clearing slot
                         try:
-                            # Fetch last closed PnL for this symbol
-                            closed_list = await bybit_rest_service.get_closed_pnl(symbol=symbol, limit=1)
+                            # V11.23: Closing fills from the private stream; REST only when they lack execPnl
+                            stream_close = bybit_private_ws.pop_closed(norm_symbol)
+                            if stream_close and stream_close["pnl"] is not None:
+                                closed_list = [{"closedPnl": stream_close["pnl"], "avgExitPrice": stream_close["exit_price"], "qty": stream_close["qty"]}]
+                            else:
+                                # Fetch last closed PnL for this symbol
+                                closed_list = await bybit_rest_service.get_closed_pnl(symbol=symbol, limit=1)
                             if closed_list:
                                 last_pnl = closed_list[0]
                                 pnl_val = float(last_pnl.get("closedPnl", 0))
-                                exit_price = float(last_pnl.get("avgExitPrice", 0))
+                                exit_price = float(last_pnl.get("avgExitPrice", 0)) or (stream_close or {}).get("exit_price", 0)
                                 qty = float(last_pnl.get("qty", 0))
                                 
                                 trade_data = {
@@ -176,6 +188,7 @@ class BankrollManager:
                             logger.error(f"Sync [REAL]: Error fetching closed PnL for {symbol}: {pnl_err}")
 
                         logger.warning(f"Sync [REAL]: Clearing stale slot {slot_id} for {symbol}")
+                        execution_protocol.discard_ladder(symbol, slot.get("side"), float(slot.get("entry_price", 0) or 0))
                         await firebase_service.update_slot(slot_id, {
                             "symbol": None, "entry_price": 0, "current_stop": 0, "entry_margin": 0,
                             "status_risco": "IDLE", "side": None, "pnl_percent": 0
@@ -206,6 +219,8 @@ class BankrollManager:
                     "liq_price": float(pos.get("liqPrice", 0)),
                     "timestamp_last_update": time.time()
                 })
+                if float(pos.get("avgPrice", 0)) > 0:
+                    await execution_protocol.prepare_ladder(symbol, pos.get("side"), float(pos.get("avgPrice", 0)))
                 # Refresh local list
                 slots = await firebase_service.get_active_slots()
 
@@ -298,10 +313,20 @@ class BankrollManager:
             banca = await firebase_service.get_banca_status()
             if banca:
                 # V5.2.2: Calculate Cumulative Profit from All Trades
-                trades = await firebase_service.get_trade_history(limit=1000)
                 # V6.0: PnL Summation Guard - Filter extreme outliers (e.g. from naming collisions)
                 # Cap individual trade impact on visual total to prevent dashboard breakage
-                total_pnl = sum(t.get("pnl", 0) for t in trades if abs(t.get("pnl", 0)) < 2000)
+                # V11.18: Indexed local query once the trade store holds the full history
+                # V11.19: Running aggregate (updated per trade), no history read at all
+                from services.trade_aggregates import trade_aggregates
+                from services.trade_store import trade_store
+                await trade_aggregates.load() # No-op once loaded
+                if trade_aggregates.loaded:
+                    total_pnl = trade_aggregates.total_pnl
+                elif trade_store.ready:
+                    total_pnl = await trade_store.total_pnl(max_abs=2000)
+                else:
+                    trades = await firebase_service.get_trade_history(limit=1000)
+                    total_pnl = sum(t.get("pnl", 0) for t in trades if abs(t.get("pnl", 0)) < 2000)
                 
                 # [V5.2.5] Fetch cycle-specific data from Vault Service
                 vault_status = await vault_service.get_cycle_status()
@@ -497,6 +522,8 @@ class BankrollManager:
                     "liq_price": 0, # Sync will update this
                     "timestamp_last_update": time.time()
                 })
+                # V11.24: Smart SL ladder worked out once at entry (tick path is pure comparisons)
+                await execution_protocol.prepare_ladder(symbol, side, current_price)
                 await self.update_banca_status()
                 return order
             else:
@@ -529,6 +556,7 @@ class BankrollManager:
                             await bybit_rest_service.close_position(symbol, pos["side"], size)
                 except Exception as e:
                     logger.error(f"Error closing {symbol}: {e}")
+                execution_protocol.discard_ladder(symbol, side, float(slot.get("entry_price", 0) or 0))
                 
                 # Reset Slot in DB
                 await firebase_service.update_slot(slot["id"], {
@@ -544,6 +572,8 @@ class BankrollManager:
         """
         Background loop that runs every 30s to detect closed positions on Bybit
         and finalize their data in Firebase (History + Slot clearing).
+        V11.23: With the private stream live it runs on position open/close events
+        (safety pass every POSITION_REAPER_IDLE_SEC); 30s REST polling otherwise.
         """
         logger.info("Position Reaper loop active.")
         while True:
@@ -552,7 +582,10 @@ class BankrollManager:
                 await self.update_banca_status()
             except Exception as e:
                 logger.error(f"Error in Position Reaper: {e}")
-            await asyncio.sleep(30) # Scan every 30s
+            if bybit_private_ws.live:
+                await bybit_private_ws.wait_account_change(timeout=settings.POSITION_REAPER_IDLE_SEC)
+            else:
+                await asyncio.sleep(30) # Scan every 30s
 
     async def register_sniper_trade(self, trade_data: dict):
         """
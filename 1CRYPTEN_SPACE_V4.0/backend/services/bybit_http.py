@@ -0,0 +1,208 @@
+"""
+V11.7: Native asyncio Bybit V5 REST client
+===========================================
+Drop-in replacement for the pybit HTTP methods used by BybitREST, built on
+httpx.AsyncClient: one pooled keep-alive connection set, HMAC request
+signing, recv_window and a server-time offset applied to every signature.
+No thread pool hops, so order placement never waits behind Firebase calls.
+
+V11.8: Every request is admitted by services.rest_scheduler first and holds
+one of its in-flight slots until the response is read. The pool has
+CRITICAL_CONNECTIONS spare connections that only critical requests can reach.
+
+Responses keep pybit's contract: the decoded JSON dict is returned, and a
+non-zero retCode raises BybitAPIError ("<retMsg> (ErrCode: <retCode>)").
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from services.rest_scheduler import CRITICAL_CONNECTIONS, rest_scheduler
+
+logger = logging.getLogger("BybitHTTP")
+
+# Same casting rules pybit applies before signing POST bodies
+_STRING_PARAMS = {"qty", "price", "triggerPrice", "takeProfit", "stopLoss", "tpLimitPrice", "slLimitPrice", "trailingStop", "activePrice"}
+_INT_PARAMS = {"positionIdx", "triggerDirection"}
+
+
+class BybitAPIError(Exception):
+    """Non-zero retCode from Bybit (message format mirrors pybit's InvalidRequestError)."""
+
+    def __init__(self, ret_code: int, ret_msg: str, response: Optional[dict] = None):
+        self.ret_code = ret_code
+        self.ret_msg = ret_msg
+        self.response = response or {}
+        super().__init__(f"{ret_msg} (ErrCode: {ret_code})")
+
+
+class BybitAsyncHTTP:
+    def __init__(self, testnet: bool = False, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 recv_window: int = 30000, timeout: float = 10.0, max_connections: int = 20):
+        self.base_url = "https://api-testnet.bybit.com" if testnet else "https://api.bybit.com"
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.max_connections = max_connections
+        rest_scheduler.max_in_flight = max_connections
+        self.time_offset = 0  # server_ms - local_ms
+        self.rate_limits: Dict[str, dict] = {}  # {path: {limit, remaining, reset_ms}}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Created lazily so it binds to the running event loop."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections + CRITICAL_CONNECTIONS,
+                    max_keepalive_connections=self.max_connections + CRITICAL_CONNECTIONS,
+                    keepalive_expiry=60.0,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    def _timestamp(self) -> int:
+        return int(time.time() * 1000) + self.time_offset
+
+    async def sync_time(self) -> int:
+        """Measures the server clock offset (half round-trip corrected). Returns offset ms."""
+        local_start = time.time() * 1000
+        resp = await self.get_server_time()
+        local_end = time.time() * 1000
+        result = resp.get("result", {})
+        server_ms = int(result.get("timeNano", 0)) // 1_000_000 or int(result.get("timeSecond", 0)) * 1000
+        if server_ms > 0:
+            self.time_offset = int(server_ms - (local_start + local_end) / 2)
+        return self.time_offset
+
+    def _auth_headers(self, payload: str) -> dict:
+        if not self.api_key or not self.api_secret:
+            raise BybitAPIError(10003, "API key/secret not configured")
+        ts = str(self._timestamp())
+        recv = str(self.recv_window)
+        signature = hmac.new(
+            self.api_secret.encode("utf-8"),
+            f"{ts}{self.api_key}{recv}{payload}".encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        return {
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-SIGN": signature,
+            "X-BAPI-SIGN-TYPE": "2",
+            "X-BAPI-TIMESTAMP": ts,
+            "X-BAPI-RECV-WINDOW": recv,
+        }
+
+    @staticmethod
+    def _cast(params: dict) -> dict:
+        clean = {}
+        for k, v in params.items():
+            if v is None:
+                continue
+            if k in _STRING_PARAMS:
+                v = str(v)
+            elif k in _INT_PARAMS and not isinstance(v, bool):
+                v = int(v)
+            clean[k] = v
+        return clean
+
+    def _record_limits(self, path: str, headers: httpx.Headers):
+        limit = headers.get("X-Bapi-Limit")
+        if limit is None:
+            return
+        try:
+            info = {
+                "limit": int(limit),
+                "remaining": int(headers.get("X-Bapi-Limit-Status", limit)),
+                "reset_ms": int(headers.get("X-Bapi-Limit-Reset-Timestamp", 0)),
+            }
+        except ValueError:
+            return
+        self.rate_limits[path] = info
+        rest_scheduler.observe_limits(path, info["limit"], info["remaining"], info["reset_ms"])
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, auth: bool = False,
+                      priority: Optional[int] = None, critical: bool = False) -> dict:
+        """
+        V11.8: Admitted by the REST scheduler first (priority class, in-flight
+        cap, endpoint + IP token buckets). critical=True bypasses all of them.
+        """
+        params = self._cast(params or {})
+
+        async with rest_scheduler.slot(path, priority, critical):
+            headers = {}
+            if method == "GET":
+                query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+                if auth:
+                    headers = self._auth_headers(query)
+                url = f"{path}?{query}" if query else path
+                response = await self.client.get(url, headers=headers)
+            else:
+                body = json.dumps(params, separators=(",", ":"))
+                if auth:
+                    headers = self._auth_headers(body)
+                response = await self.client.post(path, content=body, headers=headers)
+
+        self._record_limits(path, response.headers)
+        if response.status_code == 403 and not response.content:
+            # Bybit answers IP-level rate limiting with an empty 403
+            rest_scheduler.on_rate_limited()
+            raise BybitAPIError(10006, "Too many visits (HTTP 403)")
+        response.raise_for_status()
+
+        data = response.json()
+        ret_code = data.get("retCode", 0)
+        if ret_code != 0:
+            if ret_code == 10006:
+                rest_scheduler.on_rate_limited(path, self.rate_limits.get(path, {}).get("reset_ms", 0))
+            raise BybitAPIError(ret_code, data.get("retMsg", ""), data)
+        return data
+
+    # ---------- Market (public) ----------
+
+    async def get_server_time(self) -> dict:
+        return await self.request("GET", "/v5/market/time")
+
+    async def get_instruments_info(self, **params) -> dict:
+        return await self.request("GET", "/v5/market/instruments-info", params)
+
+    async def get_tickers(self, **params) -> dict:
+        return await self.request("GET", "/v5/market/tickers", params)
+
+    async def get_kline(self, **params) -> dict:
+        return await self.request("GET", "/v5/market/kline", params)
+
+    async def get_mark_price_kline(self, **params) -> dict:
+        return await self.request("GET", "/v5/market/mark-price-kline", params)
+
+    # ---------- Account / Position / Trade (signed) ----------
+
+    async def get_wallet_balance(self, **params) -> dict:
+        return await self.request("GET", "/v5/account/wallet-balance", params, auth=True)
+
+    async def get_positions(self, **params) -> dict:
+        return await self.request("GET", "/v5/position/list", params, auth=True)
+
+    async def get_closed_pnl(self, **params) -> dict:
+        return await self.request("GET", "/v5/position/closed-pnl", params, auth=True)
+
+    async def place_order(self, critical: bool = False, **params) -> dict:
+        return await self.request("POST", "/v5/order/create", params, auth=True, critical=critical)
+
+    async def set_trading_stop(self, **params) -> dict:
+        return await self.request("POST", "/v5/position/trading-stop", params, auth=True)
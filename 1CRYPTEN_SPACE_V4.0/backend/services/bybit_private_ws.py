@@ -0,0 +1,346 @@
+"""
+V11.23: Bybit Private WebSocket (position / order / execution / wallet)
+========================================================================
+REAL mode account state pushed by the exchange instead of polled:
+
+- positions: {SYMBOL: position} (Bybit schema, same dicts the REST list returns)
+- orders: open orders by orderId (terminal statuses are dropped)
+- executions: recent fills; closing fills (closedSize > 0) are kept per
+  symbol until the close is finalized
+- wallet: {accountType: account}
+
+When a position goes flat, a close record is kept for pop_closed(). Waiters
+on wait_account_change() are woken, so the bankroll reconciles within
+milliseconds. get_active_positions / get_wallet_balance read from memory
+while the stream is live. A low-frequency REST resync
+(PRIVATE_WS_RESYNC_SEC) is the consistency check. While the stream is down,
+every caller falls back to REST.
+
+Reconnects: events sent while the socket was down are lost, so a
+disconnect clears `seeded` and the fee/fill tracking. The consistency loop
+polls the connection (PRIVATE_WS_CHECK_SEC) and runs a REST reseed once the
+socket is back; reads stay on REST until it succeeds.
+
+Realized PnL matches REST closedPnl: execPnl of the closing fills minus
+their fees minus the fees paid opening the position. Positions whose
+opening fills the stream did not see (open before the seed or across a
+gap) report pnl=None, and the caller asks get_closed_pnl.
+
+pybit callbacks run on the WS thread; all state is mutated on the event loop
+(call_soon_threadsafe), like the slots mirror.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from pybit.unified_trading import WebSocket
+
+from config import settings
+
+logger = logging.getLogger("BybitPrivateWS")
+
+_TERMINAL_ORDER_STATUS = {"Filled", "Cancelled", "Rejected", "Deactivated", "PartiallyFilledCanceled"}
+
+
+class BybitPrivateWS:
+    def __init__(self):
+        self.ws = None
+        self.loop = None
+        self.seeded = False
+        self.positions: Dict[str, dict] = {}
+        self.orders: Dict[str, dict] = {}
+        self.executions = deque(maxlen=500)
+        self.wallet: Dict[str, dict] = {}
+        self.closed: Dict[str, dict] = {}          # {SYMBOL: {"ts", "position", "open_fee"}} awaiting finalization
+        self._close_fills: Dict[str, List[dict]] = {}
+        self._open_fees: Dict[str, float] = {}     # {SYMBOL: execFee paid opening the current position}
+        self._untracked: Set[str] = set()          # Open at the last (re)seed: opening fees unknown
+        self._change_event = asyncio.Event()
+        self.event_latencies = deque(maxlen=200)   # Exchange updatedTime/execTime → applied (ms)
+        self.last_event_at = 0.0
+        self.last_resync_at = 0.0
+        self.stats = {"position_events": 0, "order_events": 0, "execution_events": 0, "wallet_events": 0,
+                      "closes_detected": 0, "resyncs": 0, "resync_drift": 0, "disconnects": 0}
+
+    # ---------- Lifecycle ----------
+
+    @property
+    def live(self) -> bool:
+        """Connected and seeded: account reads can skip REST."""
+        if self.ws is None or not self.seeded:
+            return False
+        if not self._connected():
+            self._on_disconnect()
+            return False
+        return True
+
+    def _connected(self) -> bool:
+        try:
+            return self.ws is not None and bool(self.ws.is_connected())
+        except Exception:
+            return False
+
+    def _on_disconnect(self):
+        """Events may be lost until pybit reconnects: serve REST until the reseed."""
+        if not self.seeded:
+            return
+        self.seeded = False
+        self._open_fees.clear()
+        self._close_fills.clear()
+        self.stats["disconnects"] += 1
+        logger.warning("🔐 [PRIVATE WS] Stream disconnected. Falling back to REST until reseeded.")
+        self._notify_change()  # Waiters switch to REST polling
+
+    async def start(self):
+        """Subscribes to the private topics and seeds the state from REST once."""
+        if not settings.PRIVATE_WS_ENABLED or not settings.BYBIT_API_KEY or not settings.BYBIT_API_SECRET:
+            logger.info("🔐 Private WS disabled (no API keys or PRIVATE_WS_ENABLED=False). REST polling stays in charge.")
+            return
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.ws = await asyncio.to_thread(
+                WebSocket,
+                testnet=settings.BYBIT_TESTNET,
+                channel_type="private",
+                api_key=settings.BYBIT_API_KEY.strip(),
+                api_secret=settings.BYBIT_API_SECRET.strip(),
+            )
+            self.ws.position_stream(callback=self._on_position)
+            self.ws.order_stream(callback=self._on_order)
+            self.ws.execution_stream(callback=self._on_execution)
+            self.ws.wallet_stream(callback=self._on_wallet)
+            logger.info("🔐 V11.23: Private WS subscribed (position, order, execution, wallet).")
+        except Exception as e:
+            logger.error(f"Error starting private WS: {e}")
+            self.ws = None
+            return
+        await self.resync()
+
+    def stop(self):
+        if self.ws:
+            self.ws.exit()
+            self.ws = None
+            logger.info("Bybit private WebSocket stopped.")
+
+    # ---------- WS thread → loop ----------
+
+    def _handoff(self, handler, message: dict):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(handler, message.get("data") or [], time.time() * 1000)
+
+    def _on_position(self, message):
+        self._handoff(self._apply_positions, message)
+
+    def _on_order(self, message):
+        self._handoff(self._apply_orders, message)
+
+    def _on_execution(self, message):
+        self._handoff(self._apply_executions, message)
+
+    def _on_wallet(self, message):
+        self._handoff(self._apply_wallet, message)
+
+    # ---------- State (event loop) ----------
+
+    def _track_latency(self, exchange_ts, receive_ts: float):
+        try:
+            self.event_latencies.append(max(0.0, receive_ts - float(exchange_ts)))
+        except (TypeError, ValueError):
+            pass
+        self.last_event_at = time.time()
+
+    def _apply_positions(self, data: list, receive_ts: float):
+        changed = False
+        for p in data:
+            if p.get("category", "linear") != "linear" or not p.get("symbol"):
+                continue
+            symbol = p["symbol"].upper()
+            self.stats["position_events"] += 1
+            self._track_latency(p.get("updatedTime"), receive_ts)
+            if float(p.get("size") or 0) > 0:
+                prev = self.positions.get(symbol)
+                self.positions[symbol] = p
+                # Mark-price/PnL refreshes are not structural: only open/resize/flip wake the reaper
+                if prev is None or prev.get("size") != p.get("size") or prev.get("side") != p.get("side"):
+                    self.closed.pop(symbol, None)
+                    changed = True
+            else:
+                prev = self.positions.pop(symbol, None)
+                if prev is not None:
+                    self._mark_closed(symbol, prev)
+                    changed = True
+        if changed:
+            self._notify_change()
+
+    def _mark_closed(self, symbol: str, prev: dict):
+        # Opening fees belong to this position; a reopen starts from zero
+        open_fee = None if symbol in self._untracked else self._open_fees.get(symbol)
+        self._open_fees.pop(symbol, None)
+        self._untracked.discard(symbol)
+        self.closed[symbol] = {"ts": time.time(), "position": prev, "open_fee": open_fee}
+        self.stats["closes_detected"] += 1
+        logger.info(f"🔐 [PRIVATE WS] {symbol} position closed on exchange (stop/TP/manual).")
+
+    def _apply_orders(self, data: list, receive_ts: float):
+        for o in data:
+            if o.get("category", "linear") != "linear" or not o.get("orderId"):
+                continue
+            self.stats["order_events"] += 1
+            self._track_latency(o.get("updatedTime"), receive_ts)
+            if o.get("orderStatus") in _TERMINAL_ORDER_STATUS:
+                self.orders.pop(o["orderId"], None)
+            else:
+                self.orders[o["orderId"]] = o
+
+    def _apply_executions(self, data: list, receive_ts: float):
+        for e in data:
+            if e.get("category", "linear") != "linear" or not e.get("symbol"):
+                continue
+            self.stats["execution_events"] += 1
+            self._track_latency(e.get("execTime"), receive_ts)
+            self.executions.append(e)
+            symbol = e["symbol"].upper()
+            closed_size = float(e.get("closedSize") or 0)
+            if closed_size <= 0:
+                if symbol not in self._untracked:
+                    self._open_fees[symbol] = self._open_fees.get(symbol, 0.0) + float(e.get("execFee") or 0)
+                continue
+            self._close_fills.setdefault(symbol, []).append(e)
+            if float(e.get("execQty") or 0) > closed_size:
+                # Flip (close + reopen in one fill, no flat event): let REST closed-pnl settle it
+                self._untracked.add(symbol)
+
+    def _apply_wallet(self, data: list, receive_ts: float):
+        for account in data:
+            if account.get("accountType"):
+                self.stats["wallet_events"] += 1
+                self.wallet[account["accountType"]] = account
+        self.last_event_at = time.time()
+
+    def _notify_change(self):
+        # Swap-in a fresh Event so each waiter sees exactly one wake-up per change
+        event, self._change_event = self._change_event, asyncio.Event()
+        event.set()
+
+    async def wait_account_change(self, timeout: float):
+        """Returns when a position opens/closes/resizes, or after timeout."""
+        try:
+            await asyncio.wait_for(self._change_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # ---------- Reads ----------
+
+    def get_positions(self, symbol: Optional[str] = None) -> List[dict]:
+        if symbol:
+            pos = self.positions.get(symbol.replace(".P", "").upper())
+            return [pos] if pos else []
+        return list(self.positions.values())
+
+    def get_equity(self) -> Optional[float]:
+        unified = self.wallet.get("UNIFIED")
+        if unified and unified.get("totalEquity") not in (None, ""):
+            return float(unified["totalEquity"])
+        contract = self.wallet.get("CONTRACT")
+        if contract:
+            usdt = next((c for c in contract.get("coin", []) if c.get("coin") == "USDT"), None)
+            if usdt and usdt.get("equity") not in (None, ""):
+                return float(usdt["equity"])
+        return None
+
+    def pop_closed(self, symbol: str) -> Optional[dict]:
+        """
+        Close record for a position the stream saw go flat: exit price from the
+        closing fills, pnl = execPnl - closing fees - opening fees (same as REST
+        closedPnl). None when a fill lacks execPnl or the opening fees are
+        unknown; the caller then asks get_closed_pnl once.
+        """
+        symbol = symbol.replace(".P", "").upper()
+        record = self.closed.pop(symbol, None)
+        if record is None:
+            return None
+        fills = self._close_fills.pop(symbol, [])
+        qty = sum(float(f.get("execQty") or 0) for f in fills)
+        exit_price = sum(float(f.get("execPrice") or 0) * float(f.get("execQty") or 0) for f in fills) / qty if qty > 0 else 0.0
+        pnl = None
+        if fills and record.get("open_fee") is not None and all("execPnl" in f for f in fills):
+            pnl = sum(float(f.get("execPnl") or 0) - float(f.get("execFee") or 0) for f in fills) - record["open_fee"]
+        return {"symbol": symbol, "exit_price": exit_price, "qty": qty, "pnl": pnl,
+                "position": record["position"], "closed_at": record["ts"]}
+
+    # ---------- Consistency check ----------
+
+    async def resync(self):
+        """REST snapshot of positions + wallet; corrects any drift from missed events."""
+        from services.bybit_rest import bybit_rest_service
+        reseed = not self.seeded
+        try:
+            response = await asyncio.wait_for(
+                bybit_rest_service.http.get_positions(category=settings.BYBIT_CATEGORY, settleCoin="USDT"), timeout=10.0)
+            rest_positions = {
+                p["symbol"].upper(): p for p in response.get("result", {}).get("list", [])
+                if p.get("symbol") and float(p.get("size") or 0) > 0
+            }
+            drift = 0
+            for symbol in list(self.positions.keys() - rest_positions.keys()):
+                self._mark_closed(symbol, self.positions.pop(symbol))
+                drift += 1
+            for symbol, p in rest_positions.items():
+                prev = self.positions.get(symbol)
+                if prev is None or prev.get("size") != p.get("size") or prev.get("side") != p.get("side"):
+                    drift += 1
+                self.positions[symbol] = p
+
+            wallet = await asyncio.wait_for(bybit_rest_service.http.get_wallet_balance(accountType="UNIFIED"), timeout=10.0)
+            account = (wallet.get("result", {}).get("list") or [{}])[0]
+            if account:
+                self.wallet["UNIFIED"] = {**account, "accountType": "UNIFIED"}
+
+            self.stats["resyncs"] += 1
+            self.last_resync_at = time.time()
+            if reseed:
+                # Their opening fills may predate the stream (or fell in the gap)
+                self._untracked = set(rest_positions)
+                self._open_fees.clear()
+                logger.info(f"🔐 [PRIVATE WS] Seeded from REST ({len(rest_positions)} position(s)).")
+            elif drift:
+                self.stats["resync_drift"] += drift
+                logger.warning(f"🔐 [PRIVATE WS] REST resync corrected {drift} position(s).")
+            self.seeded = self._connected()
+            if drift or reseed:
+                self._notify_change()
+        except Exception as e:
+            logger.error(f"Error in private WS resync: {e}")
+
+    async def run_consistency_loop(self):
+        """Polls the connection: reseeds after a reconnect, low-frequency REST check while live."""
+        while True:
+            await asyncio.sleep(settings.PRIVATE_WS_CHECK_SEC)
+            if self.ws is None:
+                continue
+            if not self._connected():
+                self._on_disconnect()
+                continue
+            if not self.seeded or time.time() - self.last_resync_at >= settings.PRIVATE_WS_RESYNC_SEC:
+                await self.resync()
+
+    def get_metrics(self) -> dict:
+        lat = sorted(self.event_latencies)
+        return {
+            **self.stats,
+            "live": self.live,
+            "positions": len(self.positions),
+            "open_orders": len(self.orders),
+            "pending_closes": len(self.closed),
+            "equity": self.get_equity(),
+            "event_latency_p50_ms": round(lat[len(lat) // 2], 1) if lat else 0.0,
+            "event_latency_max_ms": round(lat[-1], 1) if lat else 0.0,
+            "last_event_age_sec": round(time.time() - self.last_event_at, 1) if self.last_event_at else None,
+            "last_resync_age_sec": round(time.time() - self.last_resync_at, 1) if self.last_resync_at else None,
+        }
+
+
+bybit_private_ws = BybitPrivateWS()
@@ -1,10 +1,16 @@
 import asyncio
 import logging
+import random
 import time
 import json
 import os
 from pybit.unified_trading import HTTP
 from config import settings
+from services.price_board import price_board
+from services.bybit_http import BybitAsyncHTTP
+from services.paper_matching import paper_matching_engine
+from services.paper_journal import paper_journal
+from services.trigger_book import trigger_book
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BybitREST")
@@ -15,6 +21,13 @@ class BybitREST:
         self.category = settings.BYBIT_CATEGORY
         self.time_offset = 0
         self.is_initialized = False
+        # V11.7: Native async V5 client (pooled keep-alive, no thread pool hops)
+        self.http = BybitAsyncHTTP(
+            testnet=settings.BYBIT_TESTNET,
+            api_key=settings.BYBIT_API_KEY.strip() if settings.BYBIT_API_KEY else None,
+            api_secret=settings.BYBIT_API_SECRET.strip() if settings.BYBIT_API_SECRET else None,
+            recv_window=30000,
+        )
         
         # Paper Trading State
         self.execution_mode = settings.BYBIT_EXECUTION_MODE # "REAL" or "PAPER"
@@ -23,6 +36,13 @@ class BybitREST:
         self.paper_orders_history = [] 
         self._paper_engine_task = None
         self._instrument_cache = {} # Cache for tickSize and stepSize
+        # V11.6: Elite universe (background refreshed, persisted for warm starts)
+        self.elite_pairs = []
+        self.elite_updated_at = 0.0
+        self._elite_lock = asyncio.Lock()
+        self._elite_loaded_from_disk = False
+        self.ELITE_CACHE_FILE = "elite_pairs_cache.json"
+        self.last_kline_batch_stats = {} # V11.9: Last get_klines_batch timing
         self.last_balance = 0.0 # V5.2.4.6: Cache for non-blocking health checks
         self.PAPER_STORAGE_FILE = "paper_storage.json"
         
@@ -33,35 +53,31 @@ class BybitREST:
         self.redis = redis_service
 
     def _load_paper_state(self):
-        """Loads paper positions and balance from disk."""
+        """Loads paper positions and balance from disk (V11.22: snapshot + journal replay)."""
         if self.execution_mode != "PAPER": return
         try:
-            if os.path.exists(self.PAPER_STORAGE_FILE):
-                with open(self.PAPER_STORAGE_FILE, 'r') as f:
-                    data = json.load(f)
-                    self.paper_positions = data.get("positions", [])
-                    self.paper_balance = data.get("balance", settings.BYBIT_SIMULATED_BALANCE)
-                    self.paper_orders_history = data.get("history", [])
-                logger.info(f"📂 [PAPER] State loaded. Positions: {len(self.paper_positions)} | Balance: ${self.paper_balance:.2f}")
+            paper_journal.attach(self._paper_state, self.PAPER_STORAGE_FILE)
+            existed = os.path.exists(self.PAPER_STORAGE_FILE) or os.path.exists(paper_journal.journal_path)
+            data = paper_journal.replay(settings.BYBIT_SIMULATED_BALANCE)
+            self.paper_positions = data["positions"]
+            self.paper_balance = data["balance"]
+            self.paper_orders_history = data["history"]
+            for pos in self.paper_positions:
+                paper_matching_engine.arm_position(pos)
+            if existed:
+                logger.info(f"📂 [PAPER] State loaded. Positions: {len(self.paper_positions)} | Balance: ${self.paper_balance:.2f} | History: {len(self.paper_orders_history)}")
             else:
                 logger.info("📂 [PAPER] No storage file found. Starting fresh.")
         except Exception as e:
             logger.error(f"❌ [PAPER] Failed to load state: {e}")
 
-    def _save_paper_state(self):
-        """Saves paper positions and balance to disk."""
-        if self.execution_mode != "PAPER": return
-        try:
-            data = {
-                "positions": self.paper_positions,
-                "balance": self.paper_balance,
-                "history": self.paper_orders_history[-50:] # Keep last 50 only
-            }
-            with open(self.PAPER_STORAGE_FILE, 'w') as f:
-                json.dump(data, f, indent=2)
-            # logger.debug("💾 [PAPER] State saved.")
-        except Exception as e:
-            logger.error(f"❌ [PAPER] Failed to save state: {e}")
+    def _paper_state(self) -> dict:
+        """V11.22: Point-in-time copy for the journal snapshot (serialized off the loop)."""
+        return {
+            "positions": [dict(p) for p in self.paper_positions],
+            "balance": self.paper_balance,
+            "history": list(self.paper_orders_history), # Full history (entries are never mutated)
+        }
 
     def normalize_symbol(self, symbol: str) -> str:
         """
@@ -91,37 +107,22 @@ class BybitREST:
 
         logger.info("BybitREST: Initializing session and time sync...")
         
-        # Create a temporary session to fetch server time
-        temp_session = HTTP(testnet=settings.BYBIT_TESTNET)
+        # V11.7: Time sync through the async client (offset applies to every signed request)
         try:
-            local_start = int(time.time() * 1000)
-            server_time_resp = await asyncio.to_thread(temp_session.get_server_time)
-            server_time = int(server_time_resp.get("result", {}).get("timeSecond", 0)) * 1000
-            if server_time == 0: 
-                server_time = int(int(server_time_resp.get("result", {}).get("timeNano", 0)) / 1000000)
+            self.time_offset = await self.http.sync_time()
+            logger.info(f"Bybit Time Sync: Offset detected as {self.time_offset}ms. Applying patch...")
             
-            if server_time > 0:
-                self.time_offset = server_time - local_start
-                logger.info(f"Bybit Time Sync: Offset detected as {self.time_offset}ms. Applying patch...")
-                
-                # Monkeypatch pybit's internal helper to use synced time
-                import pybit._helpers as pybit_helpers
-                _orig_time = time.time
-                def synced_timestamp():
-                    return int((_orig_time() + (self.time_offset / 1000.0)) * 1000)
-                
-                pybit_helpers.generate_timestamp = synced_timestamp
-                logger.info("Bybit Time Patch applied successfully.")
+            # Monkeypatch pybit's internal helper to use synced time (legacy sync session)
+            import pybit._helpers as pybit_helpers
+            _orig_time = time.time
+            def synced_timestamp():
+                return int((_orig_time() + (self.time_offset / 1000.0)) * 1000)
+            
+            pybit_helpers.generate_timestamp = synced_timestamp
+            logger.info("Bybit Time Patch applied successfully.")
         except Exception as e:
             logger.error(f"Failed to sync time with Bybit: {e}")
 
-        # Create the actual session
-        self._session = HTTP(
-            testnet=settings.BYBIT_TESTNET,
-            api_key=settings.BYBIT_API_KEY.strip() if settings.BYBIT_API_KEY else None,
-            api_secret=settings.BYBIT_API_SECRET.strip() if settings.BYBIT_API_SECRET else None,
-            recv_window=30000,
-        )
         self.is_initialized = True
         logger.info("BybitREST: Session initialized.")
         
@@ -132,7 +133,10 @@ class BybitREST:
 
     @property
     def session(self):
-        """Returns the Bybit HTTP session. Ensure initialize() was called before use for best results."""
+        """
+        Returns the legacy (synchronous) pybit session. Ensure initialize() was called before use for best results.
+        V11.7: BybitREST itself goes through self.http (async, pooled); this stays for sync callers.
+        """
         if self._session is None:
             # Fallback for synchronous calls, though initialize() is preferred
             self._session = HTTP(
@@ -146,61 +150,142 @@ class BybitREST:
         """
         🚀 REFINAMENTO ESTRATÉGICO V6.0: Escaneia apenas pares com alavancagem >= 50x.
         Foca nos ~85 pares de elite da Bybit para maximizar precisão e liquidez.
+        V11.6: Served from memory. The universe is maintained by run_elite_refresh_loop
+        and warm-started from disk; only a cold start without cache scans inline.
         """
-        try:
-            # 1. Fetch ALL instruments info with pagination
-            logger.info("BybitREST: Fetching Elite 50x Instruments (Sniper Strategy)...")
+        if self.elite_pairs:
+            return self.elite_pairs
+
+        if not self._elite_loaded_from_disk:
+            await self._load_elite_cache()
+            if self.elite_pairs:
+                return self.elite_pairs
+
+        if await self.refresh_elite_universe():
+            return self.elite_pairs
+        return ["BTCUSDT.P", "ETHUSDT.P", "SOLUSDT.P"]
+
+    async def refresh_elite_universe(self) -> bool:
+        """
+        V11.6: One full elite scan (single-flight). Keeps the last good universe
+        on failure, fills _instrument_cache for every elite symbol and persists
+        the result for the next warm start.
+        """
+        async with self._elite_lock:
+            # Another caller refreshed while we waited for the lock
+            if self.elite_pairs and time.time() - self.elite_updated_at < 5:
+                return True
+            try:
+                symbols, instruments = await self._scan_elite_50x_pairs()
+                if not symbols:
+                    return False
+                self._instrument_cache.update(instruments)
+                self.elite_pairs = symbols
+                self.elite_updated_at = time.time()
+                await asyncio.to_thread(self._save_elite_cache, symbols, instruments, self.elite_updated_at)
+                return True
+            except Exception as e:
+                logger.error(f"Error in Elite 50x scan: {e}")
+                return False
+
+    async def _scan_elite_50x_pairs(self):
+        """Paginates the linear instruments (exactly 50x) and ranks them by 24h turnover."""
+        # 1. Fetch ALL instruments info with pagination
+        logger.info("BybitREST: Fetching Elite 50x Instruments (Sniper Strategy)...")
+        
+        candidates = {}
+        cursor = ""
+        
+        while True:
+            params = {"category": "linear", "limit": 1000}
+            if cursor: params["cursor"] = cursor
             
-            candidates = {}
-            cursor = ""
+            # Fetch in thread to keep loop breathing
+            instr_resp = await self.http.get_instruments_info(**params)
+            instr_list = instr_resp.get("result", {}).get("list", [])
             
-            while True:
-                params = {"category": "linear", "limit": 1000}
-                if cursor: params["cursor"] = cursor
-                
-                # Fetch in thread to keep loop breathing
-                instr_resp = await asyncio.to_thread(self.session.get_instruments_info, **params)
-                instr_list = instr_resp.get("result", {}).get("list", [])
-                
-                for info in instr_list:
-                    symbol = info.get("symbol")
-                    if not symbol or not symbol.endswith("USDT"):
-                        continue
-                    
-                    max_lev = float(info.get("leverageFilter", {}).get("maxLeverage", 0))
-                    if max_lev == 50.0:
-                        candidates[symbol] = info
+            for info in instr_list:
+                symbol = info.get("symbol")
+                if not symbol or not symbol.endswith("USDT"):
+                    continue
                 
-                cursor = instr_resp.get("result", {}).get("nextPageCursor")
-                if not cursor:
-                    break
-            
-            logger.info(f"BybitREST: Identified {len(candidates)} Elite pairs with exactly 50x leverage.")
-            
-            # 3. Sort by Turnover to ensure we track the most liquid targets
-            tickers_resp = self.session.get_tickers(category="linear")
-            ticker_list = tickers_resp.get("result", {}).get("list", [])
-            
-            final_candidates = []
-            for t in ticker_list:
-                sym = t.get("symbol")
-                if sym in candidates:
-                    final_candidates.append({
-                        "symbol": sym,
-                        "turnover": float(t.get("turnover24h", 0))
-                    })
-            
-            # Sort by turnover
-            final_candidates.sort(key=lambda x: x["turnover"], reverse=True)
+                max_lev = float(info.get("leverageFilter", {}).get("maxLeverage", 0))
+                if max_lev == 50.0:
+                    candidates[symbol] = info
             
-            # Return all elite pairs (usually ~85)
-            final_symbols = [f"{x['symbol']}.P" for x in final_candidates]
-            
-            logger.info(f"BybitREST: Elite Scan Successful. Monitoring {len(final_symbols)} high-leverage assets.")
-            return final_symbols
+            cursor = instr_resp.get("result", {}).get("nextPageCursor")
+            if not cursor:
+                break
+        
+        logger.info(f"BybitREST: Identified {len(candidates)} Elite pairs with exactly 50x leverage.")
+        
+        # 3. Sort by Turnover to ensure we track the most liquid targets
+        # V11.6: Off the event loop (was a blocking call inside the scan)
+        ticker_list = await self.get_all_tickers()
+        
+        final_candidates = []
+        for t in ticker_list:
+            sym = t.get("symbol")
+            if sym in candidates:
+                final_candidates.append({
+                    "symbol": sym,
+                    "turnover": float(t.get("turnover24h", 0))
+                })
+        
+        # Sort by turnover
+        final_candidates.sort(key=lambda x: x["turnover"], reverse=True)
+        
+        # Return all elite pairs (usually ~85)
+        final_symbols = [f"{x['symbol']}.P" for x in final_candidates]
+        instruments = {x["symbol"]: candidates[x["symbol"]] for x in final_candidates}
+        
+        logger.info(f"BybitREST: Elite Scan Successful. Monitoring {len(final_symbols)} high-leverage assets.")
+        return final_symbols, instruments
+
+    def _save_elite_cache(self, symbols: list, instruments: dict, updated_at: float):
+        """Persists the last good elite universe (blocking, run via to_thread)."""
+        try:
+            data = {"symbols": symbols, "instruments": instruments, "updated_at": updated_at}
+            tmp_path = self.ELITE_CACHE_FILE + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.ELITE_CACHE_FILE)
         except Exception as e:
-            logger.error(f"Error in Elite 50x scan: {e}")
-            return ["BTCUSDT.P", "ETHUSDT.P", "SOLUSDT.P"]
+            logger.error(f"❌ Failed to persist elite universe: {e}")
+
+    async def _load_elite_cache(self):
+        """Warm start: restores the last persisted universe and instrument filters."""
+        self._elite_loaded_from_disk = True
+        def _read():
+            if not os.path.exists(self.ELITE_CACHE_FILE):
+                return None
+            with open(self.ELITE_CACHE_FILE, 'r') as f:
+                return json.load(f)
+        try:
+            data = await asyncio.to_thread(_read)
+            if not data or not data.get("symbols"):
+                return
+            self.elite_pairs = data["symbols"]
+            self.elite_updated_at = data.get("updated_at", 0)
+            for sym, info in data.get("instruments", {}).items():
+                self._instrument_cache.setdefault(sym, info)
+            age_min = (time.time() - self.elite_updated_at) / 60
+            logger.info(f"📂 Elite universe warm start: {len(self.elite_pairs)} pairs (cached {age_min:.0f} min ago).")
+        except Exception as e:
+            logger.error(f"❌ Failed to load elite universe cache: {e}")
+
+    async def run_elite_refresh_loop(self):
+        """V11.6: Background refresher for the elite universe (ELITE_REFRESH_INTERVAL_SEC)."""
+        if not self._elite_loaded_from_disk:
+            await self._load_elite_cache()
+        logger.info(f"🔄 Elite universe refresher active (every {settings.ELITE_REFRESH_INTERVAL_SEC}s).")
+        while True:
+            try:
+                if time.time() - self.elite_updated_at >= settings.ELITE_REFRESH_INTERVAL_SEC or not self.elite_pairs:
+                    await self.refresh_elite_universe()
+            except Exception as e:
+                logger.error(f"Error in elite refresh loop: {e}")
+            await asyncio.sleep(min(60, settings.ELITE_REFRESH_INTERVAL_SEC))
 
     def get_top_200_usdt_pairs(self):
         """Deprecated: Use get_elite_50x_pairs for Sniper Protocol."""
@@ -218,12 +303,19 @@ class BybitREST:
              # Ideally bankroll manager handles this via slots PNL, but here we return raw wallet balance.
              return self.paper_balance
 
+        # V11.23: Wallet topic equity while the private stream is live
+        from services.bybit_private_ws import bybit_private_ws
+        equity = bybit_private_ws.get_equity() if bybit_private_ws.live else None
+        if equity is not None:
+            self.last_balance = equity
+            return equity
+
         try:
             # Try UNIFIED first
             logger.info("Fetching balance (UNIFIED)...")
             try:
                 # V5.2.4.3: Added 10s timeout
-                response = await asyncio.wait_for(asyncio.to_thread(self.session.get_wallet_balance, accountType="UNIFIED"), timeout=10.0)
+                response = await asyncio.wait_for(self.http.get_wallet_balance(accountType="UNIFIED"), timeout=10.0)
                 result = response.get("result", {}).get("list", [{}])[0]
                 equity = float(result.get("totalEquity", 0))
                 logger.info(f"UNIFIED Equity: {equity}")
@@ -235,7 +327,7 @@ class BybitREST:
             # Try CONTRACT if UNIFIED fails or is 0
             logger.info("Fetching balance (CONTRACT)...")
             # V5.2.4.3: Added 10s timeout
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_wallet_balance, accountType="CONTRACT"), timeout=10.0)
+            response = await asyncio.wait_for(self.http.get_wallet_balance(accountType="CONTRACT"), timeout=10.0)
             result = response.get("result", {}).get("list", [{}])[0]
             coins = result.get("coin", [])
             usdt_coin = next((c for c in coins if c.get("coin") == "USDT"), {})
@@ -255,12 +347,17 @@ class BybitREST:
                 return [p for p in self.paper_positions if p["symbol"].upper() == norm_symbol]
             return self.paper_positions
 
+        # V11.23: Pushed account state (private WS) while the stream is live
+        from services.bybit_private_ws import bybit_private_ws
+        if bybit_private_ws.live:
+            return bybit_private_ws.get_positions(symbol)
+
         try:
             params = {"category": self.category, "settleCoin": "USDT"}
             if symbol: params["symbol"] = symbol
             
             # V5.2.4.3: Added 10s timeout
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_positions, **params), timeout=10.0)
+            response = await asyncio.wait_for(self.http.get_positions(**params), timeout=10.0)
             pos_list = response.get("result", {}).get("list", [])
             # Filter for positions with size > 0
             active = [p for p in pos_list if float(p.get("size", 0)) > 0]
@@ -269,6 +366,14 @@ class BybitREST:
             logger.error(f"Error fetching positions: {e}")
             return []
 
+    async def get_all_tickers(self) -> list:
+        """
+        V11.5: Whole-category ticker list. Only the shared price board calls this
+        (coalesced + TTL), so the heavy request never multiplies per loop.
+        """
+        response = await asyncio.wait_for(self.http.get_tickers(category=self.category), timeout=10.0)
+        return response.get("result", {}).get("list", [])
+
     async def get_tickers(self, symbol: str = None):
         """
         Fetches ticker data with [V6.0] Exact Match Protection.
@@ -295,7 +400,7 @@ class BybitREST:
                 logger.warning("[PERFORMANCE] get_tickers called with None symbol! Fetching global market data (Heavy).")
             
             # V5.2.4.3: Added 5s timeout -> Increased to 10s for stability
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_tickers, **params), timeout=10.0)
+            response = await asyncio.wait_for(self.http.get_tickers(**params), timeout=10.0)
             
             # [V6.0] Robust Mapping verification
             if api_symbol:
@@ -330,7 +435,7 @@ class BybitREST:
                 return self._instrument_cache[api_symbol]
 
             # V5.2.4.3: Added 5s timeout
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_instruments_info, category="linear", symbol=api_symbol), timeout=5.0)
+            response = await asyncio.wait_for(self.http.get_instruments_info(category="linear", symbol=api_symbol), timeout=5.0)
             info = response.get("result", {}).get("list", [{}])[0]
             
             if info:
@@ -384,7 +489,7 @@ class BybitREST:
             api_symbol = self._strip_p(symbol)
             try:
                 # Need to fetch real price to simulate entry
-                ticker = await asyncio.to_thread(self.session.get_tickers, category="linear", symbol=api_symbol)
+                ticker = await self.http.get_tickers(category="linear", symbol=api_symbol)
                 last_price = float(ticker.get("result", {}).get("list", [{}])[0].get("lastPrice", 0))
                 
                 if last_price == 0:
@@ -411,8 +516,9 @@ class BybitREST:
                     self.paper_positions.remove(existing)
                 
                 self.paper_positions.append(new_position)
+                paper_matching_engine.arm_position(new_position) # V11.21: SL/TP matched on every print
+                paper_journal.append("open", pos=new_position) # V11.22: WAL record (durable on the next batch)
                 logger.info(f"[PAPER] Position Created: {api_symbol} Entry={last_price}")
-                self._save_paper_state()
                 
                 # Return fake order response
                 return {
@@ -425,6 +531,7 @@ class BybitREST:
                 return None
 
         try:
+            api_symbol = self._strip_p(symbol)
             # [V5.2.5] Precision Engine: Normalizar preços antes do envio
             sl_final = await self.format_precision(symbol, sl_price)
             tp_final = await self.format_precision(symbol, tp_price) if tp_price else None
@@ -443,17 +550,18 @@ class BybitREST:
             if tp_final:
                 order_params["takeProfit"] = str(tp_final)
 
-            response = await asyncio.to_thread(self.session.place_order, **order_params)
+            response = await self.http.place_order(**order_params)
             logger.info(f"Atomic order placed for {symbol}: {response}")
             return response
         except Exception as e:
             logger.error(f"Failed to place atomic order for {symbol}: {e}")
             return None
 
-    async def close_position(self, symbol: str, side: str, qty: float) -> bool:
+    async def close_position(self, symbol: str, side: str, qty: float, exit_price: float = None) -> bool:
         """
         Closes a position at market. 
         V5.3.4: Added closure_lock and pending_closures for target/SL coordination.
+        V11.21: PAPER fills at exit_price when given (the triggering print) instead of a ticker fetch.
         Returns True if closure was executed, False if already closed/pending.
         """
         norm_symbol = self._strip_p(symbol).upper()
@@ -480,8 +588,9 @@ class BybitREST:
                         # Calculate Realized PNL to update Paper Balance
                         from services.execution_protocol import execution_protocol
                         api_symbol = self._strip_p(symbol)
-                        ticker = await asyncio.to_thread(self.session.get_tickers, category="linear", symbol=api_symbol)
-                        exit_price = float(ticker.get("result", {}).get("list", [{}])[0].get("lastPrice", 0))
+                        if not exit_price:
+                            ticker = await self.http.get_tickers(category="linear", symbol=api_symbol)
+                            exit_price = float(ticker.get("result", {}).get("list", [{}])[0].get("lastPrice", 0))
                         
                         entry_price = float(pos["avgPrice"])
                         size = float(pos["size"])
@@ -491,7 +600,7 @@ class BybitREST:
                         final_pnl = execution_protocol.calculate_pnl(entry_price, exit_price, size, side)
                         
                         self.paper_balance += final_pnl
-                        self.paper_orders_history.append({
+                        history_entry = {
                             "symbol": symbol,
                             "side": side,
                             "avgEntryPrice": str(entry_price),
@@ -500,10 +609,13 @@ class BybitREST:
                             "leverage": str(leverage),
                             "qty": str(size),
                             "updatedTime": str(int(time.time() * 1000))
-                        })
+                        }
+                        self.paper_orders_history.append(history_entry)
                         
                         if pos in self.paper_positions:
                             self.paper_positions.remove(pos)
+                        paper_matching_engine.disarm(norm_symbol)
+                        paper_journal.append("close", symbol=norm_symbol, entry=history_entry, balance=self.paper_balance)
                         
                         # V5.4.0: UI Pub/Sub - Push closure to frontend
                         await self.redis.publish_update("trade_updates", {
@@ -514,7 +626,6 @@ class BybitREST:
                         })
                         
                         logger.info(f"[PAPER] Closed {symbol}. PNL: ${final_pnl:.2f}. New Balance: ${self.paper_balance:.2f}")
-                        self._save_paper_state()
                         
                         # Cleanup pending after a small delay to let other loops sync
                         asyncio.create_task(self._cleanup_pending_closure(norm_symbol))
@@ -523,6 +634,8 @@ class BybitREST:
                         logger.error(f"[PAPER] Error during position closure: {e}")
                         if pos in self.paper_positions:
                             self.paper_positions.remove(pos)
+                            paper_journal.append("close", symbol=norm_symbol, entry=None, balance=self.paper_balance)
+                        paper_matching_engine.disarm(norm_symbol)
                         self.pending_closures.discard(norm_symbol)
                         return False
                 return False
@@ -532,13 +645,15 @@ class BybitREST:
                 self.pending_closures.add(norm_symbol)
                 api_symbol = self._strip_p(symbol)
                 close_side = "Sell" if side == "Buy" else "Buy"
-                response = await asyncio.to_thread(self.session.place_order,
+                # V11.8: Closes are critical: never queued behind rate-limit backoff
+                response = await self.http.place_order(
                     category=self.category,
                     symbol=api_symbol,
                     side=close_side,
                     orderType="Market",
                     qty=str(qty),
-                    reduceOnly=True
+                    reduceOnly=True,
+                    critical=True
                 )
                 # Cleanup pending
                 asyncio.create_task(self._cleanup_pending_closure(norm_symbol))
@@ -567,28 +682,76 @@ class BybitREST:
         try:
             api_symbol = self._strip_p(symbol)
             # V5.2.4.3: Added 5s timeout
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_closed_pnl, category=self.category, symbol=api_symbol, limit=limit), timeout=5.0)
+            response = await asyncio.wait_for(self.http.get_closed_pnl(category=self.category, symbol=api_symbol, limit=limit), timeout=5.0)
             return response.get("result", {}).get("list", [])
         except Exception as e:
             logger.error(f"Error fetching closed PnL for {symbol}: {e}")
             return []
 
+    async def _fetch_klines(self, symbol: str, interval: str, limit: int, mark: bool = True) -> list:
+        """Raw kline request (raises). mark=True: mark price klines, else last-traded with volume."""
+        api_symbol = self._strip_p(symbol)
+        endpoint = self.http.get_mark_price_kline if mark else self.http.get_kline
+        # V5.2.4.3: Added 5s timeout
+        response = await asyncio.wait_for(endpoint(
+            category=self.category,
+            symbol=api_symbol,
+            interval=interval,
+            limit=min(int(limit), 1000)
+        ), timeout=5.0)
+        return response.get("result", {}).get("list", [])
+
     async def get_klines(self, symbol: str, interval: str = "60", limit: int = 20):
         """Fetches historical klines for ATR and variation calculations."""
         try:
-            api_symbol = self._strip_p(symbol)
-            # V5.2.4.3: Added 5s timeout
-            response = await asyncio.wait_for(asyncio.to_thread(self.session.get_mark_price_kline,
-                category=self.category,
-                symbol=api_symbol,
-                interval=interval,
-                limit=limit
-            ), timeout=5.0)
-            return response.get("result", {}).get("list", [])
+            return await self._fetch_klines(symbol, interval, limit, mark=True)
         except Exception as e:
             logger.error(f"Error fetching klines for {symbol}: {e}")
             return []
 
+    async def get_trade_klines(self, symbol: str, interval: str = "60", limit: int = 200):
+        """V11.3: Last-traded-price klines (with volume/turnover) for the candle backfill."""
+        try:
+            return await self._fetch_klines(symbol, interval, limit, mark=False)
+        except Exception as e:
+            logger.error(f"Error fetching trade klines for {symbol}: {e}")
+            return []
+
+    async def get_klines_batch(self, symbols: list, interval: str = "60", limit: int = 20,
+                               mark: bool = True, concurrency: int = None, retries: int = 2) -> dict:
+        """
+        V11.9: Concurrent kline fan-out under a semaphore.
+        Each symbol retries with jittered exponential backoff; failures are left
+        out of the result instead of failing the batch ({symbol: klines}).
+        """
+        concurrency = concurrency or settings.KLINE_BATCH_CONCURRENCY
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results = {}
+        failed = []
+
+        async def _one(symbol: str):
+            for attempt in range(retries + 1):
+                try:
+                    async with semaphore:
+                        results[symbol] = await self._fetch_klines(symbol, interval, limit, mark=mark)
+                    return
+                except Exception as e:
+                    if attempt == retries:
+                        failed.append(symbol)
+                        logger.warning(f"Kline batch: {symbol} {interval} failed after {retries + 1} attempts: {e}")
+                        return
+                    await asyncio.sleep(0.25 * (2 ** attempt) + random.uniform(0, 0.25))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_one(s) for s in symbols))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.last_kline_batch_stats = {
+            "interval": interval, "symbols": len(symbols), "ok": len(results),
+            "failed": len(failed), "elapsed_ms": round(elapsed_ms, 1),
+        }
+        logger.info(f"📊 Kline batch ({interval}): {len(results)}/{len(symbols)} symbols in {elapsed_ms:.0f}ms (concurrency {concurrency}, failed {len(failed)})")
+        return results
+
     
     async def set_trading_stop(self, category: str, symbol: str, stopLoss: str, slTriggerBy: str = None, tpslMode: str = None, positionIdx: int = 0):
         """Sets the stop loss for a position."""
@@ -598,7 +761,8 @@ class BybitREST:
             pos = next((p for p in self.paper_positions if p["symbol"] == api_symbol), None)
             if pos:
                 pos["stopLoss"] = str(stopLoss)
-                self._save_paper_state()
+                paper_matching_engine.arm_position(pos)
+                paper_journal.append("amend", symbol=api_symbol, fields={"stopLoss": pos["stopLoss"]})
                 return {"retCode": 0, "result": {}}
             else:
                 return {"retCode": 10001, "retMsg": f"Position {api_symbol} not found in Paper Trading"}
@@ -614,13 +778,83 @@ class BybitREST:
             if slTriggerBy: params["slTriggerBy"] = slTriggerBy
             if tpslMode: params["tpslMode"] = tpslMode
             
-            response = await asyncio.to_thread(self.session.set_trading_stop, **params)
+            response = await self.http.set_trading_stop(**params)
             logger.info(f"set_trading_stop response for {symbol}: {response}")
             return response
         except Exception as e:
             logger.error(f"Error setting SL for {symbol}: {e}")
             return {"retCode": -1, "retMsg": str(e)}
 
+    async def settle_paper_close(self, close_data: dict) -> bool:
+        """
+        V11.21: Closes a paper position at close_data["exit_price"] and syncs the
+        slot, cooldown and bankroll. Shared by the execution loop and the
+        tick-driven matching engine. Returns False if the close was skipped.
+        """
+        from services.execution_protocol import execution_protocol
+        from services.firebase_service import firebase_service
+
+        sym = close_data["symbol"]
+        side = close_data["side"]
+        size = close_data["size"]
+        exit_price = close_data["exit_price"]
+
+        # Close position (this updates paper_balance)
+        was_closed = await self.close_position(sym, side, size, exit_price=exit_price)
+
+        if not was_closed:
+            logger.info(f"⏭️ [PAPER] {sym} already closed or handled. Skipping slot reset/log.")
+            return False
+
+        slot_id = close_data.get("slot_id")
+        if not slot_id:
+            # Tick fills carry no slot: resolve it from the slots mirror
+            slot = next((s for s in await firebase_service.get_active_slots()
+                         if s.get("symbol") and self._strip_p(s["symbol"]).upper() == sym.upper()), None)
+            if slot:
+                slot_id = slot.get("id")
+                close_data["slot_type"] = slot.get("slot_type", "SNIPER")
+
+        # Reset Firebase slot atomically
+        if slot_id:
+            # Calculate accurate PNL
+            entry = close_data["entry_price"]
+            pnl = execution_protocol.calculate_pnl(entry, exit_price, size, side)
+
+            trade_data = {
+                "symbol": sym,
+                "side": side,
+                "entry_price": entry,
+                "exit_price": exit_price,
+                "qty": size,
+                "slot_id": slot_id,
+                "slot_type": close_data.get("slot_type", "SNIPER") # Use stored type
+            }
+
+            await firebase_service.hard_reset_slot(slot_id, close_data["reason"], pnl, trade_data)
+
+            # V5.3.2: Redundancy - Register Persistent Cooldown if SL
+            if "SL" in close_data["reason"] or "STOP" in close_data["reason"]:
+                try:
+                    await firebase_service.register_sl_cooldown(sym)
+                except Exception as cd_err:
+                    logger.warning(f"[PAPER] Redundancy: Failed to register persistent cooldown: {cd_err}")
+
+            # V5.2.3: Notify bankroll/vault for statistics sync
+            try:
+                from services.bankroll import bankroll_manager
+                await bankroll_manager.register_sniper_trade({
+                    **trade_data,
+                    "pnl": pnl,
+                    "pnl_percent": (pnl / (entry * size / 50)) * 100 if size > 0 else 0, # Rough ROI estimate
+                    "slot_type": close_data.get("slot_type", "SNIPER") # Use stored type
+                })
+            except Exception as e:
+                logger.error(f"[PAPER] Failed to notify bankroll of trade closure: {e}")
+
+            logger.info(f"✅ [PAPER] Slot {slot_id} FREED | {sym} | PNL: ${pnl:.2f} | New Balance: ${self.paper_balance:.2f}")
+        return True
+
     async def run_paper_execution_loop(self):
         """
         V4.3.1: Engine de execução blindada para modo PAPER.
@@ -638,6 +872,7 @@ class BybitREST:
         logger.info(f"   - Loop Interval: 1 second (Fast SNIPER capture)")
         logger.info(f"   - SNIPER Target: {execution_protocol.sniper_target_roi}% ROI")
         logger.info(f"   - SURF Trailing: Escada de Proteção Ativa")
+        logger.info(f"   - Tick Matching (SL/TP per trade print): {'ON' if settings.PAPER_TICK_MATCHING else 'OFF'}")
         
         while True:
             try:
@@ -645,11 +880,9 @@ class BybitREST:
                     await asyncio.sleep(2)  # Slightly longer sleep when no positions
                     continue
 
-                # 1. Batch fetch tickers for efficiency
+                # 1. Batch prices from the shared board (WS-fed, stale entries dropped)
                 symbols_to_check = [p["symbol"] for p in self.paper_positions]
-                resp = await asyncio.to_thread(self.session.get_tickers, category="linear")
-                ticker_list = resp.get("result", {}).get("list", [])
-                price_map = {t["symbol"]: float(t.get("lastPrice", 0)) for t in ticker_list}
+                price_map = await price_board.get_prices(symbols_to_check)
 
                 # 2. Get Firebase slots for correlation
                 slots = await firebase_service.get_active_slots()
@@ -663,6 +896,12 @@ class BybitREST:
                 to_close = []
                 to_update_sl = []
 
+                # V11.25: Trigger book - positions whose Smart SL boundary was not crossed are skipped
+                fired = set()
+                for sym in set(symbols_to_check):
+                    fired |= trigger_book.crossed(sym, price_map.get(sym, 0))
+                trigger_book.prune("paper", {("paper", s) for s in symbols_to_check})
+
                 # 3. Process each position with ExecutionProtocol
                 for pos in self.paper_positions:
                     symbol = pos["symbol"]  # Already normalized (no .P)
@@ -691,7 +930,14 @@ class BybitREST:
                     }
 
                     # 4. Execute Protocol Logic
+                    key = ("paper", symbol)
+                    if not trigger_book.should_evaluate(key, slot_data, fired):
+                        continue
                     should_close, reason, new_sl = await execution_protocol.process_order_logic(slot_data, current_price)
+                    if should_close:
+                        trigger_book.disarm(key)
+                    elif new_sl is None:
+                        trigger_book.arm_position(key, slot_data)
 
                     # [V5.2.5] ELITE FIX: Always process closure if should_close is TRUE
                     if should_close:
@@ -715,59 +961,7 @@ class BybitREST:
 
                 # 5. Execute closures with Firebase sync
                 for close_data in to_close:
-                    sym = close_data["symbol"]
-                    side = close_data["side"]
-                    size = close_data["size"]
-                    slot_id = close_data.get("slot_id")
-                    
-                    # Close position (this updates paper_balance)
-                    was_closed = await self.close_position(sym, side, size)
-                    
-                    if not was_closed:
-                        logger.info(f"⏭️ [PAPER] {sym} already closed or handled. Skipping slot reset/log.")
-                        continue
-                    
-                    # Reset Firebase slot atomically
-                    if slot_id:
-                        # Calculate accurate PNL
-                        entry = close_data["entry_price"]
-                        exit_price = close_data["exit_price"]
-                        side = close_data["side"]
-                        
-                        pnl = execution_protocol.calculate_pnl(entry, exit_price, size, side)
-                        
-                        trade_data = {
-                            "symbol": sym,
-                            "side": side,
-                            "entry_price": entry,
-                            "exit_price": exit_price,
-                            "qty": size,
-                            "slot_id": slot_id,
-                            "slot_type": close_data.get("slot_type", "SNIPER") # Use stored type
-                        }
-                        
-                        await firebase_service.hard_reset_slot(slot_id, close_data["reason"], pnl, trade_data)
-                        
-                        # V5.3.2: Redundancy - Register Persistent Cooldown if SL
-                        if "SL" in close_data["reason"] or "STOP" in close_data["reason"]:
-                            try:
-                                await firebase_service.register_sl_cooldown(sym)
-                            except Exception as cd_err:
-                                logger.warning(f"[PAPER] Redundancy: Failed to register persistent cooldown: {cd_err}")
-                        
-                        # V5.2.3: Notify bankroll/vault for statistics sync
-                        try:
-                            from services.bankroll import bankroll_manager
-                            await bankroll_manager.register_sniper_trade({
-                                **trade_data,
-                                "pnl": pnl,
-                                "pnl_percent": (pnl / (close_data["entry_price"] * size / 50)) * 100 if size > 0 else 0, # Rough ROI estimate
-                                "slot_type": close_data.get("slot_type", "SNIPER") # Use stored type
-                            })
-                        except Exception as e:
-                            logger.error(f"[PAPER] Failed to notify bankroll of trade closure: {e}")
-
-                        logger.info(f"✅ [PAPER] Slot {slot_id} FREED | {sym} | PNL: ${pnl:.2f} | New Balance: ${self.paper_balance:.2f}")
+                    await self.settle_paper_close(close_data)
 
                 # 6. Update trailing stops in Firebase
                 for sym, new_sl, slot_id in to_update_sl:
@@ -778,6 +972,12 @@ class BybitREST:
                     pos = next((p for p in self.paper_positions if p["symbol"] == sym), None)
                     if pos:
                         pos["stopLoss"] = str(new_sl)
+                        paper_matching_engine.arm_position(pos)
+                        trigger_book.arm_position(("paper", sym), {
+                            "symbol": sym, "side": pos.get("side", "Buy"),
+                            "entry_price": float(pos.get("avgPrice", 0)), "current_stop": new_sl,
+                        })
+                        paper_journal.append("amend", symbol=sym, fields={"stopLoss": pos["stopLoss"]})
                     
                     # Update Firebase
                     if slot_id:
@@ -2,10 +2,14 @@ import asyncio
 import json
 import logging
 import time
-from collections import deque
 from pybit.unified_trading import WebSocket
 from config import settings
 from services.redis_service import redis_service
+from services.cvd_buffer import CVDRingBuffer, CVD_WINDOWS
+from services.candle_aggregator import candle_aggregator
+from services.indicator_engine import indicator_engine
+from services.price_board import price_board
+from services.paper_matching import paper_matching_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BybitWS")
@@ -14,10 +18,11 @@ class BybitWS:
     def __init__(self):
         self.endpoint = "wss://stream-testnet.bybit.com/v5/public/linear" if settings.BYBIT_TESTNET else "wss://stream.bybit.com/v5/public/linear"
         self.ws = None
-        # CVD storage: {symbol: {timestamp: delta}}
+        # V11.2: CVD storage: {symbol: CVDRingBuffer} (time windows 1m/5m/15m/1h, O(1) reads)
         self.cvd_data = {} 
         self.prices = {} # {symbol: last_price}
-        self.max_cvd_history = 1000 # V5.2.2: Increased to 1000 for better signal capture
+        self.cvd_default_window = settings.CVD_DEFAULT_WINDOW if settings.CVD_DEFAULT_WINDOW in CVD_WINDOWS else "5m"
+        self.cvd_bucket_ms = settings.CVD_BUCKET_MS
         self.active_symbols = []
         
         # V5.1.0: Protocol Drag
@@ -32,6 +37,11 @@ class BybitWS:
         self.last_message_time = 0
         self.buffer_health = 100
 
+        # V11.13: CVD threshold-crossing candidate events (consumed by the signal worker)
+        self.candidate_events = asyncio.Queue(maxsize=1000)
+        self.candidate_events_dropped = 0
+        self._cvd_event_state = {} # {symbol: (sign, |cvd| at last event)}; absent = armed
+
     def handle_trade_message(self, message):
         """Processes trade messages to calculate CVD."""
         try:
@@ -46,9 +56,13 @@ class BybitWS:
             # V5.2.2: Keep symbol consistent with topic (No .P suffix for Mainnet/Testnet public topics)
             symbol = topic.replace("publicTrade.", "")
 
-            if symbol not in self.cvd_data:
-                self.cvd_data[symbol] = deque(maxlen=self.max_cvd_history)
+            cvd = self.cvd_data.get(symbol)
+            if cvd is None:
+                cvd = self.cvd_data[symbol] = CVDRingBuffer(resolution_ms=self.cvd_bucket_ms)
 
+            # Normalized key is constant for the whole batch
+            norm_sym = symbol.replace(".P", "").upper()
+            candle_batch = [] # V11.3: (ts, price, size) prints for the local OHLCV bars
             for trade in data:
                 side = trade.get("S") # 'Buy' or 'Sell'
                 size = float(trade.get("v", 0))
@@ -56,21 +70,29 @@ class BybitWS:
                 
                 # UPDATE: Normalize CVD to USD Value for fair comparison
                 # If price is 0 (unlikely for linear), use last known from ticker
-                norm_sym = symbol.replace(".P", "").upper()
                 if price == 0: price = self.prices.get(norm_sym, 0)
                 else: self.prices[norm_sym] = price # Update last known price from trade event
 
+                trade_ts = float(trade.get("T") or receive_ts)
                 delta = (size * price) if side == "Buy" else -(size * price)
-                self.cvd_data[symbol].append({
-                    "timestamp": trade.get("T"),
-                    "delta": delta
-                })
-                
-                # V5.4.0: Persist to Redis Cache for low-latency ROIs
-                score = sum(item["delta"] for item in self.cvd_data[symbol])
-                if self.loop and self.loop.is_running():
-                    asyncio.run_coroutine_threadsafe(redis_service.set_cvd(symbol, score), self.loop)
-                    
+                cvd.append(trade_ts, delta)
+                candle_batch.append((int(trade_ts), price, size))
+
+            candle_aggregator.ingest(norm_sym, candle_batch)
+            # V11.21: Paper SL/TP matched against every print (no-op without an armed position)
+            paper_matching_engine.on_trades(norm_sym, candle_batch, self.loop)
+            # V11.5: Last print of the batch feeds the shared price board
+            if candle_batch:
+                price_board.update(norm_sym, candle_batch[-1][1], receive_ts / 1000)
+
+            # V5.4.0: Persist to Redis Cache for low-latency ROIs
+            # V11.1: Once per batch (the running sum is already final here)
+            if data and self.loop and self.loop.is_running():
+                score = cvd.score(self.cvd_default_window)
+                asyncio.run_coroutine_threadsafe(redis_service.set_cvd(symbol, score), self.loop)
+                if settings.SIGNAL_EVENT_MODE and candle_batch:
+                    self._check_cvd_crossing(norm_sym, score, candle_batch[-1][0], receive_ts)
+
             # 🆕 V6.0: Push health metrics to Redis
             if self.loop and self.loop.is_running():
                 health_data = {"latency": self.latency_ms, "status": "ONLINE", "ts": self.last_message_time}
@@ -78,15 +100,48 @@ class BybitWS:
         except Exception as e:
             logger.error(f"Error processing trade message: {e}")
 
+    def _check_cvd_crossing(self, symbol: str, score: float, print_ts: float, receive_ts: float):
+        """
+        V11.13: Raises a candidate event when |CVD| crosses the threshold (with
+        hysteresis), flips side, or keeps escalating. Runs on the WS thread;
+        the event is handed to the loop with call_soon_threadsafe.
+        """
+        abs_score = abs(score)
+        sign = 1 if score > 0 else -1
+        state = self._cvd_event_state.get(symbol)
+        threshold = settings.CVD_EVENT_THRESHOLD_USD
+
+        if state is None:
+            fire = abs_score > threshold # Strict, like the cvd_score rule (|CVD| > 50k)
+        elif abs_score < threshold * (1 - settings.CVD_EVENT_HYSTERESIS):
+            del self._cvd_event_state[symbol] # Re-armed
+            return
+        else:
+            fire = sign != state[0] or abs_score >= state[1] * settings.CVD_EVENT_ESCALATION
+
+        if fire:
+            self._cvd_event_state[symbol] = (sign, abs_score)
+            event = {"symbol": symbol, "cvd": score, "print_ts": print_ts, "receive_ts": receive_ts}
+            self.loop.call_soon_threadsafe(self._offer_candidate, event)
+
+    def _offer_candidate(self, event: dict):
+        try:
+            self.candidate_events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.candidate_events_dropped += 1
+
     def handle_ticker_message(self, message):
         """Processes ticker updates to maintain current price references."""
         try:
             data = message.get("data", {})
             topic = message.get("topic", "")
             if "lastPrice" in data:
+                # V11.5: Symbol comes from the topic (was an undefined name, every tick was dropped)
+                symbol = data.get("symbol") or topic.replace("tickers.", "")
                 norm_sym = symbol.replace(".P", "").upper()
                 price = float(data["lastPrice"])
                 self.prices[norm_sym] = price
+                price_board.update(norm_sym, price)
                 # V5.4.0: Cache ticker in Redis
                 if self.loop and self.loop.is_running():
                     asyncio.run_coroutine_threadsafe(redis_service.set_ticker(norm_sym, price), self.loop)
@@ -97,24 +152,44 @@ class BybitWS:
         norm_sym = symbol.replace(".P", "").upper()
         return self.prices.get(norm_sym, 0.0)
 
-    def get_cvd_score(self, symbol: str) -> float:
-        """Returns the current cumulative delta for the stored history."""
+    def get_cvd_score(self, symbol: str, window: str = None) -> float:
+        """
+        V11.2: Returns the rolling USD delta over a fixed time window (1m/5m/15m/1h).
+        Defaults to settings.CVD_DEFAULT_WINDOW. Constant-time lookup.
+        """
         # V5.2.4: Normalize symbol to match internal keys (remove .P)
         norm_symbol = symbol.replace(".P", "").upper()
-        if norm_symbol not in self.cvd_data:
+        cvd = self.cvd_data.get(norm_symbol)
+        if cvd is None:
             return 0.0
-        return sum(item["delta"] for item in self.cvd_data[norm_symbol])
+        return cvd.score(window or self.cvd_default_window)
+
+    def get_cvd_windows(self, symbol: str) -> dict:
+        """V11.2: All CVD windows for a symbol, e.g. {'1m': ..., '5m': ..., '15m': ..., '1h': ...}."""
+        norm_symbol = symbol.replace(".P", "").upper()
+        cvd = self.cvd_data.get(norm_symbol)
+        if cvd is None:
+            return {w: 0.0 for w in CVD_WINDOWS}
+        return cvd.scores()
+
+    async def _get_hourly_klines(self, symbol: str, limit: int) -> list:
+        """V11.3: 1h klines from the local candle aggregator, REST only until it has history."""
+        from services.bybit_rest import bybit_rest_service
+        if candle_aggregator.has_history(symbol, "60", limit):
+            return candle_aggregator.get_klines(symbol, "60", limit)
+        return await bybit_rest_service.get_klines(symbol=symbol, interval="60", limit=limit)
 
     async def update_market_context(self):
         """
         V5.1.0: Updates BTC variation and calculates ATR for active symbols.
         Should be called periodically (e.g., every 5-10 mins).
+        V11.3: Candles come from the in-process aggregator (no REST kline pulls once backfilled).
         """
         from services.bybit_rest import bybit_rest_service
-        
+
         try:
             # 1. Update BTC Variation (1h)
-            btc_klines = await bybit_rest_service.get_klines(symbol="BTCUSDT", interval="60", limit=2)
+            btc_klines = await self._get_hourly_klines("BTCUSDT", 2)
             if len(btc_klines) >= 2:
                 # Bybit returns newest first: [current, previous]
                 curr_close = float(btc_klines[0][4])
@@ -123,42 +198,37 @@ class BybitWS:
                 logger.info(f"V5.1.0: BTC 1h Variation updated: {self.btc_variation_1h:.2f}%")
 
             # 2. Update ATR & RSI for active symbols
+            # V11.4: Wilder ATR(14)/RSI(14) from the incremental engine (O(1) per symbol)
             now = time.time()
             # V7.2: Sync with Sniper Pulse (Every 1 min if symbols > 0)
             if now - self.last_atr_update > 60: 
+                refresh_start = time.perf_counter()
+                # V11.9: Symbols still without history are seeded in one concurrent batch
+                missing = [
+                    s for s in self.active_symbols
+                    if not indicator_engine.is_ready(s, "60") and not candle_aggregator.is_backfilled(s)
+                ]
+                if missing:
+                    batch = await bybit_rest_service.get_klines_batch(
+                        missing, interval="60", limit=candle_aggregator.history["60"] + 1, mark=False
+                    )
+                    for symbol, klines in batch.items():
+                        candle_aggregator.seed(symbol, "60", klines)
+                        indicator_engine.warmup(symbol, "60")
+
+                updated = 0
                 for symbol in self.active_symbols:
-                    klines = await bybit_rest_service.get_klines(symbol=symbol, interval="60", limit=16)
-                    if len(klines) >= 15:
-                        # --- ATR Calculation ---
-                        tr_list = []
-                        for i in range(1, len(klines)):
-                            high, low, prev_close = float(klines[i][2]), float(klines[i][3]), float(klines[i-1][4])
-                            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
-                            tr_list.append(tr)
-                        self.atr_cache[symbol] = sum(tr_list[-14:]) / 14
-
-                        # --- RSI Calculation (14 periods) ---
-                        changes = []
-                        for i in range(1, len(klines)):
-                            changes.append(float(klines[i][4]) - float(klines[i-1][4]))
-                        
-                        gains = [c if c > 0 else 0 for c in changes[-14:]]
-                        losses = [abs(c) if c < 0 else 0 for c in changes[-14:]]
-                        
-                        avg_gain = sum(gains) / 14
-                        avg_loss = sum(losses) / 14
-                        
-                        if avg_loss == 0:
-                            rsi = 100
-                        else:
-                            rs = avg_gain / avg_loss
-                            rsi = 100 - (100 / (1 + rs))
-                        
-                        self.rsi_cache[symbol] = rsi
-                        logger.debug(f"💎 [PULSE] {symbol} | ATR: {self.atr_cache[symbol]:.6f} | RSI: {rsi:.1f}")
+                    if not indicator_engine.is_ready(symbol, "60"):
+                        continue # Too young for 14 bars (or fetch failed: retried next pulse)
+                    values = indicator_engine.get_values(symbol, "60")
+                    self.atr_cache[symbol] = values["atr"]
+                    self.rsi_cache[symbol] = values["rsi"]
+                    updated += 1
+                    logger.debug(f"💎 [PULSE] {symbol} | ATR: {values['atr']:.6f} | RSI: {values['rsi']:.1f}")
                 
                 self.last_atr_update = now
-                logger.info(f"V7.2: Sniper Pulse Metrics (ATR/RSI) updated for {len(self.active_symbols)} symbols.")
+                refresh_ms = (time.perf_counter() - refresh_start) * 1000
+                logger.info(f"V7.2: Sniper Pulse Metrics (ATR/RSI) updated for {updated}/{len(self.active_symbols)} symbols in {refresh_ms:.0f}ms.")
 
         except Exception as e:
             logger.error(f"Error updating market context in BybitWS: {e}")
@@ -182,6 +252,20 @@ class BybitWS:
 
         logger.info(f"BybitWS: Subscribed to {len(symbols)} symbols for CVD & Price monitoring.")
 
+        # V11.3: One-time REST backfill of the local candles (live bars already accumulate)
+        asyncio.create_task(self._warm_candles(symbols))
+
+    async def _warm_candles(self, symbols: list):
+        """V11.4: Backfills the candles, then replays them into the indicator engine once."""
+        try:
+            await candle_aggregator.backfill(symbols)
+            for symbol in symbols:
+                for interval in candle_aggregator.intervals:
+                    indicator_engine.warmup(symbol, interval)
+            self.last_atr_update = 0 # Publish fresh ATR/RSI on the next pulse
+        except Exception as e:
+            logger.error(f"Error warming candles/indicators: {e}")
+
     def stop(self):
         if self.ws:
             self.ws.exit()
@@ -0,0 +1,233 @@
+"""
+V11.3: Local Candle Aggregator
+===============================
+Folds every publicTrade print into rolling OHLCV bars (1m / 5m / 1h) in
+process. Backfilled once from REST at startup, then served from memory in
+the same shape as Bybit's kline endpoint (newest first, forming bar at [0]).
+
+Bar layout (floats): [start_ms, open, high, low, close, volume, turnover]
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("CandleAggregator")
+
+# Bybit interval label -> bar length in milliseconds
+CANDLE_INTERVALS: Dict[str, int] = {
+    "1": 60_000,
+    "5": 300_000,
+    "60": 3_600_000,
+}
+
+# Closed bars kept per interval (4h of 1m, 24h of 5m, ~8 days of 1h)
+CANDLE_HISTORY: Dict[str, int] = {
+    "1": 240,
+    "5": 288,
+    "60": 200,
+}
+
+
+class _CandleSeries:
+    """Closed bars + the bar in progress for one (symbol, interval)."""
+    __slots__ = ("interval_ms", "closed", "current")
+
+    def __init__(self, interval_ms: int, maxlen: int):
+        self.interval_ms = interval_ms
+        self.closed = deque(maxlen=maxlen)
+        self.current: Optional[list] = None
+
+
+class CandleAggregator:
+    def __init__(self, intervals: Optional[Dict[str, int]] = None, history: Optional[Dict[str, int]] = None):
+        self.intervals = dict(intervals or CANDLE_INTERVALS)
+        self.history = dict(history or CANDLE_HISTORY)
+        self._series: Dict[str, Dict[str, _CandleSeries]] = {}  # {symbol: {interval: series}}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._close_listeners: List[Callable[[str, str, list], None]] = []
+        self.backfilled = set()  # Symbols seeded from REST
+
+    @staticmethod
+    def _norm(symbol: str) -> str:
+        return (symbol or "").replace(".P", "").upper()
+
+    def _get_series(self, symbol: str):
+        series = self._series.get(symbol)
+        if series is None:
+            series = {iv: _CandleSeries(ms, self.history.get(iv, 200)) for iv, ms in self.intervals.items()}
+            self._locks.setdefault(symbol, threading.Lock())
+            self._series[symbol] = series
+        return series, self._locks[symbol]
+
+    def add_close_listener(self, callback: Callable[[str, str, list], None]):
+        """Registers callback(symbol, interval, bar) fired once per closed bar."""
+        self._close_listeners.append(callback)
+
+    # ---------- Ingestion (WS thread) ----------
+
+    def ingest(self, symbol: str, trades: list):
+        """
+        Folds a batch of (ts_ms, price, size) prints into every interval.
+        Called from the pybit WS thread once per publicTrade message.
+        """
+        if not trades:
+            return
+        symbol = self._norm(symbol)
+        series_map, lock = self._get_series(symbol)
+        closed_bars = []
+
+        with lock:
+            for ts_ms, price, size in trades:
+                if price <= 0:
+                    continue
+                turnover = price * size
+                for interval, series in series_map.items():
+                    iv = series.interval_ms
+                    start = ts_ms - (ts_ms % iv)
+                    cur = series.current
+                    if cur is None:
+                        series.current = [start, price, price, price, price, size, turnover]
+                    elif start == cur[0]:
+                        if price > cur[2]: cur[2] = price
+                        if price < cur[3]: cur[3] = price
+                        cur[4] = price
+                        cur[5] += size
+                        cur[6] += turnover
+                    elif start > cur[0]:
+                        series.closed.append(cur)
+                        closed_bars.append((interval, cur))
+                        # Quiet gap: flat bars at the last close (Bybit does the same)
+                        gap_start = max(cur[0] + iv, start - iv * series.closed.maxlen)
+                        for gs in range(int(gap_start), int(start), iv):
+                            flat = [gs, cur[4], cur[4], cur[4], cur[4], 0.0, 0.0]
+                            series.closed.append(flat)
+                            closed_bars.append((interval, flat))
+                        series.current = [start, price, price, price, price, size, turnover]
+                    # start < cur[0]: late print for an already closed bar -> ignored
+
+        # Listeners run outside the lock so they may read the aggregator back
+        for interval, bar in closed_bars:
+            for callback in self._close_listeners:
+                try:
+                    callback(symbol, interval, bar)
+                except Exception as e:
+                    logger.error(f"Candle close listener error ({symbol} {interval}): {e}")
+
+    # ---------- Reads ----------
+
+    def get_bars(self, symbol: str, interval: str = "60", limit: int = 20, include_current: bool = True) -> list:
+        """Chronological float bars (oldest first). Copies, safe to mutate."""
+        symbol = self._norm(symbol)
+        series_map = self._series.get(symbol)
+        if not series_map or interval not in series_map:
+            return []
+        series = series_map[interval]
+        with self._locks[symbol]:
+            bars = list(series.closed)
+            if include_current and series.current is not None:
+                bars.append(series.current)
+            bars = bars[-limit:] if limit else bars
+            return [list(b) for b in bars]
+
+    def get_klines(self, symbol: str, interval: str = "60", limit: int = 20) -> list:
+        """
+        Same shape as BybitREST.get_klines: newest first, string fields,
+        forming bar at index 0.
+        """
+        bars = self.get_bars(symbol, interval, limit)
+        return [
+            [str(int(b[0])), str(b[1]), str(b[2]), str(b[3]), str(b[4]), str(b[5]), str(b[6])]
+            for b in reversed(bars)
+        ]
+
+    def bar_count(self, symbol: str, interval: str = "60") -> int:
+        """Closed + forming bars currently held for (symbol, interval)."""
+        series_map = self._series.get(self._norm(symbol))
+        if not series_map or interval not in series_map:
+            return 0
+        series = series_map[interval]
+        return len(series.closed) + (1 if series.current is not None else 0)
+
+    def has_history(self, symbol: str, interval: str = "60", min_bars: int = 15) -> bool:
+        return self.bar_count(symbol, interval) >= min_bars
+
+    def is_backfilled(self, symbol: str) -> bool:
+        """REST history already seeded for this symbol."""
+        return self._norm(symbol) in self.backfilled
+
+    # ---------- Backfill (REST, once) ----------
+
+    def seed(self, symbol: str, interval: str, klines: list):
+        """
+        Merges REST klines (Bybit shape, newest first) behind the live bars.
+        Bars already built from the stream win; REST only fills older history
+        and widens the first live bar if both saw it.
+        """
+        if not klines or interval not in self.intervals:
+            return
+        symbol = self._norm(symbol)
+        series_map, lock = self._get_series(symbol)
+        series = series_map[interval]
+
+        rows = []
+        for k in reversed(klines):
+            try:
+                vol = float(k[5]) if len(k) > 5 else 0.0
+                turnover = float(k[6]) if len(k) > 6 else 0.0
+                rows.append([float(int(k[0])), float(k[1]), float(k[2]), float(k[3]), float(k[4]), vol, turnover])
+            except (ValueError, TypeError, IndexError):
+                continue
+        if not rows:
+            return
+
+        with lock:
+            if series.current is None and not series.closed:
+                for row in rows[:-1]:
+                    series.closed.append(row)
+                series.current = rows[-1]
+                return
+
+            first_live = series.closed[0] if series.closed else series.current
+            older = []
+            for row in rows:
+                if row[0] < first_live[0]:
+                    older.append(row)
+                elif row[0] == first_live[0]:
+                    first_live[1] = row[1]
+                    first_live[2] = max(first_live[2], row[2])
+                    first_live[3] = min(first_live[3], row[3])
+                    first_live[5] = max(first_live[5], row[5])
+                    first_live[6] = max(first_live[6], row[6])
+
+            if older:
+                merged = older + list(series.closed)
+                series.closed.clear()
+                series.closed.extend(merged[-series.closed.maxlen:])
+
+    async def backfill(self, symbols: list, intervals: Optional[list] = None):
+        """Seeds history for every symbol/interval from REST. Runs once per symbol."""
+        from services.bybit_rest import bybit_rest_service
+
+        intervals = intervals or list(self.intervals.keys())
+        pending = [self._norm(s) for s in symbols if self._norm(s) not in self.backfilled]
+        if not pending:
+            return
+
+        logger.info(f"🕯️ V11.3: Backfilling candles for {len(pending)} symbols ({', '.join(intervals)})...")
+        # V11.9: One concurrent fan-out per interval (partial results are fine)
+        succeeded = set(pending)
+        for interval in intervals:
+            batch = await bybit_rest_service.get_klines_batch(
+                pending, interval=interval, limit=self.history.get(interval, 200) + 1, mark=False
+            )
+            for symbol, klines in batch.items():
+                self.seed(symbol, interval, klines)
+            succeeded &= set(batch)
+        # Symbols that failed stay pending so the market context pulse retries them
+        self.backfilled.update(succeeded)
+        logger.info(f"🕯️ V11.3: Candle backfill complete for {len(succeeded)}/{len(pending)} symbols.")
+
+
+candle_aggregator = CandleAggregator()
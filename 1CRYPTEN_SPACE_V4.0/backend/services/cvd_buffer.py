@@ -0,0 +1,161 @@
+"""
+V11.2: Columnar CVD Ring Buffer
+================================
+Per-symbol, preallocated ring of (bucket timestamp, signed USD delta) with
+O(1) rolling sums over several fixed time windows (1m/5m/15m/1h).
+
+Trades are folded into fixed-resolution buckets (1s by default), so the
+ring capacity only depends on the largest window, never on how liquid the
+pair is. Memory per symbol is fixed at construction time.
+"""
+
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Optional
+
+# Window label -> span in milliseconds
+CVD_WINDOWS: Dict[str, int] = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+}
+
+
+class CVDRingBuffer:
+    """
+    Columnar ring buffer with one running sum per time window.
+
+    - append(): O(1) amortized (each bucket enters and leaves every window once)
+    - score():  O(1) amortized (expires buckets older than the window first)
+
+    Written from the pybit WS thread and read from the event loop, so every
+    mutation happens under a small lock.
+    """
+    __slots__ = (
+        "resolution_ms", "capacity", "windows", "_ts", "_delta",
+        "_head", "_last_bucket", "_tails", "_sums", "_ops", "_lock",
+    )
+
+    # Float drift guard: re-sum the live buckets after this many operations
+    RESYNC_EVERY = 100_000
+
+    def __init__(self, resolution_ms: int = 1000, windows: Optional[Dict[str, int]] = None):
+        self.resolution_ms = max(1, int(resolution_ms))
+        self.windows = dict(windows or CVD_WINDOWS)
+        # One slot per bucket of the largest window, plus the bucket in progress
+        self.capacity = math.ceil(max(self.windows.values()) / self.resolution_ms) + 1
+
+        self._ts = array("d", bytes(8 * self.capacity))
+        self._delta = array("d", bytes(8 * self.capacity))
+        self._head = 0            # Monotonic write sequence (slot = seq % capacity)
+        self._last_bucket = -1
+        self._tails = {w: 0 for w in self.windows}   # Oldest sequence inside each window
+        self._sums = {w: 0.0 for w in self.windows}
+        self._ops = 0
+        self._lock = threading.Lock()
+
+    @property
+    def memory_bytes(self) -> int:
+        """Fixed payload size of the two columns (known ahead of time)."""
+        return self._ts.itemsize * self.capacity + self._delta.itemsize * self.capacity
+
+    def append(self, ts_ms: float, delta: float):
+        """Adds a signed USD delta at exchange time ts_ms."""
+        bucket = int(ts_ms // self.resolution_ms)
+        with self._lock:
+            if self._head > 0 and bucket < self._last_bucket:
+                # Late print (out-of-order delivery): fold into its bucket, never open a slot behind the tail
+                target = self._late_slot(bucket)
+                if target is None:
+                    return  # Older than the whole ring: outside every window already
+                self._delta[target % self.capacity] += delta
+            elif bucket == self._last_bucket and self._head > 0:
+                # Same bucket as the newest slot: fold into it
+                target = self._head - 1
+                self._delta[target % self.capacity] += delta
+            else:
+                seq = self._head
+                slot = seq % self.capacity
+                # Ring is full: drop the overwritten bucket from windows still holding it
+                oldest = seq - self.capacity
+                if oldest >= 0:
+                    old_delta = self._delta[slot]
+                    for w, tail in self._tails.items():
+                        if tail <= oldest:
+                            self._sums[w] -= old_delta
+                            self._tails[w] = oldest + 1
+
+                self._ts[slot] = bucket * self.resolution_ms
+                self._delta[slot] = delta
+                self._head = seq + 1
+                self._last_bucket = bucket
+                target = seq
+
+            for w, tail in self._tails.items():
+                if tail <= target:
+                    self._sums[w] += delta
+
+            self._expire(ts_ms)
+            self._ops += 1
+            if self._ops >= self.RESYNC_EVERY:
+                self._resync()
+
+    def _late_slot(self, bucket: int) -> Optional[int]:
+        """
+        Sequence of the slot holding this bucket, or of the next newer one when
+        the bucket never got a slot (the delta is clamped forward to it). None
+        when the bucket is older than every slot still in the ring.
+        """
+        cap = self.capacity
+        bucket_ts = bucket * self.resolution_ms
+        seq = self._head - 1
+        floor = max(0, self._head - cap)
+        while seq >= floor and self._ts[seq % cap] > bucket_ts:
+            seq -= 1
+        if seq < floor:
+            return None
+        return seq if self._ts[seq % cap] == bucket_ts else seq + 1
+
+    def score(self, window: str, now_ms: Optional[float] = None) -> float:
+        """Rolling CVD for the given window label (e.g. '5m')."""
+        if window not in self._sums:
+            raise KeyError(f"Unknown CVD window '{window}'. Available: {list(self.windows)}")
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        with self._lock:
+            self._expire(now_ms)
+            return self._sums[window]
+
+    def scores(self, now_ms: Optional[float] = None) -> Dict[str, float]:
+        """All window sums at once."""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        with self._lock:
+            self._expire(now_ms)
+            return dict(self._sums)
+
+    def _expire(self, now_ms: float):
+        cap = self.capacity
+        head = self._head
+        ts = self._ts
+        delta = self._delta
+        for w, span in self.windows.items():
+            cutoff = now_ms - span
+            tail = self._tails[w]
+            total = self._sums[w]
+            while tail < head and ts[tail % cap] + self.resolution_ms <= cutoff:
+                total -= delta[tail % cap]
+                tail += 1
+            if tail == head:
+                total = 0.0  # Empty window: clear accumulated float noise
+            self._tails[w] = tail
+            self._sums[w] = total
+
+    def _resync(self):
+        cap = self.capacity
+        for w, tail in self._tails.items():
+            self._sums[w] = sum(self._delta[i % cap] for i in range(tail, self._head))
+        self._ops = 0
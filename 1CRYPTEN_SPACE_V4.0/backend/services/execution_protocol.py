@@ -15,7 +15,9 @@ V11.0 Changes:
 """
 
 import logging
+import math
 import time
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Tuple, Optional, Dict, Any
 
 logger = logging.getLogger("ExecutionProtocol")
@@ -28,6 +30,9 @@ SMART_SL_PHASES = {
     "PHASE_MEGA_PULSE": {"trigger_roi": 100.0, "trailing_gap": 20.0, "icon": "💎", "color": "diamond"}
 }
 
+LADDER_CACHE_SIZE = 256     # Oldest ladders are evicted first (open positions are re-prepared on demand)
+TICK_RETRY_SEC = 5.0        # Instrument lookup backoff while a ladder has no tick size
+
 class ExecutionProtocol:
     """
     Executa a lógica de fechamento para cada slot de forma independente.
@@ -52,6 +57,10 @@ class ExecutionProtocol:
         self.phase_risk_zero_trigger = 30.0   # ROI para mover SL para entry
         self.phase_profit_lock_trigger = 100.0 # ROI para travar 80% do lucro
         self.mega_pulse_trailing_gap = 20.0    # Gap de ROI para trailing
+
+        # V11.24: Precomputed Smart SL ladders {(SYMBOL, is_buy, entry): ladder}
+        self._ladders: Dict[tuple, Dict[str, Any]] = {}
+        self._tick_retry_at: Dict[str, float] = {}
         
         # === VISUAL STATUS CODES ===
         self.STATUS_SCANNING = "SCANNING"       # Azul - slot livre
@@ -156,6 +165,106 @@ class ExecutionProtocol:
             
         return False
 
+    # ---------- V11.24: Precomputed Smart SL ladder ----------
+
+    @staticmethod
+    def _round_to_tick(price: float, tick: Optional[Decimal]) -> float:
+        """Same rounding as bybit_rest.format_precision, with the tick already resolved."""
+        if tick is None or price <= 0:
+            return price
+        rounded = (Decimal(str(price)) / tick).quantize(Decimal("1"), rounding=ROUND_HALF_UP) * tick
+        return float(rounded.normalize())
+
+    def _roi_price(self, entry: float, roi: float, is_buy: bool) -> float:
+        offset = roi / (self.leverage * 100)
+        return entry * (1 + offset) if is_buy else entry * (1 - offset)
+
+    def hard_stop_price(self, entry: float, side: str) -> float:
+        """-50% ROI hard stop (sniper_stop_roi / leverage). Shared with the paper matching engine."""
+        return self._roi_price(entry, self.sniper_stop_roi, (side or "").lower() == "buy")
+
+    async def prepare_ladder(self, symbol: str, side: str, entry: float) -> Dict[str, Any]:
+        """
+        V11.24: Trigger prices and rounded stops for every Smart SL phase, computed
+        once per position (symbol, side, entry). The per-tick path only compares prices.
+        """
+        is_buy = (side or "").lower() == "buy"
+        key = (symbol.replace(".P", "").upper(), is_buy, entry)
+        ladder = self._ladders.get(key)
+        if ladder is not None:
+            return ladder
+
+        tick = None
+        if time.time() >= self._tick_retry_at.get(key[0], 0):
+            from services.bybit_rest import bybit_rest_service
+            info = await bybit_rest_service.get_instrument_info(symbol)
+            tick_str = (info or {}).get("priceFilter", {}).get("tickSize")
+            tick = Decimal(tick_str) if tick_str else None
+            if tick is None:
+                self._tick_retry_at[key[0]] = time.time() + TICK_RETRY_SEC
+            else:
+                self._tick_retry_at.pop(key[0], None)
+
+        ladder = {
+            "is_buy": is_buy,
+            "tick": tick,
+            "half_tick": float(tick) / 2 if tick else 0.0,  # Max upward move of a raw price by rounding
+            "hard_stop": self.hard_stop_price(entry, side),
+            "risk_zero_trigger": self._roi_price(entry, self.phase_risk_zero_trigger, is_buy),
+            "risk_zero_stop": self._round_to_tick(entry, tick),
+            "profit_lock_trigger": self._roi_price(entry, self.phase_profit_lock_trigger, is_buy),
+            "profit_lock_stop": self._round_to_tick(self._roi_price(entry, 80.0, is_buy), tick),
+            "profit_lock_raw": self._roi_price(entry, 80.0, is_buy),
+            # MEGA_PULSE trailing stop = price -/+ gap (ROI - 20% expressed in price)
+            "trailing_gap": entry * self.mega_pulse_trailing_gap / (self.leverage * 100),
+        }
+        if tick is None:
+            return ladder  # Unrounded stops: not cached, so the next call retries the lookup
+        while len(self._ladders) >= LADDER_CACHE_SIZE:
+            del self._ladders[next(iter(self._ladders))]  # Insertion order: oldest first
+        self._ladders[key] = ladder
+        return ladder
+
+    def discard_ladder(self, symbol: str, side: str, entry: float):
+        """Drops a closed (or re-priced) position's ladder."""
+        self._ladders.pop((symbol.replace(".P", "").upper(), (side or "").lower() == "buy", entry), None)
+
+    async def rekey_ladder(self, symbol: str, side: str, old_entry: float, new_entry: float) -> Dict[str, Any]:
+        """The ladder is prepared from the pre-fill price; sync re-prepares it from the filled avgPrice."""
+        if old_entry != new_entry:
+            self.discard_ladder(symbol, side, old_entry)
+        return await self.prepare_ladder(symbol, side, new_entry)
+
+    def trigger_levels(self, slot_data: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """
+        V11.25: Next (down, up) prices at which process_sniper_logic can return
+        anything but a no-op (close, RISK_ZERO, PROFIT_LOCK or trailing step).
+        Conservative: boundaries may fire early, never late. None = no ladder yet.
+        """
+        symbol = slot_data.get("symbol") or ""
+        side = slot_data.get("side", "Buy")
+        entry = slot_data.get("entry_price", 0)
+        ladder = self._ladders.get((symbol.replace(".P", "").upper(), (side or "").lower() == "buy", entry))
+        if ladder is None:
+            return None
+        current_sl = slot_data.get("current_stop", 0) or 0
+        is_buy = ladder["is_buy"]
+        m = 1 if is_buy else -1  # Sell mirrored by negation, as in process_sniper_logic
+        sl = m * current_sl if current_sl > 0 else -math.inf
+        eps = entry * 1e-9
+
+        close_at = max(sl, m * ladder["hard_stop"])
+        if sl < m * ladder["risk_zero_stop"]:
+            next_up = m * ladder["risk_zero_trigger"]
+        elif sl < m * ladder["profit_lock_stop"]:
+            next_up = m * ladder["profit_lock_trigger"]
+        else:
+            # Only a trailing step can still improve the stop: price - gap must clear it after rounding
+            next_up = max(m * ladder["profit_lock_trigger"], sl + ladder["trailing_gap"] - ladder["half_tick"])
+        next_up -= eps
+        close_at += eps
+        return (close_at, next_up) if is_buy else (-next_up, -close_at)
+
     async def process_sniper_logic(self, slot_data: Dict[str, Any], current_price: float, roi: float, atr: Optional[float] = None) -> Tuple[bool, Optional[str], Optional[float]]:
         """
         [V11.0] SMART STOP-LOSS PROTOCOL:
@@ -165,74 +274,71 @@ class ExecutionProtocol:
         PHASE_RISK_ZERO:  ROI >= 30% → SL move para entry (0% ROI)
         PHASE_PROFIT_LOCK: ROI >= 100% → SL trava em 80% do lucro
         PHASE_MEGA_PULSE: ROI >= 100% + Gás favorável → Trailing dinâmico
+
+        V11.24: Boundaries come from the position's precomputed ladder; the tick
+        path is synchronous comparisons. The Gás check (Redis) and rounding only
+        run when a stop improvement is actually possible.
         """
         symbol = slot_data.get("symbol", "UNKNOWN")
         side = slot_data.get("side", "Buy")
         entry = slot_data.get("entry_price", 0)
         current_sl = slot_data.get("current_stop", 0)
-        side_norm = side.lower()
+        if entry <= 0:
+            return False, None, None
+
+        ladder = self._ladders.get((symbol.replace(".P", "").upper(), (side or "").lower() == "buy", entry))
+        if ladder is None:
+            ladder = await self.prepare_ladder(symbol, side, entry)
+        is_buy = ladder["is_buy"]
+        p = current_price if is_buy else -current_price  # Mirror Sell so one set of comparisons serves both
+        sl = current_sl if is_buy else -current_sl
         
         # 🛡️ 1. Universal Stop Loss Check
-        if current_sl > 0:
-            if (side_norm == "buy" and current_price <= current_sl) or \
-               (side_norm == "sell" and current_price >= current_sl):
-                phase = self.get_sl_phase(roi)
-                logger.info(f"🛑 SNIPER SL HIT: {symbol} Price={current_price} | SL={current_sl} | Phase={phase}")
-                return True, f"SNIPER_SL_{phase} ({roi:.1f}%)", None
+        if current_sl > 0 and p <= sl:
+            phase = self.get_sl_phase(roi)
+            logger.info(f"🛑 SNIPER SL HIT: {symbol} Price={current_price} | SL={current_sl} | Phase={phase}")
+            return True, f"SNIPER_SL_{phase} ({roi:.1f}%)", None
 
         # 🛑 HARD STOP LOSS (-50% ROI)
-        if roi <= -50.0:
+        if p <= (ladder["hard_stop"] if is_buy else -ladder["hard_stop"]):
             logger.warning(f"🛑 SNIPER HARD SL: {symbol} ROI={roi:.1f}%")
             return True, f"SNIPER_SL_HARD_STOP ({roi:.1f}%)", None
-        
-        # V11.0: Determinar fase atual do Smart SL
-        phase = self.get_sl_phase(roi)
-        
+
         # 🌟 PHASE_MEGA_PULSE: Trailing dinâmico com verificação de Gás
-        if roi >= self.phase_profit_lock_trigger:
+        if p >= (ladder["profit_lock_trigger"] if is_buy else -ladder["profit_lock_trigger"]):
+            gap = ladder["trailing_gap"]
+            trail_raw = current_price - gap if is_buy else current_price + gap
+            lock_raw = ladder["profit_lock_raw"]
+            best_raw = max(lock_raw, trail_raw) if is_buy else min(lock_raw, trail_raw)
+            # Neither the 80% lock nor the trailing stop can improve the SL: nothing to ask Redis
+            if current_sl > 0 and (best_raw if is_buy else -best_raw) + ladder["half_tick"] <= sl:
+                return False, None, None
+
             gas_favorable = await self._check_gas_favorable(symbol, side)
-            
             if gas_favorable:
                 # Trailing Profit Mode: SL segue com gap de 20% ROI
-                target_stop_roi = max(80.0, roi - self.mega_pulse_trailing_gap)
+                new_stop = self._round_to_tick(best_raw, ladder["tick"])
                 phase_label = "MEGA_PULSE"
             else:
                 # Gás desfavorável: Travar em 80% do lucro (PROFIT_LOCK)
-                target_stop_roi = 80.0
+                new_stop = ladder["profit_lock_stop"]
                 phase_label = "PROFIT_LOCK"
             
-            price_offset_pct = target_stop_roi / (self.leverage * 100)
-            new_stop = entry * (1 + price_offset_pct) if side_norm == "buy" else entry * (1 - price_offset_pct)
-            
-            from services.bybit_rest import bybit_rest_service
-            new_stop = await bybit_rest_service.round_price(symbol, new_stop)
-            
             # Só atualiza se for melhoria
-            if (side_norm == "buy" and new_stop > current_sl) or (side_norm == "sell" and (current_sl == 0 or new_stop < current_sl)):
+            if (is_buy and new_stop > current_sl) or (not is_buy and (current_sl == 0 or new_stop < current_sl)):
                 logger.info(f"💎 SNIPER {phase_label}: {symbol} ROI={roi:.1f}% | Gás={'OK' if gas_favorable else 'CONTRA'} | SL: {new_stop:.6f}")
                 return False, None, new_stop
             
             return False, None, None
 
         # 🛡️ PHASE_RISK_ZERO: Mover SL para entry quando ROI >= 30%
-        if roi >= self.phase_risk_zero_trigger:
-            target_stop_roi = 0.0  # SL na entrada (Risk Zero)
-            
-            price_offset_pct = target_stop_roi / (self.leverage * 100)  # = 0
-            new_stop = entry * (1 + price_offset_pct) if side_norm == "buy" else entry * (1 - price_offset_pct)
-            
-            from services.bybit_rest import bybit_rest_service
-            new_stop = await bybit_rest_service.round_price(symbol, new_stop)
+        if p >= (ladder["risk_zero_trigger"] if is_buy else -ladder["risk_zero_trigger"]):
+            new_stop = ladder["risk_zero_stop"]
             
             # Só atualiza se SL ainda não está na entry ou melhor
-            if side_norm == "buy":
-                if current_sl < new_stop:
-                    logger.info(f"🛡️ SNIPER RISK_ZERO: {symbol} ROI={roi:.1f}% | SL → Entry: {new_stop:.6f}")
-                    return False, None, new_stop
-            else:
-                if current_sl == 0 or current_sl > new_stop:
-                    logger.info(f"🛡️ SNIPER RISK_ZERO: {symbol} ROI={roi:.1f}% | SL → Entry: {new_stop:.6f}")
-                    return False, None, new_stop
+            if (is_buy and current_sl < new_stop) or (not is_buy and (current_sl == 0 or current_sl > new_stop)):
+                logger.info(f"🛡️ SNIPER RISK_ZERO: {symbol} ROI={roi:.1f}% | SL → Entry: {new_stop:.6f}")
+                return False, None, new_stop
         
         # 🔴 PHASE_SAFE: Manter SL inicial (-50% ROI)
         # Nenhuma ação necessária, SL já foi definido na abertura
@@ -7,6 +7,9 @@ import datetime
 
 logger = logging.getLogger("FirebaseService")
 
+# V11.17: Slot fields whose writes bypass the write-behind tick (open/reset, SL moves)
+CRITICAL_SLOT_FIELDS = frozenset({"symbol", "current_stop"})
+
 
 
 # Define Private Key safely as a Python multiline string to avoid string escaping hell
@@ -31,6 +34,19 @@ class FirebaseService:
         self._consecutive_failures = 0
         self._last_successful_op = time.time()
         self._reconnect_attempts = 0
+        # V11.16: slots_ativos mirror driven by a Firestore on_snapshot listener
+        self._loop = None
+        self._slots_watch = None
+        self._slots_mirror_ready = False
+        self._slots_confirmed_at = 0.0 # Last snapshot (or resync read) that confirmed the mirror
+        self._slots_changed = asyncio.Event()
+        self.slots_version = 0
+        self.slots_stats = {"snapshots": 0, "resync_reads": 0, "mirror_reads": 0}
+        # V11.17: Write-behind slot batcher (merged fields per slot, flushed once per tick)
+        self._pending_slot_writes = {} # {slot_id: {field: value}}
+        self._inflight_slot_writes = {} # Being committed right now (kept visible to snapshots)
+        self._slot_flush_lock = asyncio.Lock()
+        self.slot_write_stats = {"update_calls": 0, "flushes": 0, "critical_flushes": 0, "doc_writes": 0, "failed_flushes": 0}
 
     async def initialize(self):
         """Asynchronously initializes the Firebase Admin SDK."""
@@ -108,6 +124,7 @@ class FirebaseService:
 
                     self.is_active = True
                     logger.info("Firebase Admin SDK initialized successfully.")
+                    self._start_slots_listener()
                     
                     # Flush buffers if we just reconnected
                     asyncio.create_task(self._flush_buffers())
@@ -256,14 +273,23 @@ class FirebaseService:
             return []
 
     async def log_trade(self, trade_data: dict):
-        """Logs a completed trade to history."""
-        if not self.is_active: return
-        try:
-            trade_data["timestamp"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-            await asyncio.to_thread(self.db.collection("trade_history").add, trade_data)
-            logger.info(f"Trade history logged for {trade_data.get('symbol')}")
-        except Exception as e:
-            logger.error(f"Error logging trade: {e}")
+        """Logs a completed trade to history. V11.18: Mirrored to the local trade store."""
+        from services.trade_store import trade_store
+        from services.trade_aggregates import trade_aggregates
+        trade_data["timestamp"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        # V11.19: History write + aggregate fold are one step for load()/reconcile()
+        async with trade_aggregates.lock:
+            doc_id = None
+            if self.is_active:
+                try:
+                    _, doc_ref = await asyncio.to_thread(self.db.collection("trade_history").add, trade_data)
+                    doc_id = doc_ref.id
+                    logger.info(f"Trade history logged for {trade_data.get('symbol')}")
+                except Exception as e:
+                    logger.error(f"Error logging trade: {e}")
+            await trade_store.append(trade_data, doc_id=doc_id)
+            # V11.19: O(1) running aggregates (memory + Firestore Increment)
+            await trade_aggregates.record(trade_data)
 
     async def get_trade_history(self, limit: int = 50, last_timestamp: str = None):
         """
@@ -289,13 +315,85 @@ class FirebaseService:
             logger.error(f"Error fetching trade history: {e}")
             return []
 
+    # --- V11.16: slots_ativos Snapshot Mirror ---
+
+    def _start_slots_listener(self):
+        """Subscribes to slots_ativos; every snapshot replaces the local mirror."""
+        try:
+            self._loop = asyncio.get_running_loop()
+            self.stop_slots_listener()
+            self._slots_watch = self.db.collection("slots_ativos").on_snapshot(self._on_slots_snapshot)
+            logger.info("📡 V11.16: slots_ativos snapshot listener ACTIVE (reads served from memory).")
+        except Exception as e:
+            self._slots_watch = None
+            logger.error(f"Error starting slots listener: {e}")
+
+    def stop_slots_listener(self):
+        if self._slots_watch is not None:
+            try:
+                self._slots_watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Error stopping slots listener: {e}")
+            self._slots_watch = None
+        self._slots_mirror_ready = False
+
+    def _on_slots_snapshot(self, docs, changes, read_time):
+        """Runs on the Firestore watch thread: hand the data to the event loop."""
+        try:
+            data = [doc.to_dict() for doc in docs]
+            if self._loop and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._apply_slots_snapshot, data)
+        except Exception as e:
+            logger.error(f"Error handling slots snapshot: {e}")
+
+    def _apply_slots_snapshot(self, data: list):
+        if not data:
+            return
+        data.sort(key=lambda s: s.get("id", 0))
+        self._overlay_pending_slot_writes(data)
+        changed = self._slots_signature(data) != self._slots_signature(self.slots_cache)
+        self.slots_cache = data
+        self._slots_mirror_ready = True
+        self._slots_confirmed_at = time.time()
+        self.slots_stats["snapshots"] += 1
+        self._consecutive_failures = 0
+        self._last_successful_op = self._slots_confirmed_at
+        if changed:
+            self._notify_slots_changed()
+
+    @staticmethod
+    def _slots_signature(slots: list) -> tuple:
+        """Fields that matter to waiters (occupancy, side, stops). PnL/visual updates don't wake anyone."""
+        return tuple((s.get("id"), s.get("symbol"), s.get("side"), s.get("entry_price"), s.get("current_stop")) for s in slots)
+
+    def _notify_slots_changed(self):
+        self.slots_version += 1
+        event, self._slots_changed = self._slots_changed, asyncio.Event()
+        event.set()
+
+    async def wait_slots_change(self, timeout: float) -> bool:
+        """Sleeps until the slot state changes or `timeout` elapses. True if it changed."""
+        event = self._slots_changed
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
     async def get_active_slots(self):
         # Resilience: If Firebase is temporarily inactive, return the last known good slots
         if not self.is_active: 
             return self.slots_cache
-            
-        # Debounce: If we fetched less than 2s ago, return cache immediately to save quota
+
+        # V11.16: Served from the listener mirror; one resync read per quiet SLOTS_RESYNC_SEC
         now_time = time.time()
+        if self._slots_mirror_ready and (now_time - self._slots_confirmed_at) < settings.SLOTS_RESYNC_SEC:
+            self.slots_stats["mirror_reads"] += 1
+            return self.slots_cache
+        if self._slots_watch is None and self.db is not None:
+            self._start_slots_listener()
+
+        # Debounce: If we fetched less than 2s ago, return cache immediately to save quota
         if hasattr(self, 'last_slots_fetch') and (now_time - self.last_slots_fetch) < 2.0:
             return self.slots_cache
 
@@ -309,8 +407,14 @@ class FirebaseService:
             data = await asyncio.wait_for(asyncio.to_thread(_get_slots), timeout=20.0)
             
             if data and len(data) >= 1:
+                self._overlay_pending_slot_writes(data)
+                changed = self._slots_signature(data) != self._slots_signature(self.slots_cache)
                 self.slots_cache = data
                 self.last_slots_fetch = now_time
+                self._slots_confirmed_at = now_time
+                self.slots_stats["resync_reads"] += 1
+                if changed:
+                    self._notify_slots_changed()
                 # V10.6.5: Reset failure counter on success
                 self._consecutive_failures = 0
                 self._last_successful_op = now_time
@@ -328,25 +432,98 @@ class FirebaseService:
             
         return self.slots_cache
 
-    async def update_slot(self, slot_id: int, data: dict):
+    async def update_slot(self, slot_id: int, data: dict, critical: bool = False):
+        """
+        V11.17: Write-behind. The local cache is updated at once; the fields are
+        merged into the slot's pending write and flushed by slot_write_loop
+        (one Firestore WriteBatch + one RTDB multi-path update per tick).
+        Critical writes (slot open/reset, SL change) flush immediately.
+        """
         # Update cache first
+        before = self._slots_signature(self.slots_cache)
         for s in self.slots_cache:
             if s["id"] == slot_id:
                 s.update(data)
                 break
-                
-        if not self.is_active: return data
-        try:
-            # Sync to Firestore
-            await asyncio.wait_for(asyncio.to_thread(self.db.collection("slots_ativos").document(str(slot_id)).set, data, merge=True), timeout=5.0)
-            
-            # V5.2.5: Sync to Realtime DB for instant PWA updates
-            if self.rtdb:
-                await asyncio.to_thread(self.rtdb.child("slots").child(str(slot_id)).update, data)
-        except Exception as e:
-            logger.error(f"Error updating slot {slot_id} to RTDB: {e}")
+        if self._slots_signature(self.slots_cache) != before:
+            self._notify_slots_changed() # V11.16: Changed locally, wake waiters now
+
+        self._pending_slot_writes.setdefault(slot_id, {}).update(data)
+        self.slot_write_stats["update_calls"] += 1
+
+        if not self.is_active: return data # Kept pending until Firebase is back
+        if critical or not CRITICAL_SLOT_FIELDS.isdisjoint(data):
+            self.slot_write_stats["critical_flushes"] += 1
+            await self.flush_slot_writes()
         return data
 
+    def _overlay_pending_slot_writes(self, slots: list):
+        """Un-flushed local writes win over (older) server state."""
+        for s in slots:
+            for pending in (self._inflight_slot_writes.get(s.get("id")), self._pending_slot_writes.get(s.get("id"))):
+                if pending:
+                    s.update(pending)
+
+    async def flush_slot_writes(self):
+        """Commits every pending slot write: one WriteBatch + one RTDB multi-path update."""
+        async with self._slot_flush_lock:
+            if not self._pending_slot_writes or not self.is_active:
+                return
+            pending, self._pending_slot_writes = self._pending_slot_writes, {}
+            self._inflight_slot_writes = pending
+            try:
+                def _commit_batch():
+                    batch = self.db.batch()
+                    for slot_id, fields in pending.items():
+                        batch.set(self.db.collection("slots_ativos").document(str(slot_id)), fields, merge=True)
+                    batch.commit()
+
+                await asyncio.wait_for(asyncio.to_thread(_commit_batch), timeout=5.0)
+                self.slot_write_stats["flushes"] += 1
+                self.slot_write_stats["doc_writes"] += len(pending)
+            except Exception as e:
+                # Re-queue under any newer fields written meanwhile
+                for slot_id, fields in pending.items():
+                    fields.update(self._pending_slot_writes.get(slot_id, {}))
+                    self._pending_slot_writes[slot_id] = fields
+                self._inflight_slot_writes = {}
+                self.slot_write_stats["failed_flushes"] += 1
+                logger.error(f"Error flushing slot writes ({len(pending)} slots): {e}")
+                return
+
+            self._inflight_slot_writes = {}
+            # V5.2.5: Sync to Realtime DB for instant PWA updates (multi-path, single round-trip)
+            if self.rtdb:
+                paths = {f"slots/{slot_id}/{k}": v for slot_id, fields in pending.items() for k, v in fields.items()}
+                try:
+                    await asyncio.wait_for(asyncio.to_thread(self.rtdb.update, paths), timeout=5.0)
+                except Exception as e:
+                    logger.error(f"Error updating slots to RTDB: {e}")
+
+    async def slot_write_loop(self):
+        """V11.17: Flushes coalesced slot writes once per tick."""
+        logger.info(f"🧾 V11.17: Slot write-behind batcher active (tick {settings.SLOT_FLUSH_INTERVAL_SEC}s).")
+        while True:
+            try:
+                await self.flush_slot_writes()
+            except Exception as e:
+                logger.error(f"Error in slot_write_loop: {e}")
+            await asyncio.sleep(settings.SLOT_FLUSH_INTERVAL_SEC)
+
+    def get_slot_write_metrics(self) -> dict:
+        """Write amplification saved vs. the old 2 round-trips (Firestore + RTDB) per update_slot call."""
+        st = self.slot_write_stats
+        legacy = st["update_calls"] * 2
+        actual = st["flushes"] * (2 if self.rtdb else 1)
+        return {
+            **st,
+            "pending_slots": len(self._pending_slot_writes),
+            "legacy_round_trips": legacy,
+            "round_trips": actual,
+            "round_trips_saved": legacy - actual,
+            "saved_pct": round((1 - actual / legacy) * 100, 1) if legacy else 0.0,
+        }
+
     async def log_signal(self, signal_data: dict):
         # 1. Add to local buffer immediately
         signal_data["id"] = f"loc_{int(time.time() * 1000)}"
@@ -503,15 +680,17 @@ class FirebaseService:
             await asyncio.wait_for(asyncio.to_thread(self.rtdb.child("live_slots").update, slots_data), timeout=3.0)
         except Exception: pass
 
-    async def update_radar_batch(self, batch_data: dict):
-        """Updates multiple symbols in RTDB in a single operation."""
-        if not self.is_active or not self.rtdb: return
+    async def update_radar_batch(self, batch_data: dict) -> bool:
+        """Updates multiple symbols in RTDB in a single operation. V11.15: Returns success."""
+        if not self.is_active or not self.rtdb: return False
         try:
             # Note: In RTDB, update/set at the root or a subpath is efficient.
             # V5.2.4.3: Added 3s timeout
             await asyncio.wait_for(asyncio.to_thread(self.rtdb.child("market_radar").update, batch_data), timeout=3.0)
+            return True
         except Exception as e:
             logger.error(f"Error updating radar batch: {e}")
+            return False
 
     # --- Operação Oráculo: Chat Memory ---
     async def get_chat_history(self, limit: int = 15):
@@ -565,8 +744,12 @@ class FirebaseService:
             logger.error(f"Error clearing chat history: {e}")
 
     async def get_slot(self, slot_id: int) -> dict:
-        """Fetch a specific slot state from Firestore."""
+        """Fetch a specific slot state from Firestore. V11.16: From the mirror when live."""
         if not self.is_active: return None
+        if self._slots_mirror_ready:
+            for s in self.slots_cache:
+                if s.get("id") == slot_id:
+                    return dict(s)
         try:
             doc_ref = self.db.collection("slots_ativos").document(str(slot_id))
             doc = await asyncio.to_thread(doc_ref.get)
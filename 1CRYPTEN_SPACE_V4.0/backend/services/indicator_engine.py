@@ -0,0 +1,183 @@
+"""
+V11.4: Incremental Indicator Engine
+====================================
+Wilder ATR(14), Wilder RSI(14) and SMA20 per (symbol, interval), advanced in
+O(1) each time the candle aggregator closes a bar. Cost per update does not
+depend on how much history a symbol has, only on how many bars close.
+
+The forming bar can be previewed on top of the committed state (also O(1)),
+so consumers still get values that move inside the hour.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from services.candle_aggregator import candle_aggregator
+
+logger = logging.getLogger("IndicatorEngine")
+
+
+class _WilderState:
+    """Smoothed state for one (symbol, interval). Bars: [start, o, h, l, c, ...]."""
+    __slots__ = (
+        "atr_period", "rsi_period", "sma_period", "last_start", "prev_close",
+        "count", "tr_sum", "gain_sum", "loss_sum", "atr", "avg_gain", "avg_loss",
+        "sma_window", "sma_sum",
+    )
+
+    def __init__(self, atr_period: int, rsi_period: int, sma_period: int):
+        self.atr_period = atr_period
+        self.rsi_period = rsi_period
+        self.sma_period = sma_period
+        self.last_start = -1.0
+        self.prev_close: Optional[float] = None
+        self.count = 0          # Bars with a previous close (TR / change available)
+        self.tr_sum = 0.0       # Seed accumulators (first `period` bars)
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.atr: Optional[float] = None
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self.sma_window = deque(maxlen=sma_period)
+        self.sma_sum = 0.0
+
+    def update(self, bar) -> bool:
+        start, high, low, close = bar[0], bar[2], bar[3], bar[4]
+        if start <= self.last_start:
+            return False  # Already applied (replay / warmup overlap)
+        self.last_start = start
+
+        if len(self.sma_window) == self.sma_period:
+            self.sma_sum -= self.sma_window[0]
+        self.sma_window.append(close)
+        self.sma_sum += close
+
+        prev = self.prev_close
+        self.prev_close = close
+        if prev is None:
+            return True
+
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        change = close - prev
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+
+        if self.atr is None:
+            self.tr_sum += tr
+            if self.count == self.atr_period:
+                self.atr = self.tr_sum / self.atr_period
+        else:
+            self.atr = (self.atr * (self.atr_period - 1) + tr) / self.atr_period
+
+        if self.avg_gain is None:
+            self.gain_sum += gain
+            self.loss_sum += loss
+            if self.count == self.rsi_period:
+                self.avg_gain = self.gain_sum / self.rsi_period
+                self.avg_loss = self.loss_sum / self.rsi_period
+        else:
+            self.avg_gain = (self.avg_gain * (self.rsi_period - 1) + gain) / self.rsi_period
+            self.avg_loss = (self.avg_loss * (self.rsi_period - 1) + loss) / self.rsi_period
+        return True
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def values(self, forming=None) -> dict:
+        """Committed values, or a preview with the forming bar applied on top."""
+        atr, avg_gain, avg_loss = self.atr, self.avg_gain, self.avg_loss
+        sma_sum, sma_n = self.sma_sum, len(self.sma_window)
+
+        if forming is not None and forming[0] > self.last_start and self.prev_close is not None:
+            high, low, close = forming[2], forming[3], forming[4]
+            prev = self.prev_close
+            if atr is not None:
+                tr = max(high - low, abs(high - prev), abs(low - prev))
+                atr = (atr * (self.atr_period - 1) + tr) / self.atr_period
+            if avg_gain is not None:
+                change = close - prev
+                avg_gain = (avg_gain * (self.rsi_period - 1) + (change if change > 0 else 0.0)) / self.rsi_period
+                avg_loss = (avg_loss * (self.rsi_period - 1) + (-change if change < 0 else 0.0)) / self.rsi_period
+            if sma_n == self.sma_period:
+                sma_sum += close - self.sma_window[0]
+            else:
+                sma_sum += close
+                sma_n += 1
+
+        return {
+            "atr": atr,
+            "rsi": self._rsi(avg_gain, avg_loss) if avg_gain is not None else None,
+            "sma": (sma_sum / sma_n) if sma_n else None,
+        }
+
+
+class IndicatorEngine:
+    def __init__(self, atr_period: int = 14, rsi_period: int = 14, sma_period: int = 20):
+        self.atr_period = atr_period
+        self.rsi_period = rsi_period
+        self.sma_period = sma_period
+        self._states: Dict[Tuple[str, str], _WilderState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _norm(symbol: str) -> str:
+        return (symbol or "").replace(".P", "").upper()
+
+    def _state(self, key: Tuple[str, str]) -> _WilderState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _WilderState(self.atr_period, self.rsi_period, self.sma_period)
+        return state
+
+    def on_bar_close(self, symbol: str, interval: str, bar: list):
+        """Candle aggregator close listener (WS thread). O(1)."""
+        key = (self._norm(symbol), interval)
+        with self._lock:
+            self._state(key).update(bar)
+
+    def warmup(self, symbol: str, interval: str = "60"):
+        """
+        Rebuilds the state from scratch out of the aggregator's closed history
+        (after the REST backfill put older bars behind the live ones). Every
+        call rebuilds; the result matches the live-updated state.
+        """
+        key = (self._norm(symbol), interval)
+        with self._lock:
+            # Read under our lock: a bar closing meanwhile waits for the new state
+            # (the aggregator runs close listeners after releasing its own lock)
+            bars = candle_aggregator.get_bars(key[0], interval, 0, include_current=False)
+            if not bars:
+                return
+            self._states[key] = state = _WilderState(self.atr_period, self.rsi_period, self.sma_period)
+            for bar in bars:
+                state.update(bar)
+
+    def is_ready(self, symbol: str, interval: str = "60") -> bool:
+        state = self._states.get((self._norm(symbol), interval))
+        return bool(state and state.atr is not None and state.avg_gain is not None)
+
+    def get_values(self, symbol: str, interval: str = "60", live: bool = True) -> dict:
+        """
+        {'atr', 'rsi', 'sma'} for (symbol, interval). With live=True the bar
+        still forming in the aggregator is previewed on top of the state.
+        """
+        key = (self._norm(symbol), interval)
+        forming = None
+        if live:
+            current = candle_aggregator.get_bars(key[0], interval, 1)
+            forming = current[-1] if current else None
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return {"atr": None, "rsi": None, "sma": None}
+            return state.values(forming)
+
+
+indicator_engine = IndicatorEngine()
+candle_aggregator.add_close_listener(indicator_engine.on_bar_close)
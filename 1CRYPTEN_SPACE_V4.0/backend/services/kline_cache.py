@@ -0,0 +1,93 @@
+"""
+V11.10: Shared Kline Cache
+===========================
+Klines keyed by (symbol, interval) for readers that need history the local
+candle aggregator does not have yet (or intervals it does not build).
+
+- Served from the aggregator when it already holds enough bars.
+- Otherwise the first read fetches the full window once; later reads only
+  request the candles newer than the last cached one (plus the forming bar).
+- All requests go through the shared async client (no per-call sessions,
+  nothing blocks the event loop). Concurrent readers of one key share a fetch.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Tuple
+
+from services.candle_aggregator import candle_aggregator
+
+logger = logging.getLogger("KlineCache")
+
+# Bybit interval label -> milliseconds
+INTERVAL_MS: Dict[str, int] = {
+    "1": 60_000, "3": 180_000, "5": 300_000, "15": 900_000, "30": 1_800_000,
+    "60": 3_600_000, "120": 7_200_000, "240": 14_400_000, "360": 21_600_000,
+    "720": 43_200_000, "D": 86_400_000,
+}
+
+
+class KlineCache:
+    def __init__(self, max_bars: int = 200, min_refresh_sec: float = 15.0):
+        self.max_bars = max_bars
+        self.min_refresh_sec = min_refresh_sec  # Forming bar is re-pulled at most this often
+        self._entries: Dict[Tuple[str, str], dict] = {}  # {(symbol, interval): {"bars": [...], "fetched_at": ts}}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.stats = {"aggregator_hits": 0, "cache_hits": 0, "full_fetches": 0, "incremental_fetches": 0}
+
+    @staticmethod
+    def _norm(symbol: str) -> str:
+        return (symbol or "").replace(".P", "").upper()
+
+    async def get_klines(self, symbol: str, interval: str = "60", limit: int = 24) -> list:
+        """Bybit kline shape: newest first, [start, open, high, low, close, volume, turnover]."""
+        symbol = self._norm(symbol)
+        if candle_aggregator.has_history(symbol, interval, limit):
+            self.stats["aggregator_hits"] += 1
+            return candle_aggregator.get_klines(symbol, interval, limit)
+
+        key = (symbol, interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and len(entry["bars"]) >= limit and time.time() - entry["fetched_at"] < self.min_refresh_sec:
+                self.stats["cache_hits"] += 1
+            else:
+                await self._refresh(key, limit)
+                entry = self._entries.get(key)
+            if not entry:
+                return []
+            return list(reversed(entry["bars"][-limit:]))
+
+    async def _refresh(self, key: Tuple[str, str], limit: int):
+        from services.bybit_rest import bybit_rest_service
+        symbol, interval = key
+        entry = self._entries.get(key)
+        interval_ms = INTERVAL_MS.get(interval)
+
+        missing = None
+        if entry and entry["bars"] and interval_ms and len(entry["bars"]) >= limit:
+            # Only the bars after the last cached start (the last one is re-pulled: it was forming)
+            last_start = int(entry["bars"][-1][0])
+            missing = int((time.time() * 1000 - last_start) // interval_ms) + 1
+
+        if missing is not None and missing < limit:
+            fresh = await bybit_rest_service.get_trade_klines(symbol, interval=interval, limit=missing)
+            if not fresh:
+                return
+            self.stats["incremental_fetches"] += 1
+            fresh = list(reversed(fresh))
+            first_new = int(fresh[0][0])
+            bars = [b for b in entry["bars"] if int(b[0]) < first_new] + fresh
+        else:
+            fresh = await bybit_rest_service.get_trade_klines(symbol, interval=interval, limit=max(limit, 1))
+            if not fresh:
+                return
+            self.stats["full_fetches"] += 1
+            bars = list(reversed(fresh))
+
+        self._entries[key] = {"bars": bars[-max(self.max_bars, limit):], "fetched_at": time.time()}
+
+
+kline_cache = KlineCache()
@@ -0,0 +1,226 @@
+"""
+V11.22: Paper Trading Write-Ahead Journal
+==========================================
+Replaces the full paper_storage.json rewrite (json.dump indent=2, on the event
+loop, on every order/stop/close, history cut to 50) with:
+
+- Journal (paper_journal.log): one compact JSON line per change
+  ("open" / "amend" / "close"), numbered by a sequence. append() only buffers
+  the line; a background writer flushes the buffer in batches (one write and
+  one fsync per batch) in asyncio.to_thread.
+- Snapshot (paper_storage.json, same shape as before plus "journal_seq"):
+  written every PAPER_SNAPSHOT_EVERY records or PAPER_SNAPSHOT_SEC
+  (tmp file + fsync + os.replace), then the journal is truncated.
+  This is the compaction step.
+- Replay: load the snapshot, then apply the journal records with
+  seq > journal_seq. A torn last line (crash mid-write) is ignored.
+  The paper history is kept in full.
+
+A snapshot without "journal_seq" (legacy file, or reset by a maintenance
+script) is authoritative: the journal is treated as stale and discarded.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, List, Optional
+
+from config import settings
+
+logger = logging.getLogger("PaperJournal")
+
+
+class PaperJournal:
+    def __init__(self, journal_path: str, snapshot_path: str = "paper_storage.json"):
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.seq = 0                      # Last sequence assigned
+        self.snapshot_seq = 0             # Last sequence covered by the snapshot on disk
+        self._buffer: List[str] = []      # Serialized records not yet on disk
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._state_fn: Optional[Callable[[], dict]] = None
+        self._fh = None
+        self.last_snapshot_at = time.time()
+        self.stats = {"records": 0, "written": 0, "batches": 0, "fsyncs": 0, "snapshots": 0, "replayed": 0, "max_batch": 0}
+
+    # ---------- Replay ----------
+
+    def attach(self, state_fn: Callable[[], dict], snapshot_path: Optional[str] = None):
+        """state_fn returns {positions, balance, history}; called on the loop when compacting."""
+        self._state_fn = state_fn
+        if snapshot_path:
+            self.snapshot_path = snapshot_path
+
+    def replay(self, default_balance: float) -> dict:
+        """Startup only: snapshot + journal tail → {positions, balance, history}."""
+        state = {"positions": [], "balance": default_balance, "history": []}
+        journal_valid = False
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                data = json.load(f)
+            state["positions"] = data.get("positions", [])
+            state["balance"] = data.get("balance", default_balance)
+            state["history"] = data.get("history", [])
+            journal_valid = "journal_seq" in data
+            self.snapshot_seq = self.seq = int(data.get("journal_seq", 0))
+
+        if os.path.exists(self.journal_path):
+            if not journal_valid and os.path.exists(self.snapshot_path):
+                logger.warning("📒 [PAPER] Snapshot has no journal_seq (legacy/reset). Discarding stale journal.")
+                os.remove(self.journal_path)
+            else:
+                applied = 0
+                with open(self.journal_path, "r") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            logger.warning("📒 [PAPER] Torn journal tail ignored.")
+                            break
+                        if record.get("seq", 0) <= self.seq:
+                            continue  # Covered by the snapshot (or a retried batch)
+                        if record["seq"] != self.seq + 1:
+                            # Snapshot replaced/removed behind our back: the tail no longer lines up
+                            logger.warning(f"📒 [PAPER] Journal gap at seq {record['seq']} (expected {self.seq + 1}). Tail ignored.")
+                            break
+                        self._apply(state, record)
+                        self.seq = record["seq"]
+                        applied += 1
+                self.stats["replayed"] = applied
+                if applied:
+                    logger.info(f"📒 V11.22: Replayed {applied} journal records (seq {self.snapshot_seq + 1}..{self.seq}).")
+        return state
+
+    @staticmethod
+    def _apply(state: dict, record: dict):
+        op = record.get("op")
+        positions = state["positions"]
+        if op == "open":
+            pos = record["pos"]
+            state["positions"] = positions = [p for p in positions if p["symbol"] != pos["symbol"]]
+            positions.append(pos)
+        elif op == "amend":
+            for p in positions:
+                if p["symbol"] == record["symbol"]:
+                    p.update(record["fields"])
+        elif op == "close":
+            state["positions"] = [p for p in positions if p["symbol"].upper() != record["symbol"]]
+            if record.get("entry"):
+                state["history"].append(record["entry"])
+            state["balance"] = record["balance"]
+
+    # ---------- Append (event loop, non-blocking) ----------
+
+    def append(self, op: str, **fields):
+        """Buffers one record; the writer loop makes it durable within PAPER_JOURNAL_FLUSH_SEC."""
+        self.seq += 1
+        record = {"seq": self.seq, "op": op, "ts": int(time.time() * 1000), **fields}
+        self._buffer.append(json.dumps(record, separators=(",", ":"), default=str))
+        self.stats["records"] += 1
+        self._wakeup.set()
+
+    # ---------- Writer ----------
+
+    def _write_lines(self, lines: List[str]):
+        if self._fh is None:
+            self._fh = open(self.journal_path, "a", encoding="utf-8")
+        self._fh.write("\n".join(lines) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def _write_snapshot(self, state: dict, seq: int):
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({**state, "journal_seq": seq}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # Everything written so far is covered by the snapshot: start a fresh journal
+        if self._fh is not None:
+            self._fh.close()
+        self._fh = open(self.journal_path, "w", encoding="utf-8")
+        os.fsync(self._fh.fileno())
+
+    async def flush(self):
+        """Writes the buffered records (one write + one fsync)."""
+        async with self._write_lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write_lines, lines)
+                self.stats["batches"] += 1
+                self.stats["written"] += len(lines)
+                self.stats["fsyncs"] += 1
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(lines))
+            except Exception as e:
+                logger.error(f"❌ [PAPER] Journal write failed: {e}")
+                self._buffer[:0] = lines  # Keep order; retried next flush
+
+    async def compact(self):
+        """Snapshot of the live state, then journal truncation (off the event loop)."""
+        if self._state_fn is None:
+            return
+        async with self._write_lock:
+            # State and seq are captured together on the loop: the snapshot covers every
+            # record assigned so far, so the buffered ones are dropped with the old journal.
+            state, seq = self._state_fn(), self.seq
+            pending, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write_snapshot, state, seq)
+                self.snapshot_seq = seq
+                self.last_snapshot_at = time.time()
+                self.stats["snapshots"] += 1
+                logger.info(f"📒 V11.22: Paper snapshot written (seq {seq}, {len(state.get('history', []))} history entries).")
+            except Exception as e:
+                logger.error(f"❌ [PAPER] Snapshot failed: {e}")
+                self._buffer[:0] = pending
+
+    def _compaction_due(self) -> bool:
+        return (self.seq - self.snapshot_seq >= settings.PAPER_SNAPSHOT_EVERY or
+                (self.seq > self.snapshot_seq and time.time() - self.last_snapshot_at >= settings.PAPER_SNAPSHOT_SEC))
+
+    async def run(self):
+        """Background writer: batches fsyncs every PAPER_JOURNAL_FLUSH_SEC, compacts when due."""
+        logger.info(f"📒 V11.22: Paper journal writer ACTIVE ({self.journal_path}, flush {settings.PAPER_JOURNAL_FLUSH_SEC}s).")
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.PAPER_SNAPSHOT_SEC)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                # Lets a burst (open + amend + close in the same tick) share one fsync
+                await asyncio.sleep(settings.PAPER_JOURNAL_FLUSH_SEC)
+                if self._compaction_due():
+                    await self.compact()
+                else:
+                    await self.flush()
+            except Exception as e:
+                logger.error(f"Error in paper journal writer: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        """Shutdown: final snapshot so the next start replays nothing."""
+        if self.seq > self.snapshot_seq:
+            await self.compact()
+        await self.flush()
+        if self._fh is not None:
+            await asyncio.to_thread(self._fh.close)
+            self._fh = None
+
+    def get_metrics(self) -> dict:
+        return {
+            **self.stats,
+            "seq": self.seq,
+            "snapshot_seq": self.snapshot_seq,
+            "pending_records": len(self._buffer),
+            "journal_records": self.seq - self.snapshot_seq,
+            "avg_batch": round(self.stats["written"] / self.stats["batches"], 2) if self.stats["batches"] else 0.0,
+        }
+
+
+paper_journal = PaperJournal(settings.PAPER_JOURNAL_PATH)
@@ -0,0 +1,159 @@
+"""
+V11.21: Tick-driven Paper Matching Engine
+==========================================
+The paper execution loop evaluates positions once per second against the
+board price, so a wick that crosses the SL (or TP) and comes back between
+two polls is never filled. This engine matches every public trade print
+instead, like the exchange's LastPrice trigger does:
+
+- One trigger band per open paper position: (lo, hi). A Buy fires at
+  price <= lo (stop) or price >= hi (take profit); a Sell is mirrored.
+  Missing legs are +/-inf, so each print costs exactly two comparisons.
+- The stop leg is the tighter of the position's stopLoss and the -50% ROI
+  hard stop (execution_protocol.hard_stop_price, the same level
+  process_sniper_logic enforces).
+- The fill happens at the first crossing print's price (market fill after
+  trigger: gaps through the level are filled at the print, not the level).
+
+Trailing/ROI phase logic stays in run_paper_execution_loop; every SL change
+re-arms the band here. Runs on the WS thread; fills are handed to the loop
+with call_soon_threadsafe.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import settings
+from services.execution_protocol import execution_protocol
+
+logger = logging.getLogger("PaperMatching")
+
+_INF = math.inf
+
+
+class PaperMatchingEngine:
+    def __init__(self):
+        self.triggers: Dict[str, Tuple[float, float]] = {}  # {SYMBOL: (lo, hi)}
+        self._meta: Dict[str, dict] = {}  # {SYMBOL: {side, entry, sl, tp}} (loop thread only)
+        self.fill_latencies = deque(maxlen=200)  # Print ts → close settled (ms)
+        self.stats = {"fills": 0, "sl_fills": 0, "tp_fills": 0, "failed_fills": 0}
+
+    # ---------- Arming ----------
+
+    def arm(self, symbol: str, side: str, entry_price: float, stop_loss: float = 0, take_profit: float = 0):
+        """(Re)builds the trigger band of a position. Call on open and on every SL/TP change."""
+        symbol = symbol.replace(".P", "").upper()
+        if not settings.PAPER_TICK_MATCHING or entry_price <= 0:
+            self.disarm(symbol)
+            return
+        is_buy = (side or "").lower() == "buy"
+        hard = execution_protocol.hard_stop_price(entry_price, side)
+        if is_buy:
+            stop = max(stop_loss, hard) if stop_loss > 0 else hard
+            band = (stop, take_profit if take_profit > 0 else _INF)
+        else:
+            stop = min(stop_loss, hard) if stop_loss > 0 else hard
+            band = (take_profit if take_profit > 0 else -_INF, stop)
+        self._meta[symbol] = {"side": side, "entry": entry_price, "sl": stop_loss, "tp": take_profit, "hard": hard}
+        self.triggers[symbol] = band  # Single dict assignment: atomic for the WS thread
+
+    def arm_position(self, pos: dict):
+        """Arms from a paper position dict (Bybit schema, string fields)."""
+        self.arm(
+            pos["symbol"], pos.get("side", "Buy"), float(pos.get("avgPrice") or 0),
+            float(pos.get("stopLoss") or 0), float(pos.get("takeProfit") or 0),
+        )
+
+    def disarm(self, symbol: str):
+        symbol = symbol.replace(".P", "").upper()
+        self.triggers.pop(symbol, None)
+        self._meta.pop(symbol, None)
+
+    # ---------- Hot path (WS thread) ----------
+
+    def on_trades(self, symbol: str, prints: Iterable[tuple], loop: Optional[asyncio.AbstractEventLoop]):
+        """
+        Matches a batch of (ts_ms, price, size) prints in arrival order.
+        Fires at most once per position: the band is popped before the hand-off.
+        Without a running loop nothing can settle, so the band stays armed.
+        """
+        band = self.triggers.get(symbol)
+        if band is None or loop is None or not loop.is_running():
+            return
+        lo, hi = band
+        for ts, price, _size in prints:
+            if price <= lo or price >= hi:
+                # pop() makes the first thread to see the crossing the only one to fire
+                if self.triggers.pop(symbol, None) is not None:
+                    loop.call_soon_threadsafe(self._dispatch, symbol, price, ts, price <= lo)
+                return
+
+    # ---------- Fill (event loop) ----------
+
+    def _dispatch(self, symbol: str, price: float, print_ts: float, stop_side: bool):
+        asyncio.create_task(self._fill(symbol, price, print_ts, stop_side))
+
+    async def _fill(self, symbol: str, price: float, print_ts: float, stop_side: bool):
+        from services.bybit_rest import bybit_rest_service
+
+        meta = self._meta.get(symbol)
+        pos = next((p for p in bybit_rest_service.paper_positions if p["symbol"].upper() == symbol), None)
+        if not meta or not pos:
+            self._meta.pop(symbol, None)
+            return
+
+        is_buy = meta["side"].lower() == "buy"
+        # Buy: the stop is the low leg; Sell: the stop is the high leg
+        is_stop = stop_side if is_buy else not stop_side
+        roi = execution_protocol.calculate_roi(meta["entry"], price, meta["side"])
+        if not is_stop:
+            reason = f"SNIPER_TP ({roi:.1f}%)"
+        elif meta["sl"] > 0 and ((is_buy and meta["sl"] >= meta["hard"]) or (not is_buy and meta["sl"] <= meta["hard"])):
+            reason = f"SNIPER_SL_{execution_protocol.get_sl_phase(roi)} ({roi:.1f}%)"
+        else:
+            reason = f"SNIPER_SL_HARD_STOP ({roi:.1f}%)"
+        logger.info(f"⚡ [PAPER MATCH] {symbol} print @ {price} crossed {'SL' if is_stop else 'TP'} | ROI: {roi:.1f}% | {reason}")
+
+        try:
+            closed = await bybit_rest_service.settle_paper_close({
+                "symbol": symbol,
+                "side": pos["side"],
+                "size": float(pos["size"]),
+                "reason": reason,
+                "entry_price": meta["entry"],
+                "exit_price": price,
+            })
+        except Exception as e:
+            logger.error(f"[PAPER MATCH] Fill failed for {symbol}: {e}")
+            closed = False
+
+        if closed:
+            self.stats["fills"] += 1
+            self.stats["sl_fills" if is_stop else "tp_fills"] += 1
+            self.fill_latencies.append(time.time() * 1000 - print_ts)
+        else:
+            self.stats["failed_fills"] += 1
+            # Still open (lock held elsewhere, etc.): re-arm so the next print retries
+            pos = next((p for p in bybit_rest_service.paper_positions if p["symbol"].upper() == symbol), None)
+            if pos and symbol not in self.triggers:
+                self.arm_position(pos)
+
+    def get_metrics(self) -> dict:
+        lat = sorted(self.fill_latencies)
+        return {
+            **self.stats,
+            "armed_positions": len(self.triggers),
+            "triggers": {
+                s: {"lo": lo if math.isfinite(lo) else None, "hi": hi if math.isfinite(hi) else None}
+                for s, (lo, hi) in list(self.triggers.items())
+            },
+            "fill_latency_p50_ms": round(lat[len(lat) // 2], 1) if lat else 0.0,
+            "fill_latency_max_ms": round(lat[-1], 1) if lat else 0.0,
+        }
+
+
+paper_matching_engine = PaperMatchingEngine()
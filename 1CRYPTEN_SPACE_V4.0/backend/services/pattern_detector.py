@@ -0,0 +1,227 @@
+"""
+V11.11: Incremental Pattern Detector
+=====================================
+Pullbacks, liquidity sweeps, accumulation boxes and liquidity zones for the
+1H trend analysis, rebuilt on monotonic-deque sliding extremes.
+
+Closed bars are pushed once (O(1) amortized each); every window the
+detectors need is maintained as it slides. A call only folds in the bars
+that closed since the previous call and combines the state with the bar
+still forming, so the cost no longer grows with window length x lookback.
+
+Bars are chronological float/str lists: [start, open, high, low, close, ...].
+The last bar of every analyze() call is treated as the forming bar.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("PatternDetector")
+
+
+class SlidingExtremes:
+    """Max of highs and min of lows over the last `window` pushes (monotonic deques)."""
+    __slots__ = ("window", "_seq", "_max", "_min")
+
+    def __init__(self, window: int):
+        self.window = window
+        self._seq = 0
+        self._max = deque()  # (seq, high), highs strictly decreasing
+        self._min = deque()  # (seq, low), lows strictly increasing
+
+    def push(self, high: float, low: float):
+        seq = self._seq
+        self._seq += 1
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((seq, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((seq, low))
+        oldest = seq - self.window + 1
+        if self._max[0][0] < oldest:
+            self._max.popleft()
+        if self._min[0][0] < oldest:
+            self._min.popleft()
+
+    @property
+    def count(self) -> int:
+        return min(self._seq, self.window)
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+
+def sliding_max(values: List[float], window: int) -> List[float]:
+    """O(n) max of every full window (result[i] covers values[i:i+window])."""
+    out, dq = [], deque()
+    for i, v in enumerate(values):
+        while dq and values[dq[-1]] <= v:
+            dq.pop()
+        dq.append(i)
+        if dq[0] <= i - window:
+            dq.popleft()
+        if i >= window - 1:
+            out.append(values[dq[0]])
+    return out
+
+
+def sliding_min(values: List[float], window: int) -> List[float]:
+    """O(n) min of every full window (result[i] covers values[i:i+window])."""
+    return [-v for v in sliding_max([-v for v in values], window)]
+
+
+class PatternState:
+    """
+    Rolling detector state over closed bars for one (symbol, interval).
+    With lookback L the analysed frame is the last L-1 closed bars + the forming bar.
+    """
+
+    def __init__(self, lookback: int = 24, box_len: int = 10, box_tolerance: float = 0.005):
+        self.lookback = lookback
+        self.box_len = box_len
+        self.box_tolerance = box_tolerance
+        self.last_start = None
+        self.closed = 0
+        self.starts = deque(maxlen=lookback - 1)     # Start of every closed bar in the frame
+        self.last_close = None
+
+        self.ext_frame = SlidingExtremes(lookback - 1)  # 24h extremes (with forming)
+        self.ext_recent = SlidingExtremes(4)            # highs/lows[-5:] (with forming)
+        self.ext_curr = SlidingExtremes(2)              # highs/lows[-3:] (with forming)
+        self.ext_prev = SlidingExtremes(5)              # highs/lows[-10:-5] (history, 4 pushes back)
+        self.prev_hist = deque(maxlen=5)
+        half = lookback // 2
+        self.ext_first_half = SlidingExtremes(half)     # highs/lows[:12] (history, L-1-half pushes back)
+        self.first_half_hist = deque(maxlen=lookback - half)
+        self.ext_box = SlidingExtremes(box_len)
+        self.box_closes = deque(maxlen=box_len)
+        self.boxes = deque()                            # (window_start_ts, top, bottom)
+
+    def push(self, bar):
+        start = float(bar[0])
+        high, low, close = float(bar[2]), float(bar[3]), float(bar[4])
+        self.last_start = start
+        self.closed += 1
+        self.starts.append(start)
+        self.last_close = close
+
+        for ext in (self.ext_frame, self.ext_recent, self.ext_curr, self.ext_prev, self.ext_first_half, self.ext_box):
+            ext.push(high, low)
+        self.prev_hist.append((self.ext_prev.max, self.ext_prev.min))
+        self.first_half_hist.append((self.ext_first_half.max, self.ext_first_half.min))
+
+        # Accumulation box: a tight box_len window (range < tolerance of its first close)
+        self.box_closes.append(close)
+        if self.ext_box.count == self.box_len:
+            box_range = self.ext_box.max - self.ext_box.min
+            if box_range < self.box_closes[0] * self.box_tolerance:
+                window_start = self.starts[-self.box_len] if len(self.starts) >= self.box_len else start
+                self.boxes.append((window_start, self.ext_box.max, self.ext_box.min))
+        # Boxes that started before the frame are no longer visible
+        while self.boxes and self.boxes[0][0] < self.starts[0]:
+            self.boxes.popleft()
+
+    def detect(self, forming, trend: str, sma20: float) -> dict:
+        """Runs every detector on the frame (closed state + forming bar). O(1) except output."""
+        high, low, current = float(forming[2]), float(forming[3]), float(forming[4])
+        n = min(self.closed, self.lookback - 1) + 1
+        pattern = 'none'
+
+        # 1. Pullback Detection: Price retraced but bounced from SMA/support
+        recent_low = min(self.ext_recent.min, low)
+        recent_high = max(self.ext_recent.max, high)
+        if trend == 'bullish' and current > sma20 and recent_low < sma20:
+            pattern = 'pullback_bounce'
+        elif trend == 'bearish' and current < sma20 and recent_high > sma20:
+            pattern = 'pullback_rejection'
+
+        # 2. Liquidity Sweep: Recent wick below/above previous range then reversal
+        if n >= 10:
+            prev_high, prev_low = self.prev_hist[0]
+            curr_low = min(self.ext_curr.min, low)
+            curr_high = max(self.ext_curr.max, high)
+
+            if curr_low < prev_low and current > prev_low:
+                pattern = 'liquidity_sweep_long'
+                if trend == 'bearish': pattern = 'bear_trap'
+            elif curr_high > prev_high and current < prev_high:
+                pattern = 'liquidity_sweep_short'
+                if trend == 'bullish': pattern = 'bull_trap'
+
+        # 4. Accumulation Box Detection (Consolidation) + Box Exit
+        accumulation_boxes = [{'top': top, 'bottom': bottom} for _, top, bottom in self.boxes]
+        if accumulation_boxes:
+            last_box = accumulation_boxes[-1]
+            if current > last_box['top'] and self.last_close <= last_box['top']:
+                pattern = 'accumulation_box_exit_up'
+            elif current < last_box['bottom'] and self.last_close >= last_box['bottom']:
+                pattern = 'accumulation_box_exit_down'
+
+        # 5. Liquidity Zones (frame extremes + first-half extremes if different)
+        max_24h = max(self.ext_frame.max, high)
+        min_24h = min(self.ext_frame.min, low)
+        liquidity_zones = [{'price': max_24h, 'type': 'high'}, {'price': min_24h, 'type': 'low'}]
+        if n >= self.lookback:
+            max_12h, min_12h = self.first_half_hist[0]
+            if abs(max_12h - max_24h) / max_24h > 0.002: # 0.2% difference
+                liquidity_zones.append({'price': max_12h, 'type': 'high_secondary'})
+            if abs(min_12h - min_24h) / min_24h > 0.002:
+                liquidity_zones.append({'price': min_12h, 'type': 'low_secondary'})
+
+        return {
+            'pattern': pattern,
+            'accumulation_boxes': accumulation_boxes,
+            'liquidity_zones': liquidity_zones,
+        }
+
+
+class PatternDetector:
+    def __init__(self, lookback: int = 24):
+        self.lookback = lookback
+        self._states: Dict[Tuple[str, str], PatternState] = {}
+        self.stats = {"incremental": 0, "rebuilds": 0}
+
+    def analyze(self, symbol: str, interval: str, bars: list, trend: str, sma20: float) -> dict:
+        """
+        bars: chronological frame (last = forming). Only bars closed since the
+        previous call are pushed; a gap, a reordering or a frame shorter than
+        the state rebuilds it (O(n)).
+        """
+        key = ((symbol or "").replace(".P", "").upper(), interval)
+        closed, forming = bars[:-1][-(self.lookback - 1):], bars[-1]
+        state = self._states.get(key)
+
+        new_bars = None
+        if state is not None and state.last_start is not None and closed:
+            new_bars = [b for b in closed if float(b[0]) > state.last_start]
+            known = len(closed) - len(new_bars)
+            # Frame must continue the state (its last bar is in the frame),
+            # everything older than the new bars must already be held, and the
+            # state must not hold bars older than the frame (shorter frame)
+            held = min(state.closed, self.lookback - 1)
+            if known == 0 or float(closed[known - 1][0]) != state.last_start or held < known \
+                    or min(state.closed + len(new_bars), self.lookback - 1) > len(closed):
+                new_bars = None
+
+        if new_bars is None:
+            state = self._states[key] = PatternState(self.lookback)
+            new_bars = closed
+            self.stats["rebuilds"] += 1
+        else:
+            self.stats["incremental"] += 1
+
+        for bar in new_bars:
+            state.push(bar)
+        if state.closed == 0:
+            return {'pattern': 'none', 'accumulation_boxes': [], 'liquidity_zones': []}
+        return state.detect(forming, trend, sma20)
+
+
+pattern_detector = PatternDetector()
@@ -0,0 +1,121 @@
+"""
+V11.5: Shared Price Board
+==========================
+One market-wide last-price table for every loop (Guardian, Captain, Paper
+Engine). Fed by the WS ticker/trade streams; symbols that are not streamed
+(or went quiet) are refreshed by a single coalesced all-tickers REST
+snapshot, spaced by PRICE_SNAPSHOT_TTL_SEC no matter how many loops ask.
+
+Every price carries the wall-clock time it was observed, so consumers can
+reject stale values instead of acting on them.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from config import settings
+
+logger = logging.getLogger("PriceBoard")
+
+
+class PriceBoard:
+    def __init__(self):
+        self.prices: Dict[str, float] = {}      # {SYMBOLUSDT: last_price}
+        self.updated_at: Dict[str, float] = {}  # {SYMBOLUSDT: epoch seconds}
+        self.max_age = settings.PRICE_MAX_AGE_SEC
+        self.snapshot_ttl = settings.PRICE_SNAPSHOT_TTL_SEC
+        self.last_snapshot = 0.0
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self.snapshot_count = 0
+
+    @staticmethod
+    def _norm(symbol: str) -> str:
+        return (symbol or "").replace(".P", "").upper()
+
+    # ---------- Writers ----------
+
+    def update(self, symbol: str, price: float, ts: Optional[float] = None):
+        """Records a price (safe from the WS thread: plain dict stores)."""
+        if not price or price <= 0:
+            return
+        key = self._norm(symbol)
+        self.prices[key] = price
+        self.updated_at[key] = ts if ts is not None else time.time()
+
+    async def _fetch_snapshot(self):
+        from services.bybit_rest import bybit_rest_service
+        requested_at = time.time()
+        try:
+            ticker_list = await bybit_rest_service.get_all_tickers()
+            for t in ticker_list:
+                key = t.get("symbol", "")
+                # Never overwrite a WS print that arrived while the request was in flight
+                if self.updated_at.get(key, 0) > requested_at:
+                    continue
+                try:
+                    price = float(t.get("lastPrice", 0))
+                except (TypeError, ValueError):
+                    continue
+                if price > 0:
+                    self.prices[key] = price
+                    self.updated_at[key] = requested_at
+            self.snapshot_count += 1
+        except Exception as e:
+            logger.error(f"Price board snapshot failed: {e}")
+        finally:
+            self.last_snapshot = requested_at
+
+    async def refresh_snapshot(self):
+        """
+        Single-flight REST snapshot: concurrent callers share the request in
+        flight, and a new one is only issued once the TTL has elapsed.
+        """
+        if self._snapshot_task and not self._snapshot_task.done():
+            await asyncio.shield(self._snapshot_task)
+            return
+        if time.time() - self.last_snapshot < self.snapshot_ttl:
+            return
+        self._snapshot_task = asyncio.create_task(self._fetch_snapshot())
+        await asyncio.shield(self._snapshot_task)
+
+    # ---------- Readers ----------
+
+    def age(self, symbol: str) -> float:
+        """Seconds since the symbol's price was observed (inf if never)."""
+        ts = self.updated_at.get(self._norm(symbol))
+        return time.time() - ts if ts else float("inf")
+
+    def get_price(self, symbol: str, max_age: Optional[float] = None) -> float:
+        """Last price, or 0.0 if unknown or older than max_age."""
+        key = self._norm(symbol)
+        ts = self.updated_at.get(key)
+        if ts is None:
+            return 0.0
+        if time.time() - ts > (max_age if max_age is not None else self.max_age):
+            return 0.0
+        return self.prices.get(key, 0.0)
+
+    async def get_prices(self, symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, float]:
+        """
+        Fresh prices keyed by the symbols exactly as passed in. Triggers the
+        shared REST snapshot only if one of them is missing or stale; stale
+        symbols are left out of the result.
+        """
+        max_age = max_age if max_age is not None else self.max_age
+        keys = {s: self._norm(s) for s in symbols if s}
+        now = time.time()
+        if any(now - self.updated_at.get(k, 0) > max_age for k in keys.values()):
+            await self.refresh_snapshot()
+
+        result = {}
+        now = time.time()
+        for symbol, k in keys.items():
+            ts = self.updated_at.get(k)
+            if ts is not None and now - ts <= max_age:
+                result[symbol] = self.prices[k]
+        return result
+
+
+price_board = PriceBoard()
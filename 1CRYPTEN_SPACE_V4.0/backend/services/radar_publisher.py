@@ -0,0 +1,91 @@
+"""
+V11.15: Diff-only Market Radar Publisher
+=========================================
+Keeps the last state published to RTDB `market_radar` and only pushes the
+symbols whose quantized score or side changed since then (plus deletions
+for symbols that left the universe). Same entry shape as before
+({cvd, score, side}), with CVD sent as whole dollars.
+
+With most of the universe quiet between ticks, a 1.5s diff cadence moves far
+fewer bytes than the old 10s full dump. Bytes per push are tracked.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable
+
+from config import settings
+from services.firebase_service import firebase_service
+
+logger = logging.getLogger("RadarPublisher")
+
+
+class RadarPublisher:
+    def __init__(self, score_step: int = 2, side_band: float = 10000):
+        self.score_step = score_step      # Re-publish once the score moves this many points
+        self.side_band = side_band        # |CVD| above this is LONG/SHORT, else NEUTRAL
+        self.published: Dict[str, dict] = {}  # {rtdb_key: last pushed entry}
+        self.push_bytes = deque(maxlen=200)
+        self.stats = {"pushes": 0, "skipped": 0, "symbols_sent": 0, "bytes_sent": 0, "full_equivalent_bytes": 0}
+        self.last_push_at = 0.0
+
+    def _entry(self, cvd: float) -> dict:
+        # Radar Heuristic: $500k USD delta = 99% intensity
+        return {
+            "cvd": int(round(cvd)),
+            "score": min(99, int(abs(cvd) / 5000)),
+            "side": "LONG" if cvd > self.side_band else "SHORT" if cvd < -self.side_band else "NEUTRAL",
+        }
+
+    def _changed(self, old: dict, new: dict) -> bool:
+        return old is None or old["side"] != new["side"] or abs(old["score"] - new["score"]) >= self.score_step
+
+    def build_diff(self, symbols: Iterable[str], cvd_getter: Callable[[str], float]):
+        """Returns (diff payload, full snapshot) for the current universe."""
+        current = {}
+        for symbol in symbols:
+            current[symbol.replace(".", "_")] = self._entry(cvd_getter(symbol))  # RTDB keys cannot have dots
+
+        diff = {k: v for k, v in current.items() if self._changed(self.published.get(k), v)}
+        for key in self.published.keys() - current.keys():
+            diff[key] = None  # RTDB update with None deletes the child
+        return diff, current
+
+    async def publish(self, symbols: Iterable[str], cvd_getter: Callable[[str], float]) -> int:
+        """Pushes the diff (if any). Returns the payload size in bytes (0 = nothing sent)."""
+        diff, current = self.build_diff(symbols, cvd_getter)
+        self.stats["full_equivalent_bytes"] += len(json.dumps(current, separators=(",", ":")))
+        if not diff:
+            self.stats["skipped"] += 1
+            return 0
+
+        size = len(json.dumps(diff, separators=(",", ":")))
+        if not await firebase_service.update_radar_batch(diff):
+            return 0  # Keep the old baseline: the same diff is retried next tick
+
+        for key, value in diff.items():
+            if value is None:
+                self.published.pop(key, None)
+            else:
+                self.published[key] = value
+        self.push_bytes.append(size)
+        self.stats["pushes"] += 1
+        self.stats["symbols_sent"] += len(diff)
+        self.stats["bytes_sent"] += size
+        self.last_push_at = time.time()
+        return size
+
+    def get_metrics(self) -> dict:
+        pushes = self.stats["pushes"]
+        return {
+            **self.stats,
+            "tracked_symbols": len(self.published),
+            "avg_bytes_per_push": round(sum(self.push_bytes) / len(self.push_bytes), 1) if self.push_bytes else 0.0,
+            "max_bytes_per_push": max(self.push_bytes) if self.push_bytes else 0,
+            "avg_symbols_per_push": round(self.stats["symbols_sent"] / pushes, 1) if pushes else 0.0,
+        }
+
+
+radar_publisher = RadarPublisher(score_step=settings.RADAR_SCORE_STEP)
@@ -0,0 +1,315 @@
+"""
+V11.8: Bybit REST Priority Scheduler
+=====================================
+Every Bybit REST call passes through here before it leaves the process.
+
+- One dispatcher for every endpoint: requests wait in a single queue per
+  priority class (ORDER > STOP > POSITION > MARKET) and are released in
+  that order whenever a connection and a rate-limit token are available.
+- In-flight cap per class over the shared httpx pool: MARKET traffic (kline
+  fan-outs, startup backfill) can never hold more than
+  max_in_flight - RESERVED_SLOTS["market"] connections, so order and stop
+  requests always find a free connection.
+- Rate limits: one token bucket per endpoint path (synced with that path's
+  X-Bapi-Limit-* headers) plus one IP-wide bucket (Bybit: 600 req / 5s).
+  Rate-limit hits (10006) back the path off until the exchange reset time;
+  an empty 403 (IP limit) backs off everything.
+- critical=True (emergency closes) skips the queue, the buckets, any backoff
+  and the in-flight caps; the pool keeps CRITICAL_CONNECTIONS spare
+  connections for it, so a critical close never waits for a pool slot.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger("RestScheduler")
+
+# Priority classes (lower = served first)
+PRIORITY_ORDER = 0      # Open/close orders
+PRIORITY_STOP = 1       # SL / TP amendments
+PRIORITY_POSITION = 2   # Positions, wallet, closed PnL
+PRIORITY_MARKET = 3     # Klines, tickers, instruments
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: "order",
+    PRIORITY_STOP: "stop",
+    PRIORITY_POSITION: "position",
+    PRIORITY_MARKET: "market",
+}
+
+# Connections a class must leave free for the classes above it (monotonic in priority)
+RESERVED_SLOTS: Dict[int, int] = {
+    PRIORITY_ORDER: 0,
+    PRIORITY_STOP: 0,
+    PRIORITY_POSITION: 4,
+    PRIORITY_MARKET: 8,
+}
+
+# Extra pool connections only critical requests may use (on top of max_in_flight)
+CRITICAL_CONNECTIONS = 4
+
+# Group -> (tokens per second, burst) used for a path until its own headers arrive.
+# Conservative defaults under Bybit's V5 per-endpoint limits.
+REST_GROUP_LIMITS: Dict[str, tuple] = {
+    "order": (10.0, 10),
+    "stop": (10.0, 10),
+    "position": (50.0, 50),
+    "market": (100.0, 100),
+}
+
+# IP-wide limit (Bybit: 600 requests per 5s window per IP)
+IP_LIMIT = (100.0, 100)
+
+# Path prefix -> (group, default priority). First match wins.
+_PATH_GROUPS = (
+    ("/v5/order/", "order", PRIORITY_ORDER),
+    ("/v5/position/trading-stop", "stop", PRIORITY_STOP),
+    ("/v5/position/", "position", PRIORITY_POSITION),
+    ("/v5/account/", "position", PRIORITY_POSITION),
+    ("/v5/market/", "market", PRIORITY_MARKET),
+)
+
+RATE_LIMIT_BACKOFF_SEC = 1.0  # Used when a 10006 carries no reset timestamp
+
+
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # monotonic; set by headers / 10006 / 403
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1  # Critical path may leave the bucket in debt
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 = now)."""
+        self._refill()
+        blocked = self.blocked_until - time.monotonic()
+        refill = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(blocked, refill, 0.0)
+
+    def block(self, delay: float):
+        delay = min(max(delay, 0.0), 10.0)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+class _Request:
+    __slots__ = ("path", "future", "enqueued_at")
+
+    def __init__(self, path: str, future: asyncio.Future):
+        self.path = path
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class RestScheduler:
+    def __init__(self, max_in_flight: int = 20, limits: Optional[Dict[str, tuple]] = None):
+        self.max_in_flight = max_in_flight
+        self.group_limits = dict(limits or REST_GROUP_LIMITS)
+        self.ip_bucket = _TokenBucket(*IP_LIMIT)
+        self.path_buckets: Dict[str, _TokenBucket] = {}
+        self.queues: Dict[int, Deque[_Request]] = {p: deque() for p in PRIORITY_NAMES}
+        self.in_flight: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self.in_flight_critical = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._seq = itertools.count()
+        # Metrics per priority class
+        self.metrics = {
+            name: {"requests": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self.metrics["critical"] = {"requests": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+        self.rate_limit_hits = 0
+
+    @staticmethod
+    def classify(path: str):
+        """Returns (group, default_priority) for an endpoint path."""
+        for prefix, group, priority in _PATH_GROUPS:
+            if path.startswith(prefix):
+                return group, priority
+        return "market", PRIORITY_MARKET
+
+    def _bucket(self, path: str) -> _TokenBucket:
+        bucket = self.path_buckets.get(path)
+        if bucket is None:
+            bucket = self.path_buckets[path] = _TokenBucket(*self.group_limits[self.classify(path)[0]])
+        return bucket
+
+    def _cap(self, priority: int) -> int:
+        return max(1, self.max_in_flight - RESERVED_SLOTS.get(priority, 0))
+
+    def _total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    # ---------- Admission ----------
+
+    @asynccontextmanager
+    async def slot(self, path: str, priority: Optional[int] = None, critical: bool = False):
+        """Holds one in-flight slot for the duration of the HTTP call."""
+        if priority is None:
+            priority = self.classify(path)[1]
+        if critical:
+            self._bucket(path).take()
+            self.ip_bucket.take()
+            self._record("critical", 0.0)
+            self.in_flight_critical += 1
+            try:
+                yield
+            finally:
+                self.in_flight_critical -= 1
+            return
+
+        await self._acquire(path, priority)
+        try:
+            yield
+        finally:
+            self.in_flight[priority] -= 1
+            self._pump()
+
+    async def _acquire(self, path: str, priority: int):
+        loop = asyncio.get_running_loop()
+        request = _Request(path, loop.create_future())
+        self.queues[priority].append(request)
+        self._pump()
+        try:
+            await request.future
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. wait_for timeout) after being admitted: hand the slot back
+            if request.future.done() and not request.future.cancelled():
+                self.in_flight[priority] -= 1
+                self._pump()
+            raise
+        self._record(PRIORITY_NAMES[priority], (time.monotonic() - request.enqueued_at) * 1000)
+
+    def _pump(self):
+        """Releases queued requests in priority order while connections and tokens allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        retry_in = None
+        for priority in sorted(self.queues):
+            queue = self.queues[priority]
+            if not queue:
+                continue
+            if self._total_in_flight() >= self._cap(priority):
+                break  # Caps shrink with priority: no lower class can go either
+            ip_wait = self.ip_bucket.wait_time()
+            if ip_wait > 0:
+                retry_in = ip_wait
+                break
+            # FIFO inside the class, but a path that is out of tokens doesn't block other paths
+            for _ in range(len(queue)):
+                request = queue.popleft()
+                if request.future.done():  # Cancelled while queued
+                    continue
+                wait = self._bucket(request.path).wait_time()
+                if wait > 0:
+                    queue.append(request)
+                    retry_in = wait if retry_in is None else min(retry_in, wait)
+                    continue
+                if self._total_in_flight() >= self._cap(priority):
+                    queue.appendleft(request)
+                    break  # Re-pumped when a slot is released
+                ip_wait = self.ip_bucket.wait_time()
+                if ip_wait > 0:
+                    queue.appendleft(request)
+                    retry_in = ip_wait
+                    break
+                self._bucket(request.path).take()
+                self.ip_bucket.take()
+                self.in_flight[priority] += 1
+                request.future.set_result(True)
+            else:
+                continue
+            break  # Inner loop stopped on the in-flight cap or the IP bucket
+        if retry_in is not None:
+            self._timer = asyncio.get_running_loop().call_later(max(retry_in, 0.001), self._pump)
+
+    # ---------- Feedback from responses ----------
+
+    def observe_limits(self, path: str, limit: int, remaining: int, reset_ms: int):
+        """Syncs the path's bucket with its X-Bapi-Limit / -Status / -Reset-Timestamp."""
+        if limit <= 0:
+            return
+        bucket = self._bucket(path)
+        if limit != bucket.capacity:
+            bucket.capacity = limit
+            bucket.rate = float(limit)  # Bybit limits are per second windows
+        bucket._refill()
+        bucket.tokens = min(bucket.tokens, float(remaining))
+        if remaining <= 0 and reset_ms:
+            bucket.block(reset_ms / 1000 - time.time())
+
+    def on_rate_limited(self, path: Optional[str] = None, reset_ms: int = 0):
+        """10006: hold the path until the exchange window resets. path=None (empty 403): the IP limit, hold everything."""
+        self.rate_limit_hits += 1
+        delay = (reset_ms / 1000 - time.time()) if reset_ms else RATE_LIMIT_BACKOFF_SEC
+        bucket = self._bucket(path) if path else self.ip_bucket
+        bucket.tokens = min(bucket.tokens, 0.0)
+        bucket.block(delay)
+        queued = sum(len(q) for q in self.queues.values())
+        logger.warning(f"⏳ [RATE LIMIT] Bybit '{path or 'IP'}' backing off {max(delay, 0):.2f}s (queued: {queued})")
+
+    # ---------- Metrics ----------
+
+    def _record(self, name: str, wait_ms: float):
+        m = self.metrics[name]
+        m["requests"] += 1
+        m["total_wait_ms"] += wait_ms
+        if wait_ms > m["max_wait_ms"]:
+            m["max_wait_ms"] = wait_ms
+
+    def get_metrics(self) -> dict:
+        """Queue depth / in-flight per priority class, bucket state per path, wait-time stats."""
+        now = time.monotonic()
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight_critical": self.in_flight_critical,
+            "classes": {
+                PRIORITY_NAMES[p]: {
+                    "depth": sum(1 for r in self.queues[p] if not r.future.done()),
+                    "in_flight": self.in_flight[p],
+                    "cap": self._cap(p),
+                }
+                for p in PRIORITY_NAMES
+            },
+            "ip": {
+                "tokens": round(self.ip_bucket.tokens, 2),
+                "backoff_sec": round(max(0.0, self.ip_bucket.blocked_until - now), 3),
+            },
+            "paths": {
+                path: {
+                    "tokens": round(b.tokens, 2),
+                    "capacity": b.capacity,
+                    "backoff_sec": round(max(0.0, b.blocked_until - now), 3),
+                }
+                for path, b in self.path_buckets.items()
+            },
+            "waits": {
+                name: {
+                    "requests": m["requests"],
+                    "avg_wait_ms": round(m["total_wait_ms"] / m["requests"], 2) if m["requests"] else 0.0,
+                    "max_wait_ms": round(m["max_wait_ms"], 2),
+                }
+                for name, m in self.metrics.items()
+            },
+            "rate_limit_hits": self.rate_limit_hits,
+        }
+
+
+rest_scheduler = RestScheduler()
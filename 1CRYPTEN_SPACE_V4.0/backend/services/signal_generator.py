@@ -2,11 +2,18 @@ import logging
 import asyncio
 import time
 import datetime
+from collections import deque
+from typing import Optional
 from datetime import datetime, timezone, timedelta
+from config import settings
 from services.firebase_service import firebase_service
 from services.bankroll import bankroll_manager
 from services.bybit_rest import bybit_rest_service
 from services.bybit_ws import bybit_ws_service
+from services.pattern_detector import pattern_detector
+from services.radar_publisher import radar_publisher
+from services.signal_queue import SignalPriorityQueue
+from services.signal_scoring import signal_scorer, finalize_score, SIGNAL_THRESHOLD
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SignalGenerator")
@@ -21,10 +28,8 @@ class SignalGenerator:
     def __init__(self):
         self.is_running = False
         self.last_standby_log = 0
-        self.radar_interval = 3.0 # Update RTDB every 3s for 200 symbols
         self.scan_interval = 5.0 # Reduced from 15s to 5s for V7.0 High-Precision Reactivity
-        self.radar_interval = 10.0 # V5.4.5: Slower radar for stability
-        self.signal_queue = None # ⚡ V7.2 Event-Driven Queue (Lazy Init)
+        self.signal_queue = None # ⚡ V7.2 Event-Driven Queue (Lazy Init) | V11.14: Score-ordered, TTL-evicted
         self.exhaustion_level = 0.0
  # 0-100
         self.last_context_update = 0
@@ -36,6 +41,10 @@ class SignalGenerator:
         # V10.6 System Harmony: State Machine
         self.system_state = "PAUSED"  # SCANNING | MONITORING | PAUSED
         self.last_state_update = 0
+        self.last_scan_ms = 0.0 # V11.12: Duration of the last vectorized scoring pass
+        # V11.13: Event-driven path (CVD crossings from the WS layer)
+        self.event_latencies = deque(maxlen=500) # (print→queue ms, ingest→queue ms)
+        self.event_stats = {"events": 0, "scored": 0, "signals": 0}
 
     async def get_1h_trend_analysis(self, symbol: str) -> dict:
         """
@@ -48,28 +57,14 @@ class SignalGenerator:
             if cached and (time.time() - cached.get('updated_at', 0)) < self.trend_cache_ttl:
                 return cached
             
-            # Fetch 1H candles from Bybit via pybit
-            from pybit.unified_trading import HTTP
-            from config import settings
-            
-            session = HTTP(
-                testnet=settings.BYBIT_TESTNET,
-                api_key=settings.BYBIT_API_KEY,
-                api_secret=settings.BYBIT_API_SECRET
-            )
-            
-            api_symbol = symbol.replace('.P', '')
-            klines = session.get_kline(
-                category="linear",
-                symbol=api_symbol,
-                interval="60",  # 1H
-                limit=24  # Last 24 hours
-            )
-            
-            if not klines.get('result', {}).get('list'):
+            # V11.3: 1H candles from the local aggregator (built from publicTrade)
+            # V11.10: Shared kline cache covers symbols without local history (incremental, non-blocking)
+            from services.kline_cache import kline_cache
+            candles = await kline_cache.get_klines(symbol, "60", 24)
+
+            if not candles:
                 return {'trend': 'sideways', 'pattern': 'unknown', 'trend_strength': 0}
             
-            candles = klines['result']['list']
             # Bybit returns newest first, so reverse for chronological order
             candles = candles[::-1]
             
@@ -105,71 +100,11 @@ class SignalGenerator:
             trend_strength = min(100, abs(pct_diff) * 20)
             
             # Pattern Detection
-            pattern = 'none'
-            
-            # 1. Pullback Detection: Price retraced but bounced from SMA/support
-            recent_low = min(lows[-5:])
-            recent_high = max(highs[-5:])
-            if trend == 'bullish' and current > sma20 and recent_low < sma20:
-                pattern = 'pullback_bounce'
-            elif trend == 'bearish' and current < sma20 and recent_high > sma20:
-                pattern = 'pullback_rejection'
-            
-            # 2. Liquidity Sweep: Recent wick below/above previous range then reversal
-            if len(closes) >= 10:
-                prev_low = min(lows[-10:-5])
-                prev_high = max(highs[-10:-5])
-                curr_low = min(lows[-3:])
-                curr_high = max(highs[-3:])
-                
-                if curr_low < prev_low and current > prev_low:
-                    pattern = 'liquidity_sweep_long'
-                    if trend == 'bearish': pattern = 'bear_trap'
-                elif curr_high > prev_high and current < prev_high:
-                    pattern = 'liquidity_sweep_short'
-                    if trend == 'bullish': pattern = 'bull_trap'
-            
-            # 4. Accumulation Box Detection (Consolidation)
-            # Find periods where price is range-bound in the last 24h
-            accumulation_boxes = []
-            box_min_candles = 10
-            for i in range(len(highs) - box_min_candles):
-                window_highs = highs[i:i+box_min_candles]
-                window_lows = lows[i:i+box_min_candles]
-                window_range = max(window_highs) - min(window_lows)
-                # If range is tight (< 0.5% of price), mark as accumulation
-                if window_range < closes[i] * 0.005:
-                    accumulation_boxes.append({
-                        'top': max(window_highs),
-                        'bottom': min(window_lows),
-                    })
-            
-            # Detect Box Exit
-            if accumulation_boxes:
-                last_box = accumulation_boxes[-1]
-                if current > last_box['top'] and closes[-2] <= last_box['top']:
-                    pattern = 'accumulation_box_exit_up'
-                elif current < last_box['bottom'] and closes[-2] >= last_box['bottom']:
-                    pattern = 'accumulation_box_exit_down'
-            
-            # 5. Liquidity Zones (1H Highs/Lows)
-            # Identify key support/resistance levels from recent peaks/troughs
-            liquidity_zones = []
-            max_24h = max(highs)
-            min_24h = min(lows)
-            
-            # Simple version: the absolute 24h extreme values are the strongest liquidity zones
-            liquidity_zones.append({'price': max_24h, 'type': 'high'})
-            liquidity_zones.append({'price': min_24h, 'type': 'low'})
-            
-            # Add secondary zones (e.g., first 12h extremes if different)
-            if len(highs) >= 24:
-                max_12h = max(highs[:12])
-                min_12h = min(lows[:12])
-                if abs(max_12h - max_24h) / max_24h > 0.002: # 0.2% difference
-                    liquidity_zones.append({'price': max_12h, 'type': 'high_secondary'})
-                if abs(min_12h - min_24h) / min_24h > 0.002:
-                    liquidity_zones.append({'price': min_12h, 'type': 'low_secondary'})
+            # V11.11: Incremental sliding-extreme detectors (pullback, sweep, boxes, zones)
+            patterns = pattern_detector.analyze(symbol, "60", candles, trend, sma20)
+            pattern = patterns['pattern']
+            accumulation_boxes = patterns['accumulation_boxes']
+            liquidity_zones = patterns['liquidity_zones']
 
             result = {
                 'trend': trend,
@@ -190,13 +125,178 @@ class SignalGenerator:
             logger.warning(f"V9.0 Trend Analysis Error for {symbol}: {e}")
             return {'trend': 'sideways', 'pattern': 'unknown', 'trend_strength': 0}
 
+    async def _evaluate_candidate(self, candidate: dict):
+        """
+        V11.12: Async follow-up for a vectorized candidate (1H trend block,
+        trend/pattern bonuses, de-duplication). Returns signal_data or None.
+        """
+        symbol = candidate["symbol"]
+        cvd_val = candidate["cvd"]
+        rsi = candidate["rsi"]
+        side_label = candidate["side_label"]
+
+        # --- V9.0 Multi-Timeframe Analysis ---
+        trend_analysis = await self.get_1h_trend_analysis(symbol)
+        trend = trend_analysis.get('trend', 'sideways')
+        pattern = trend_analysis.get('pattern', 'none')
+        trend_strength = trend_analysis.get('trend_strength', 0)
+
+        final_score = finalize_score(candidate, trend, pattern, trend_strength)
+        if final_score is None:
+            logger.info(f"🚫 [TREND BLOCK] {symbol} {side_label} blocked (1H Trend: {trend.capitalize()}, Str: {trend_strength:.1f})")
+            return None
+        if final_score < SIGNAL_THRESHOLD:
+            return None
+
+        # --- V10.0 De-duplication Logic ---
+        last_sig = self.last_sent_signals.get(symbol)
+        now_ts = time.time()
+        if last_sig:
+            time_since = now_ts - last_sig['timestamp']
+            score_diff = final_score - last_sig['score']
+            
+            # Skip if was sent recently (< 60s) AND score didn't improve significantly
+            if time_since < 60 and score_diff <= 3:
+                return None
+        
+        # Update last sent tracking
+        self.last_sent_signals[symbol] = {
+            'score': final_score,
+            'timestamp': now_ts
+        }
+
+        is_whale = candidate["is_whale"]
+        whale_label = " | 🐋 Whale Activity" if is_whale else ""
+        pattern_label = f" | Pattern: {pattern.replace('_', ' ')}" if pattern != 'none' else ""
+        logger.info(f"🎯 Sniper detected ELITE opportunity: {symbol} | Score: {final_score}{pattern_label}{whale_label}")
+        
+        reasoning = f"Elite {side_label} | CVD: {cvd_val/1000:.1f}k | RSI: {rsi:.1f} | Trend: {trend}{pattern_label}{whale_label}"
+        if self.btc_drag_mode: reasoning += " | BTC Drag Boosted"
+
+        return {
+            "id": f"sig_{int(time.time())}_{symbol}", # Ensure ID is available for queue
+            "symbol": symbol,
+            "score": final_score,
+            "type": "MULTI_PULSE_V10.0",
+            "market_environment": "Bullish" if cvd_val > 0 else "Bearish",
+            "is_elite": True,
+            "reasoning": reasoning,
+            "indicators": {
+                "cvd": round(cvd_val, 4),
+                "rsi": round(rsi, 2),
+                "scanned_at": datetime.now(timezone.utc).isoformat()
+            },
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    async def _emit_signal(self, signal_data: dict, trigger: dict = None):
+        # V11.13: Queue first (execution never waits on the Firebase write)
+        if trigger:
+            now_ms = time.time() * 1000
+            print_ms = now_ms - trigger["print_ts"]
+            ingest_ms = now_ms - trigger["receive_ts"]
+            self.event_latencies.append((print_ms, ingest_ms))
+            signal_data["indicators"]["trigger_latency_ms"] = round(ingest_ms, 2)
+            logger.info(f"⚡ [EVENT] {signal_data['symbol']} queued {ingest_ms:.1f}ms after ingest ({print_ms:.1f}ms after print)")
+
+        # 1. ⚡ Push to Event Queue for Zero-Latency Execution
+        await self.signal_queue.put(signal_data)
+
+        # 2. Log to Firebase (Primary Record)
+        await firebase_service.log_signal(signal_data)
+
+    async def candidate_event_loop(self):
+        """
+        V11.13: Scores symbols the moment the WS layer reports a CVD threshold
+        crossing. The gate and exclusions come from the vault/slot mirrors on
+        every batch (memory reads, no Firebase round trip); the periodic scan
+        is the safety net.
+        """
+        if not settings.SIGNAL_EVENT_MODE:
+            return
+        self.is_running = True
+        if self.signal_queue is None:
+            self.signal_queue = SignalPriorityQueue(settings.SIGNAL_QUEUE_MAXSIZE, settings.SIGNAL_TTL_SEC)
+        events = bybit_ws_service.candidate_events
+        logger.info("⚡ V11.13: Event-driven signal worker active (CVD threshold crossings).")
+
+        while self.is_running:
+            try:
+                event = await events.get()
+                batch = {event["symbol"]: event}
+                while not events.empty():
+                    extra = events.get_nowait()
+                    batch.setdefault(extra["symbol"], extra) # Keep the earliest trigger per symbol
+                self.event_stats["events"] += len(batch)
+
+                excluded = await self._event_gate()
+                if excluded is None:
+                    continue
+                rows = [signal_scorer.norm_index[s] for s in batch if s in signal_scorer.norm_index]
+                if not rows:
+                    continue
+
+                signal_scorer.update_rows(rows, bybit_ws_service.get_cvd_score, bybit_ws_service.rsi_cache, excluded)
+                candidates = signal_scorer.score(self.btc_drag_mode, rows=rows)
+                self.event_stats["scored"] += len(rows)
+
+                for candidate in candidates:
+                    signal_data = await self._evaluate_candidate(candidate)
+                    if signal_data:
+                        self.event_stats["signals"] += 1
+                        await self._emit_signal(signal_data, trigger=batch.get(normalize_symbol(candidate["symbol"])))
+            except Exception as e:
+                logger.error(f"Error in candidate_event_loop: {e}")
+                await asyncio.sleep(1)
+
+    async def _event_gate(self) -> Optional[set]:
+        """
+        V11.13: Trading permission, a free sniper slot and the excluded symbols,
+        read fresh from the vault cache and the slots mirror. None = gate closed.
+        """
+        from services.vault_service import vault_service
+        from services.agents.captain import captain_agent
+        trading_allowed, _ = await vault_service.is_trading_allowed()
+        if not trading_allowed:
+            return None
+        slots = await firebase_service.get_active_slots()
+        if not any(not s.get("symbol") for s in slots):
+            return None
+        # Atomic lock of bankroll.can_open_new_slot (30s TTL): a trade is being opened
+        now = time.time()
+        if any(now - ts <= 30 for ts in bankroll_manager.pending_slots.values()):
+            return None
+        excluded = {normalize_symbol(s["symbol"]) for s in slots if s.get("symbol")}
+        last_traded = getattr(captain_agent, 'last_traded_symbol', None)
+        if last_traded:
+            excluded.add(normalize_symbol(last_traded))
+        return excluded
+
+    def get_event_metrics(self) -> dict:
+        """V11.13: Trade print → queued signal latency (p50/p95/max) + event counters."""
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(q * len(values)))], 2) if values else 0.0
+        print_ms = sorted(p for p, _ in self.event_latencies)
+        ingest_ms = sorted(i for _, i in self.event_latencies)
+        return {
+            "mode": "event" if settings.SIGNAL_EVENT_MODE else "scan",
+            "print_to_queue_ms": {"p50": pct(print_ms, 0.5), "p95": pct(print_ms, 0.95), "max": pct(print_ms, 1.0)},
+            "ingest_to_queue_ms": {"p50": pct(ingest_ms, 0.5), "p95": pct(ingest_ms, 0.95), "max": pct(ingest_ms, 1.0)},
+            "samples": len(self.event_latencies),
+            "pending_events": bybit_ws_service.candidate_events.qsize(),
+            "dropped_events": bybit_ws_service.candidate_events_dropped,
+            "last_scan_ms": round(self.last_scan_ms, 3),
+            "queue": self.signal_queue.get_metrics() if self.signal_queue else {},
+            **self.event_stats,
+        }
+
     async def monitor_and_generate(self):
         """
         Monitors high CVD scores via WebSocket and generates elite signals.
         """
         self.is_running = True
         if self.signal_queue is None:
-            self.signal_queue = asyncio.Queue()
+            self.signal_queue = SignalPriorityQueue(settings.SIGNAL_QUEUE_MAXSIZE, settings.SIGNAL_TTL_SEC)
         # logger.info("Signal Generator loop started.")
 
         while self.is_running:
@@ -279,139 +379,29 @@ class SignalGenerator:
                 slots = await firebase_service.get_active_slots()
                 occupied_symbols = [normalize_symbol(s["symbol"]) for s in slots if s.get("symbol")]
 
-                for symbol in active_symbols_ws:
-                    # Sniper Rule: Don't scan symbols already in operation (use normalized comparison)
-                    if normalize_symbol(symbol) in occupied_symbols:
-                        continue
-                    
-                    # V8.0 Sequential Diversification: Skip último par operado
-                    from services.agents.captain import captain_agent
-                    last_traded = getattr(captain_agent, 'last_traded_symbol', None)
-                    if last_traded:
-                        if normalize_symbol(symbol) == normalize_symbol(last_traded):
-                            continue
-
-                    cvd_val = bybit_ws_service.get_cvd_score(symbol)
-                    abs_cvd = abs(cvd_val)
-                    
-                    # V5.1.0: Sniper Rule (Radar 2.0): Threshold based on USD Money Flow
-                    # Heuristic optimization: Reduced thresholds to populate more slots
-                    threshold = 5000 if self.btc_drag_mode else 10000
-                    
-                    if abs_cvd > threshold: 
-                        # --- V7.2 Multi-Indicator Scoring ---
-                        # Base CVD Score (0-70 points)
-                        cvd_score = min(70.0, (abs_cvd / 200000) * 70.0) if abs_cvd > 50000 else 0
-                        
-                        # RSI Score & Filter (0-30 points)
-                        rsi = bybit_ws_service.rsi_cache.get(symbol, 50)
-                        rsi_score = 0.0
-                        side_label = "Long" if cvd_val > 0 else "Short"
-                        
-                        # RSI Alignment logic
-                        if side_label == "Long":
-                            # Sniper Reversal Long: Prime below 30 RSI
-                            if rsi > 60: 
-                                logger.info(f"🚫 [RSI MOMENTUM BLOCK] {symbol} Long blocked (RSI: {rsi:.1f})")
-                                continue
-                            rsi_score = min(30.0, ((65 - rsi) / 35.0) * 30.0) if rsi < 65 else 0
-                        else: # Short
-                            # Sniper Reversal Short: Prime above 70 RSI
-                            if rsi < 40:
-                                logger.info(f"🚫 [RSI MOMENTUM BLOCK] {symbol} Short blocked (RSI: {rsi:.1f})")
-                                continue
-                            rsi_score = min(30.0, ((rsi - 35) / 35.0) * 30.0) if rsi > 35 else 0
-                        
-                        # --- V9.0 Multi-Timeframe Analysis ---
-                        trend_analysis = await self.get_1h_trend_analysis(symbol)
-                        trend = trend_analysis.get('trend', 'sideways')
-                        pattern = trend_analysis.get('pattern', 'none')
-                        trend_strength = trend_analysis.get('trend_strength', 0)
-                        
-                        # Trend Alignment Check: Block contra-trend trades
-                        if trend == 'bullish' and side_label == 'Short':
-                            logger.info(f"🚫 [TREND BLOCK] {symbol} Short blocked (1H Trend: Bullish, Str: {trend_strength:.1f})")
-                            continue
-                        elif trend == 'bearish' and side_label == 'Long':
-                            logger.info(f"🚫 [TREND BLOCK] {symbol} Long blocked (1H Trend: Bearish, Str: {trend_strength:.1f})")
-                            continue
-                        
-                        # Pattern Bonus (0-20 points)
-                        pattern_bonus = 0
-                        if pattern in ['pullback_bounce', 'pullback_rejection']:
-                            pattern_bonus = 12
-                        elif pattern in ['liquidity_sweep_long', 'liquidity_sweep_short']:
-                            pattern_bonus = 15
-                        elif pattern in ['bull_trap', 'bear_trap']:
-                            pattern_bonus = 20
-                        elif pattern in ['accumulation_box_exit_up', 'accumulation_box_exit_down']:
-                            pattern_bonus = 18
-                        elif pattern in ['breakout_up', 'breakout_down']:
-                            pattern_bonus = 10
-                        
-                        # Whale Activity Bonus (0-20 points)
-                        # Threshold based on $250k USD delta in the recent buffer
-                        is_whale = abs(cvd_val) > 250000
-                        whale_bonus = 20 if is_whale else 0
-                        
-                        # Trend Alignment Bonus (0-10 points)
-                        trend_bonus = 0
-                        if (trend == 'bullish' and side_label == 'Long') or (trend == 'bearish' and side_label == 'Short'):
-                            trend_bonus = min(10.0, trend_strength / 10)
-                        
-                        final_score = int(cvd_score + rsi_score + trend_bonus + pattern_bonus + whale_bonus + 15) # Base 15
-                        final_score = min(99, final_score)
-
-                        if final_score >= 90:
-                            # --- V10.0 De-duplication Logic ---
-                            last_sig = self.last_sent_signals.get(symbol)
-                            now_ts = time.time()
-                            if last_sig:
-                                time_since = now_ts - last_sig['timestamp']
-                                score_diff = final_score - last_sig['score']
-                                
-                                # Skip if was sent recently (< 60s) AND score didn't improve significantly
-                                if time_since < 60 and score_diff <= 3:
-                                    continue
-                            
-                            # Update last sent tracking
-                            self.last_sent_signals[symbol] = {
-                                'score': final_score,
-                                'timestamp': now_ts
-                            }
-
-                            whale_label = " | 🐋 Whale Activity" if is_whale else ""
-                            pattern_label = f" | Pattern: {pattern.replace('_', ' ')}" if pattern != 'none' else ""
-                            logger.info(f"🎯 Sniper detected ELITE opportunity: {symbol} | Score: {final_score}{pattern_label}{whale_label}")
-                            
-                            reasoning = f"Elite {side_label} | CVD: {cvd_val/1000:.1f}k | RSI: {rsi:.1f} | Trend: {trend}{pattern_label}{whale_label}"
-                            if self.btc_drag_mode: reasoning += " | BTC Drag Boosted"
-
-                            signal_data = {
-                                "id": f"sig_{int(time.time())}_{symbol}", # Ensure ID is available for queue
-                                "symbol": symbol,
-                                "score": final_score,
-                                "type": "MULTI_PULSE_V10.0",
-                                "market_environment": "Bullish" if cvd_val > 0 else "Bearish",
-                                "is_elite": True,
-                                "reasoning": reasoning,
-                                "indicators": {
-                                    "cvd": round(cvd_val, 4),
-                                    "rsi": round(rsi, 2),
-                                    "scanned_at": datetime.now(timezone.utc).isoformat()
-                                },
-                                "timestamp": datetime.now(timezone.utc).isoformat()
-                            }
-                            
-                            # 1. Log to Firebase (Primary Record)
-                            await firebase_service.log_signal(signal_data)
-                            
-                            # 2. ⚡ Push to Event Queue for Zero-Latency Execution
-                            await self.signal_queue.put(signal_data)
-                            
-                            await asyncio.sleep(0.5)
+                # V8.0 Sequential Diversification: Skip último par operado
+                from services.agents.captain import captain_agent
+                excluded = set(occupied_symbols)
+                last_traded = getattr(captain_agent, 'last_traded_symbol', None)
+                if last_traded:
+                    excluded.add(normalize_symbol(last_traded))
+
+                # V11.12: Whole universe scored in one vectorized pass; only the
+                # candidates that can still reach 90 get the async 1H follow-up
+                scan_start = time.perf_counter()
+                signal_scorer.set_universe(active_symbols_ws)
+                signal_scorer.load_features(bybit_ws_service.get_cvd_score, bybit_ws_service.rsi_cache, excluded)
+                candidates = signal_scorer.score(self.btc_drag_mode)
+                self.last_scan_ms = (time.perf_counter() - scan_start) * 1000
 
-                await asyncio.sleep(self.scan_interval) 
+                for candidate in candidates:
+                    signal_data = await self._evaluate_candidate(candidate)
+                    if signal_data:
+                        await self._emit_signal(signal_data)
+                        await asyncio.sleep(0.5)
+
+                # V11.13: In event mode the full scan is only the safety net
+                await asyncio.sleep(settings.SIGNAL_SAFETY_SCAN_SEC if settings.SIGNAL_EVENT_MODE else self.scan_interval)
                 
             except Exception as e:
                 logger.error(f"Error in Signal Generator loop: {e}")
@@ -419,27 +409,13 @@ class SignalGenerator:
         """
         High-performance loop to update the Market Radar in RTDB.
         Runs independently of Signal generation.
+        V11.15: Diff-only, quantized pushes (only symbols whose score/side moved).
         """
-        logger.info("Market Radar (200 pairs) active via RTDB.")
+        logger.info(f"Market Radar active via RTDB (diff pushes every {settings.RADAR_INTERVAL_SEC}s).")
         while self.is_running:
             try:
-                active_symbols = bybit_ws_service.active_symbols
-                radar_batch = {}
-                
-                for symbol in active_symbols:
-                    cvd = bybit_ws_service.get_cvd_score(symbol)
-                    # Radar Heuristic: $500k USD delta = 99% intensity
-                    score = min(99, int(abs(cvd) / 5000))
-                    radar_batch[symbol.replace(".", "_")] = { # RTDB keys cannot have dots
-                        "cvd": round(cvd, 2),
-                        "score": score,
-                        "side": "LONG" if cvd > 10000 else "SHORT" if cvd < -10000 else "NEUTRAL"
-                    }
-                
-                if radar_batch:
-                    await firebase_service.update_radar_batch(radar_batch)
-                
-                await asyncio.sleep(self.radar_interval)
+                await radar_publisher.publish(bybit_ws_service.active_symbols, bybit_ws_service.get_cvd_score)
+                await asyncio.sleep(settings.RADAR_INTERVAL_SEC)
             except Exception as e:
                 logger.error(f"Error in radar_loop: {e}")
                 await asyncio.sleep(5)
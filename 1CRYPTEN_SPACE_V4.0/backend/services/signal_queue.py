@@ -0,0 +1,159 @@
+"""
+V11.14: Signal Priority Queue
+==============================
+Replaces the FIFO asyncio.Queue between the Signal Generator and the Captain.
+
+- Ordered by score (desc), then recency (newest first): one pop is always
+  the best live opportunity, not the oldest one.
+- One entry per symbol: a newer signal replaces the queued one.
+- Entries expire after `ttl` seconds. A second heap keyed by expiry evicts
+  them in O(log n) each, so stale signals are gone before the Captain looks.
+- Bounded: on overflow the weakest entry (or the incoming one) is dropped.
+
+Exposes the asyncio.Queue subset the callers use: put, put_nowait, get,
+get_nowait, qsize, empty.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger("SignalQueue")
+
+
+class _Entry:
+    __slots__ = ("key", "score", "created", "expires", "seq", "signal", "alive")
+
+    def __init__(self, key: str, score: float, created: float, expires: float, seq: int, signal: dict):
+        self.key = key
+        self.score = score
+        self.created = created
+        self.expires = expires
+        self.seq = seq
+        self.signal = signal
+        self.alive = True
+
+    def rank(self):
+        """Heap key: higher score first, then newer first."""
+        return (-self.score, -self.created, self.seq)
+
+
+class SignalPriorityQueue:
+    def __init__(self, maxsize: int = 20, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Dict[str, _Entry] = {}  # {symbol: live entry}
+        self._heap = []     # (rank, entry), lazy deletion
+        self._expiry = []   # (expires, seq, entry), lazy deletion
+        self._seq = itertools.count()
+        self._getters = deque()
+        self.stats = {"put": 0, "replaced": 0, "expired": 0, "dropped": 0, "served": 0}
+
+    @staticmethod
+    def _key(signal: dict) -> str:
+        return (signal.get("symbol") or "").replace(".P", "").upper()
+
+    # ---------- Producer ----------
+
+    def put_nowait(self, signal: dict):
+        now = time.time()
+        self._evict_expired(now)
+        key = self._key(signal)
+        score = float(signal.get("score", 0) or 0)
+
+        old = self._entries.get(key)
+        if old is not None:
+            old.alive = False
+            del self._entries[key]
+            self.stats["replaced"] += 1
+        elif len(self._entries) >= self.maxsize:
+            # Overflow (rare, small bound): drop whichever of weakest/incoming ranks lower
+            weakest = max(self._entries.values(), key=_Entry.rank)
+            if (-score, -now) >= weakest.rank()[:2]:
+                self.stats["dropped"] += 1
+                return
+            weakest.alive = False
+            del self._entries[weakest.key]
+            self.stats["dropped"] += 1
+
+        entry = _Entry(key, score, now, now + self.ttl, next(self._seq), signal)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, (entry.rank(), entry))
+        heapq.heappush(self._expiry, (entry.expires, entry.seq, entry))
+        self.stats["put"] += 1
+        self._wake_getter()
+
+    async def put(self, signal: dict):
+        self.put_nowait(signal)
+
+    # ---------- Consumer ----------
+
+    def get_nowait(self) -> dict:
+        self._evict_expired(time.time())
+        while self._heap:
+            _, entry = heapq.heappop(self._heap)
+            if entry.alive:
+                entry.alive = False
+                del self._entries[entry.key]
+                self.stats["served"] += 1
+                return entry.signal
+        raise asyncio.QueueEmpty
+
+    async def get(self) -> dict:
+        """Waits until a live signal is available and returns the best one."""
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            waiter = asyncio.get_running_loop().create_future()
+            self._getters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._getters:
+                    self._getters.remove(waiter)
+                raise
+
+    def _wake_getter(self):
+        while self._getters:
+            waiter = self._getters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    # ---------- Housekeeping ----------
+
+    def _evict_expired(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, entry = heapq.heappop(self._expiry)
+            if entry.alive:
+                entry.alive = False
+                del self._entries[entry.key]
+                self.stats["expired"] += 1
+                logger.info(f"⏭️ Evicted stale signal for {entry.key} ({entry.score:.0f})")
+        # Keep the lazily-deleted heap from growing without bound
+        if len(self._heap) > 4 * max(len(self._entries), self.maxsize):
+            self._heap = [item for item in self._heap if item[1].alive]
+            heapq.heapify(self._heap)
+
+    def qsize(self) -> int:
+        self._evict_expired(time.time())
+        return len(self._entries)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def peek(self) -> Optional[dict]:
+        """Best live signal without removing it (None if empty)."""
+        self._evict_expired(time.time())
+        while self._heap and not self._heap[0][1].alive:
+            heapq.heappop(self._heap)
+        return self._heap[0][1].signal if self._heap else None
+
+    def get_metrics(self) -> dict:
+        return {"size": self.qsize(), "maxsize": self.maxsize, "ttl_sec": self.ttl, **self.stats}
@@ -0,0 +1,163 @@
+"""
+V11.12: Vectorized Cross-Sectional Signal Scoring
+==================================================
+Scores the whole universe in one NumPy pass (CVD score, RSI gate and score,
+whale bonus, side labels) instead of a per-symbol Python loop.
+
+The async part of the Sniper rules (1H trend block, trend and pattern
+bonuses) can add at most MAX_ASYNC_BONUS points, so only symbols whose
+vectorized partial score + MAX_ASYNC_BONUS can still reach the signal
+threshold are handed to the async follow-up. Scan cost stays flat as the
+universe grows from ~85 elite pairs to every linear contract.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("SignalScoring")
+
+# Pattern bonus (0-20 points), unchanged from the V9.0 rules
+PATTERN_BONUS: Dict[str, int] = {
+    'pullback_bounce': 12, 'pullback_rejection': 12,
+    'liquidity_sweep_long': 15, 'liquidity_sweep_short': 15,
+    'bull_trap': 20, 'bear_trap': 20,
+    'accumulation_box_exit_up': 18, 'accumulation_box_exit_down': 18,
+    'breakout_up': 10, 'breakout_down': 10,
+}
+MAX_TREND_BONUS = 10.0
+MAX_ASYNC_BONUS = MAX_TREND_BONUS + max(PATTERN_BONUS.values())
+
+SIGNAL_THRESHOLD = 90
+BASE_SCORE = 15
+WHALE_USD = 250000
+
+
+class SignalScorer:
+    """
+    Keeps per-symbol features (CVD, RSI, eligibility) in aligned NumPy
+    arrays; the symbol index is rebuilt only when the universe changes.
+    """
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.norm_index: Dict[str, int] = {}  # V11.13: "SOLUSDT" -> row (WS events carry no .P)
+        self.cvd = np.zeros(0)
+        self.rsi = np.zeros(0)
+        self.eligible = np.zeros(0, dtype=bool)
+        self.last_scan_stats = {}
+
+    def set_universe(self, symbols: List[str]):
+        if symbols == self.symbols:
+            return
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.norm_index = {s.replace(".P", "").upper(): i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.cvd = np.zeros(n)
+        self.rsi = np.full(n, 50.0)
+        self.eligible = np.ones(n, dtype=bool)
+
+    def load_features(self, cvd_getter, rsi_cache: dict, excluded: Optional[set] = None):
+        """Refreshes the feature columns (O(1) lookups per symbol) and the eligibility mask."""
+        n = len(self.symbols)
+        self.cvd = np.fromiter((cvd_getter(s) for s in self.symbols), dtype=np.float64, count=n)
+        rsi_values = (rsi_cache.get(s) for s in self.symbols)
+        self.rsi = np.fromiter((50.0 if v is None else v for v in rsi_values), dtype=np.float64, count=n)
+        norm = [s.replace(".P", "").upper() for s in self.symbols]
+        excluded = excluded or set()
+        self.eligible = np.fromiter((s not in excluded for s in norm), dtype=bool, count=n)
+
+    def update_rows(self, rows: List[int], cvd_getter, rsi_cache: dict, excluded: Optional[set] = None):
+        """V11.13: Refreshes only the given rows (event-driven path)."""
+        excluded = excluded or set()
+        for i in rows:
+            s = self.symbols[i]
+            self.cvd[i] = cvd_getter(s)
+            v = rsi_cache.get(s)
+            self.rsi[i] = 50.0 if v is None else v
+            self.eligible[i] = s.replace(".P", "").upper() not in excluded
+
+    def score(self, drag_mode: bool, rows: Optional[List[int]] = None) -> List[dict]:
+        """
+        One vectorized pass over the universe (or only `rows`). Returns the
+        candidates whose best-case final score can still reach SIGNAL_THRESHOLD, best first.
+        """
+        idx = np.arange(len(self.symbols)) if rows is None else np.asarray(rows, dtype=np.int64)
+        cvd, rsi = self.cvd[idx], self.rsi[idx]
+        abs_cvd = np.abs(cvd)
+
+        # V5.1.0: Sniper Rule (Radar 2.0): Threshold based on USD Money Flow
+        threshold = 5000 if drag_mode else 10000
+        active = self.eligible[idx] & (abs_cvd > threshold)
+
+        # Base CVD Score (0-70 points)
+        cvd_score = np.where(abs_cvd > 50000, np.minimum(70.0, (abs_cvd / 200000) * 70.0), 0.0)
+
+        # RSI Alignment (0-30 points) + momentum block
+        is_long = cvd > 0
+        long_score = np.where(rsi < 65, np.minimum(30.0, ((65 - rsi) / 35.0) * 30.0), 0.0)
+        short_score = np.where(rsi > 35, np.minimum(30.0, ((rsi - 35) / 35.0) * 30.0), 0.0)
+        rsi_score = np.where(is_long, long_score, short_score)
+        rsi_blocked = active & np.where(is_long, rsi > 60, rsi < 40)
+
+        # Whale Activity Bonus (0-20 points)
+        is_whale = abs_cvd > WHALE_USD
+        whale_bonus = np.where(is_whale, 20.0, 0.0)
+
+        partial = cvd_score + rsi_score + whale_bonus + BASE_SCORE
+        passed = active & ~rsi_blocked
+        reachable = passed & (partial + MAX_ASYNC_BONUS >= SIGNAL_THRESHOLD)
+
+        for i in np.flatnonzero(rsi_blocked):
+            side = "Long" if is_long[i] else "Short"
+            logger.info(f"🚫 [RSI MOMENTUM BLOCK] {self.symbols[idx[i]]} {side} blocked (RSI: {rsi[i]:.1f})")
+
+        order = np.flatnonzero(reachable)
+        order = order[np.argsort(-partial[order], kind="stable")]
+        if rows is None:
+            self.last_scan_stats = {
+                "universe": len(self.symbols),
+                "above_threshold": int(active.sum()),
+                "rsi_blocked": int(rsi_blocked.sum()),
+                "candidates": int(order.size),
+            }
+
+        return [
+            {
+                "symbol": self.symbols[idx[i]],
+                "cvd": float(cvd[i]),
+                "rsi": float(rsi[i]),
+                "side_label": "Long" if is_long[i] else "Short",
+                "cvd_score": float(cvd_score[i]),
+                "rsi_score": float(rsi_score[i]),
+                "whale_bonus": float(whale_bonus[i]),
+                "is_whale": bool(is_whale[i]),
+                "partial_score": float(partial[i]),
+            }
+            for i in order
+        ]
+
+
+def finalize_score(candidate: dict, trend: str, pattern: str, trend_strength: float) -> Optional[int]:
+    """
+    Applies the async (1H trend) part of the rules to a vectorized candidate.
+    Returns None when the trend blocks the side, else the capped final score.
+    """
+    side_label = candidate["side_label"]
+    # Trend Alignment Check: Block contra-trend trades
+    if (trend == 'bullish' and side_label == 'Short') or (trend == 'bearish' and side_label == 'Long'):
+        return None
+
+    pattern_bonus = PATTERN_BONUS.get(pattern, 0)
+    trend_bonus = 0
+    if (trend == 'bullish' and side_label == 'Long') or (trend == 'bearish' and side_label == 'Short'):
+        trend_bonus = min(MAX_TREND_BONUS, trend_strength / 10)
+
+    final_score = int(candidate["cvd_score"] + candidate["rsi_score"] + trend_bonus + pattern_bonus + candidate["whale_bonus"] + BASE_SCORE)
+    return min(99, final_score)
+
+
+signal_scorer = SignalScorer()
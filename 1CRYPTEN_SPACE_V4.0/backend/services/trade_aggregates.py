@@ -0,0 +1,161 @@
+"""
+V11.19: Running Trade Aggregates
+=================================
+Lifetime PnL, win/loss counts and per-symbol stats maintained in O(1) per
+closed trade (firebase_service.log_trade) instead of re-summing history.
+
+- In memory: served directly to the bankroll (lucro_total_acumulado).
+- Persisted: vault_management/trade_aggregates, written with Firestore
+  Increment transforms (no read-modify-write, concurrent writers can't lose
+  updates).
+- reconcile(): rebuilds everything from the trade history. Only on demand
+  (API) or when the persisted document does not exist yet.
+
+`lock` serializes load()/reconcile() with log_trade's history write + record(),
+so a trade is counted exactly once: either it is already in the document or
+history being read, or it is folded in after the load finished.
+"""
+
+import asyncio
+import logging
+from typing import Dict
+
+from firebase_admin import firestore
+
+from services.firebase_service import firebase_service
+
+logger = logging.getLogger("TradeAggregates")
+
+PNL_GUARD_USD = 2000  # V6.0: Trades with |pnl| >= this are kept out of the visual total
+
+
+class TradeAggregates:
+    def __init__(self):
+        self.loaded = False
+        self.lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.total_pnl = 0.0
+        self.total_trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.symbols: Dict[str, dict] = {}  # {SYMBOL: {"trades", "wins", "pnl"}}
+
+    def _doc(self):
+        return firebase_service.db.collection("vault_management").document("trade_aggregates")
+
+    @staticmethod
+    def _delta(trade: dict) -> dict:
+        pnl = float(trade.get("pnl", 0) or 0)
+        return {
+            "symbol": (trade.get("symbol") or "").replace(".P", "").upper(),
+            "pnl": pnl,
+            "guarded_pnl": pnl if abs(pnl) < PNL_GUARD_USD else 0.0,
+            "win": 1 if pnl > 0 else 0,
+        }
+
+    def _apply(self, d: dict):
+        self.total_pnl += d["guarded_pnl"]
+        self.total_trades += 1
+        self.wins += d["win"]
+        self.losses += 1 - d["win"]
+        if d["symbol"]:
+            s = self.symbols.setdefault(d["symbol"], {"trades": 0, "wins": 0, "pnl": 0.0})
+            s["trades"] += 1
+            s["wins"] += d["win"]
+            s["pnl"] += d["pnl"]
+
+    # ---------- O(1) update ----------
+
+    async def record(self, trade: dict):
+        """
+        Folds one closed trade into the aggregates (memory + Increment transforms).
+        The caller holds self.lock across the history write and this call.
+        """
+        d = self._delta(trade)
+        if self.loaded:
+            self._apply(d)
+        if not firebase_service.is_active or not firebase_service.db:
+            return
+        try:
+            update = {
+                "total_pnl": firestore.Increment(d["guarded_pnl"]),
+                "total_trades": firestore.Increment(1),
+                "wins": firestore.Increment(d["win"]),
+                "losses": firestore.Increment(1 - d["win"]),
+            }
+            if d["symbol"]:
+                update["symbols"] = {d["symbol"]: {
+                    "trades": firestore.Increment(1),
+                    "wins": firestore.Increment(d["win"]),
+                    "pnl": firestore.Increment(d["pnl"]),
+                }}
+            await asyncio.to_thread(self._doc().set, update, merge=True)
+        except Exception as e:
+            logger.error(f"Error persisting trade aggregates: {e}")
+
+    # ---------- Load / Reconcile ----------
+
+    async def load(self):
+        """Loads the persisted aggregates once; builds them from history if missing."""
+        async with self.lock:
+            if self.loaded or not firebase_service.is_active or not firebase_service.db:
+                return
+            try:
+                doc = await asyncio.to_thread(self._doc().get)
+                data = doc.to_dict() if doc.exists else None
+            except Exception as e:
+                logger.error(f"Error loading trade aggregates: {e}")
+                return
+            if not data:
+                await self._rebuild()
+                return
+            self.total_pnl = float(data.get("total_pnl", 0))
+            self.total_trades = int(data.get("total_trades", 0))
+            self.wins = int(data.get("wins", 0))
+            self.losses = int(data.get("losses", 0))
+            self.symbols = {k: dict(v) for k, v in (data.get("symbols") or {}).items()}
+            self.loaded = True
+            logger.info(f"📊 V11.19: Trade aggregates loaded | Trades: {self.total_trades} | PnL: ${self.total_pnl:.2f}")
+
+    async def reconcile(self) -> dict:
+        """On demand: rebuilds every aggregate from the full trade history and persists it."""
+        async with self.lock:
+            return await self._rebuild()
+
+    async def _rebuild(self) -> dict:
+        from services.trade_store import trade_store
+        await trade_store.initialize()
+        if trade_store.ready:
+            trades = await trade_store.get_trades()
+        else:
+            def _stream():
+                return [d.to_dict() for d in firebase_service.db.collection("trade_history").stream()]
+            trades = await asyncio.to_thread(_stream)
+
+        self._reset()
+        for trade in trades:
+            self._apply(self._delta(trade))
+        self.loaded = True
+
+        snapshot = self.get_snapshot()
+        try:
+            # Absolute set (not merge): drops symbols that no longer exist in history
+            await asyncio.to_thread(self._doc().set, snapshot)
+        except Exception as e:
+            logger.error(f"Error persisting reconciled aggregates: {e}")
+        logger.info(f"📊 V11.19: Trade aggregates reconciled from {len(trades)} trades | PnL: ${self.total_pnl:.2f}")
+        return snapshot
+
+    def get_snapshot(self) -> dict:
+        return {
+            "total_pnl": self.total_pnl,
+            "total_trades": self.total_trades,
+            "wins": self.wins,
+            "losses": self.losses,
+            "symbols": self.symbols,
+        }
+
+
+trade_aggregates = TradeAggregates()
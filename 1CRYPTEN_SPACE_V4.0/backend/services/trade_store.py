@@ -0,0 +1,288 @@
+"""
+V11.18: Local Trade Store (SQLite mirror of trade_history)
+===========================================================
+Every trade logged through firebase_service.log_trade is also appended to a
+local SQLite database (WAL mode). The Firestore collection is copied in once
+(backfill). Analytics read the indexed local table instead of streaming the
+whole collection:
+
+- total PnL (bankroll), cycle trades since a timestamp (vault sync),
+  per-symbol win rate.
+
+All SQLite work runs in asyncio.to_thread on one shared connection guarded by
+a lock, so the event loop never blocks on disk.
+
+History resets: the maintenance scripts empty the mirror with
+reset_local_store(). If trade_history was cleared some other way, startup
+notices that the newest mirrored trade is gone from Firestore and backfills
+again.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from config import settings
+
+logger = logging.getLogger("TradeStore")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id TEXT UNIQUE,
+    timestamp TEXT,
+    ts REAL NOT NULL DEFAULT 0,
+    symbol TEXT,
+    side TEXT,
+    slot_type TEXT,
+    pnl REAL NOT NULL DEFAULT 0,
+    pnl_percent REAL NOT NULL DEFAULT 0,
+    entry_price REAL,
+    exit_price REAL,
+    close_reason TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(ts);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_trades_slot_type ON trades(slot_type, ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_COLUMNS = ("doc_id", "timestamp", "ts", "symbol", "side", "slot_type", "pnl", "pnl_percent",
+            "entry_price", "exit_price", "close_reason", "data")
+
+
+def _to_epoch(value) -> float:
+    """trade_history timestamps are ISO strings (some legacy docs: epoch numbers)."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e12 else float(value)
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+
+
+def _num(value, default=0.0):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class TradeStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TRADE_STORE_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._init_lock = asyncio.Lock()
+        self.backfilled = False
+
+    # ---------- Setup ----------
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+        self._conn = conn
+        self.backfilled = bool(row and row["value"] == "1")
+
+    async def initialize(self):
+        """Opens the database and runs the one-time Firestore backfill. Idempotent."""
+        async with self._init_lock:
+            try:
+                if self._conn is None:
+                    await asyncio.to_thread(self._open)
+                    logger.info(f"🗄️ V11.18: Trade store ready ({self.path}, WAL).")
+                    if self.backfilled and await self._history_was_reset():
+                        logger.warning("🗄️ [TRADE STORE] trade_history was reset behind the mirror. Re-backfilling.")
+                        await asyncio.to_thread(self._truncate)
+                if not self.backfilled:
+                    await self.backfill_from_firestore()
+            except Exception as e:
+                logger.error(f"Error initializing trade store: {e}")
+
+    @property
+    def ready(self) -> bool:
+        """Connected and holding the full history (safe to replace Firestore reads)."""
+        return self._conn is not None and self.backfilled
+
+    def _execute(self, sql: str, params=()):
+        with self._db_lock:
+            self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _row(trade: dict, doc_id: Optional[str]) -> tuple:
+        symbol = (trade.get("symbol") or "").replace(".P", "").upper() or None
+        return (
+            doc_id,
+            trade.get("timestamp") if isinstance(trade.get("timestamp"), str) else None,
+            _to_epoch(trade.get("timestamp")),
+            symbol,
+            trade.get("side"),
+            trade.get("slot_type") or "SNIPER",
+            _num(trade.get("pnl")),
+            _num(trade.get("pnl_percent")),
+            _num(trade.get("entry_price"), None),
+            _num(trade.get("exit_price"), None),
+            trade.get("close_reason"),
+            json.dumps(trade, default=str),
+        )
+
+    def _newest_doc_id(self) -> Optional[str]:
+        rows = self._query("SELECT doc_id FROM trades WHERE doc_id IS NOT NULL ORDER BY ts DESC, id DESC LIMIT 1")
+        return rows[0]["doc_id"] if rows else None
+
+    async def _history_was_reset(self) -> bool:
+        """Startup check (one document read): the newest mirrored trade no longer exists in Firestore."""
+        from services.firebase_service import firebase_service
+        if not firebase_service.is_active or not firebase_service.db:
+            return False
+        doc_id = await asyncio.to_thread(self._newest_doc_id)
+        if doc_id is None:
+            return False
+        doc = await asyncio.to_thread(firebase_service.db.collection("trade_history").document(doc_id).get)
+        return not doc.exists
+
+    def _truncate(self):
+        with self._db_lock:
+            _clear(self._conn)
+        self.backfilled = False
+
+    # ---------- Writes ----------
+
+    async def append(self, trade: dict, doc_id: Optional[str] = None):
+        """Appends one closed trade (called from firebase_service.log_trade)."""
+        if self._conn is None:
+            await self.initialize()
+        if self._conn is None:
+            return
+        try:
+            sql = f"INSERT OR IGNORE INTO trades ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+            await asyncio.to_thread(self._execute, sql, self._row(trade, doc_id))
+        except Exception as e:
+            logger.error(f"Error appending trade to local store: {e}")
+
+    async def backfill_from_firestore(self):
+        """One-time copy of trade_history (doc ids keep it idempotent)."""
+        from services.firebase_service import firebase_service
+        if not firebase_service.is_active or not firebase_service.db:
+            return
+        start = time.perf_counter()
+
+        def _stream():
+            docs = firebase_service.db.collection("trade_history").stream()
+            return [(d.id, d.to_dict()) for d in docs]
+
+        docs = await asyncio.to_thread(_stream)
+        rows = [self._row(data, doc_id) for doc_id, data in docs]
+        sql = f"INSERT OR IGNORE INTO trades ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+        def _write():
+            with self._db_lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(sql, rows)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', '1')")
+                self._conn.execute("COMMIT")
+
+        await asyncio.to_thread(_write)
+        self.backfilled = True
+        logger.info(f"🗄️ V11.18: Backfilled {len(rows)} trades from Firestore in {(time.perf_counter() - start) * 1000:.0f}ms.")
+
+    # ---------- Analytics ----------
+
+    async def total_pnl(self, max_abs: float = 2000) -> float:
+        """Cumulative PnL (V6.0 guard: trades with |pnl| >= max_abs are ignored)."""
+        rows = await asyncio.to_thread(self._query, "SELECT COALESCE(SUM(pnl), 0) AS total FROM trades WHERE ABS(pnl) < ?", (max_abs,))
+        return float(rows[0]["total"])
+
+    async def get_trades(self, since: Optional[str] = None, slot_type: Optional[str] = None, symbol: Optional[str] = None) -> List[dict]:
+        """Trades (oldest first) filtered on the indexed columns; full documents are returned."""
+        clauses, params = [], []
+        if since:
+            clauses.append("ts >= ?")
+            params.append(_to_epoch(since))
+        if slot_type:
+            clauses.append("slot_type = ?")
+            params.append(slot_type)
+        if symbol:
+            clauses.append("symbol = ?")
+            params.append(symbol.replace(".P", "").upper())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = await asyncio.to_thread(self._query, f"SELECT data FROM trades {where} ORDER BY ts", tuple(params))
+        return [json.loads(r["data"]) for r in rows]
+
+    async def cycle_stats(self, since: Optional[str] = None, slot_type: str = "SNIPER") -> dict:
+        """Trade count, gains/losses, profit and loss totals since a cycle start."""
+        sql = (
+            "SELECT COUNT(*) AS trades, "
+            "COALESCE(SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END), 0) AS gains, "
+            "COALESCE(SUM(CASE WHEN pnl <= 0 THEN 1 ELSE 0 END), 0) AS losses, "
+            "COALESCE(SUM(pnl), 0) AS profit, "
+            "COALESCE(SUM(CASE WHEN pnl < 0 THEN -pnl ELSE 0 END), 0) AS loss_total "
+            "FROM trades WHERE slot_type = ? AND ts >= ?"
+        )
+        rows = await asyncio.to_thread(self._query, sql, (slot_type, _to_epoch(since) if since else 0.0))
+        return dict(rows[0])
+
+    async def symbol_stats(self, since: Optional[str] = None, min_trades: int = 1) -> List[dict]:
+        """Per-symbol trades, win rate and PnL, best PnL first."""
+        sql = (
+            "SELECT symbol, COUNT(*) AS trades, "
+            "SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END) AS wins, "
+            "SUM(pnl) AS pnl FROM trades WHERE ts >= ? AND symbol IS NOT NULL "
+            "GROUP BY symbol HAVING COUNT(*) >= ? ORDER BY pnl DESC"
+        )
+        rows = await asyncio.to_thread(self._query, sql, (_to_epoch(since) if since else 0.0, min_trades))
+        return [
+            {**dict(r), "win_rate": round(r["wins"] / r["trades"] * 100, 1) if r["trades"] else 0.0}
+            for r in rows
+        ]
+
+
+def _clear(conn: sqlite3.Connection):
+    conn.execute("BEGIN")
+    conn.execute("DELETE FROM trades")
+    conn.execute("DELETE FROM meta WHERE key = 'backfilled'")
+    conn.execute("COMMIT")
+
+
+def reset_local_store(path: Optional[str] = None) -> int:
+    """
+    Maintenance scripts (history reset): empties the local mirror and clears
+    the backfill flag, so the next start copies the (now empty) history again.
+    Returns the number of trades removed.
+    """
+    path = path or settings.TRADE_STORE_PATH
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.executescript(_SCHEMA)
+        removed = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        _clear(conn)
+        return removed
+    finally:
+        conn.close()
+
+
+trade_store = TradeStore()
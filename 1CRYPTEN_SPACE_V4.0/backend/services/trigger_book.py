@@ -0,0 +1,147 @@
+"""
+V11.25: Price-indexed Trigger Book
+===================================
+Per-symbol sorted arrays of the next Smart SL boundary of every open
+position (see ExecutionProtocol.trigger_levels):
+
+- up:   fire when price >= level (sorted ascending; crossed = prefix)
+- down: fire when price <= level (sorted ascending; crossed = suffix)
+
+crossed(symbol, price) finds both ends with bisect, so a price update costs
+O(log n + fired) instead of one protocol call per open position. Positions
+are re-armed after they are evaluated. A position whose state signature
+(side, entry, stop) changed since it was armed is always evaluated, so stop
+moves made by other paths are picked up.
+"""
+
+import bisect
+import logging
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("TriggerBook")
+
+
+class _SymbolBook:
+    __slots__ = ("up_prices", "up_keys", "down_prices", "down_keys")
+
+    def __init__(self):
+        self.up_prices: List[float] = []
+        self.up_keys: List[Hashable] = []
+        self.down_prices: List[float] = []
+        self.down_keys: List[Hashable] = []
+
+    @staticmethod
+    def _insert(prices: List[float], keys: List[Hashable], price: float, key: Hashable):
+        i = bisect.bisect_right(prices, price)
+        prices.insert(i, price)
+        keys.insert(i, key)
+
+    @staticmethod
+    def _remove(prices: List[float], keys: List[Hashable], price: float, key: Hashable):
+        i = bisect.bisect_left(prices, price)
+        while i < len(prices) and prices[i] == price:
+            if keys[i] == key:
+                del prices[i], keys[i]
+                return
+            i += 1
+
+    def __len__(self):
+        return len(self.up_prices) + len(self.down_prices)
+
+
+class TriggerBook:
+    def __init__(self):
+        self._books: Dict[str, _SymbolBook] = {}
+        self._armed: Dict[Hashable, Tuple[str, Optional[float], Optional[float], tuple]] = {}  # key → (symbol, down, up, sig)
+        self.stats = {"updates": 0, "fired": 0, "armed": 0, "skipped_evaluations": 0}
+
+    @staticmethod
+    def _norm(symbol: str) -> str:
+        return symbol.replace(".P", "").upper()
+
+    def arm(self, key: Hashable, symbol: str, down: Optional[float], up: Optional[float], sig: tuple = ()):
+        """(Re)places a position's boundaries. None = no trigger on that side."""
+        self.disarm(key)
+        symbol = self._norm(symbol)
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _SymbolBook()
+        if down is not None:
+            book._insert(book.down_prices, book.down_keys, down, key)
+        if up is not None:
+            book._insert(book.up_prices, book.up_keys, up, key)
+        self._armed[key] = (symbol, down, up, sig)
+        self.stats["armed"] += 1
+
+    def disarm(self, key: Hashable):
+        entry = self._armed.pop(key, None)
+        if entry is None:
+            return
+        symbol, down, up, _ = entry
+        book = self._books.get(symbol)
+        if book is None:
+            return
+        if down is not None:
+            book._remove(book.down_prices, book.down_keys, down, key)
+        if up is not None:
+            book._remove(book.up_prices, book.up_keys, up, key)
+        if not len(book):
+            del self._books[symbol]
+
+    def is_armed(self, key: Hashable, sig: tuple = ()) -> bool:
+        """Armed with the same state signature (otherwise the position must be re-evaluated)."""
+        entry = self._armed.get(key)
+        return entry is not None and entry[3] == sig
+
+    def crossed(self, symbol: str, price: float) -> Set[Hashable]:
+        """Keys whose up or down boundary this price reached. O(log n + fired)."""
+        self.stats["updates"] += 1
+        book = self._books.get(self._norm(symbol))
+        if book is None or price <= 0:
+            return set()
+        fired = set(book.up_keys[:bisect.bisect_right(book.up_prices, price)])
+        fired.update(book.down_keys[bisect.bisect_left(book.down_prices, price):])
+        self.stats["fired"] += len(fired)
+        return fired
+
+    def prune(self, namespace: str, live_keys: Set[Hashable]):
+        """Disarms a loop's (namespace, id) keys that no longer belong to an open position."""
+        for key in [k for k in self._armed if k[0] == namespace and k not in live_keys]:
+            self.disarm(key)
+
+    # ---------- Smart SL positions ----------
+
+    @classmethod
+    def signature(cls, slot_data: dict) -> tuple:
+        return (cls._norm(slot_data.get("symbol") or ""), slot_data.get("side"),
+                slot_data.get("entry_price", 0), slot_data.get("current_stop", 0) or 0)
+
+    def arm_position(self, key: Hashable, slot_data: dict) -> bool:
+        """Arms the position's next Smart SL boundaries (ladder must be prepared)."""
+        from services.execution_protocol import execution_protocol
+        levels = execution_protocol.trigger_levels(slot_data)
+        if levels is None:
+            self.disarm(key)
+            return False
+        self.arm(key, slot_data["symbol"], levels[0], levels[1], sig=self.signature(slot_data))
+        return True
+
+    def should_evaluate(self, key: Hashable, slot_data: dict, fired: Set[Hashable]) -> bool:
+        """False only when the position is armed for its current state and nothing fired."""
+        if key in fired or not self.is_armed(key, self.signature(slot_data)):
+            return True
+        self.stats["skipped_evaluations"] += 1
+        return False
+
+    def get_metrics(self) -> dict:
+        return {
+            **self.stats,
+            "armed_positions": len(self._armed),
+            "symbols": len(self._books),
+            "levels": {
+                s: {"down": list(b.down_prices), "up": list(b.up_prices)} for s, b in self._books.items()
+            },
+        }
+
+
+trigger_book = TriggerBook()
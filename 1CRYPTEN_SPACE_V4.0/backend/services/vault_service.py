@@ -2,6 +2,7 @@
 Vault Management Service V9.0
 Gerencia o ciclo de 10 trades Sniper com diversificação obrigatória e compound automático.
 """
+import copy
 import logging
 import asyncio
 from datetime import datetime, timezone, timedelta
@@ -14,37 +15,118 @@ logger = logging.getLogger("VaultService")
 class VaultService:
     def __init__(self):
         self.cycle_doc_path = "vault_management/current_cycle"
-        
+        # V11.20: In-memory cycle state (document listener + write-through from the mutators below)
+        self._cycle = None
+        self._cycle_watch = None
+        self._loop = None
+        self.cycle_stats = {"memory_reads": 0, "document_reads": 0, "snapshots": 0}
+
+    # ========== V11.20 CYCLE STATE CACHE ==========
+
+    def _cycle_ref(self):
+        return firebase_service.db.collection("vault_management").document("current_cycle")
+
+    def _start_cycle_listener(self):
+        """current_cycle document listener: external edits (dashboard, scripts) land in memory."""
+        if self._cycle_watch is not None:
+            return
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._cycle_watch = self._cycle_ref().on_snapshot(self._on_cycle_snapshot)
+            logger.info("📡 V11.20: current_cycle listener ACTIVE (permission checks served from memory).")
+        except Exception as e:
+            self._cycle_watch = None
+            logger.error(f"Error starting cycle listener: {e}")
+
+    def stop_cycle_listener(self):
+        if self._cycle_watch is not None:
+            try:
+                self._cycle_watch.unsubscribe()
+            except Exception as e:
+                logger.warning(f"Error stopping cycle listener: {e}")
+            self._cycle_watch = None
+        self._cycle = None
+
+    def _on_cycle_snapshot(self, docs, changes, read_time):
+        """Runs on the Firestore watch thread: hand the data to the event loop."""
+        try:
+            doc = docs[0] if docs else None
+            data = doc.to_dict() if doc is not None and doc.exists else None
+            if data and self._loop and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._apply_cycle_snapshot, data)
+        except Exception as e:
+            logger.error(f"Error handling cycle snapshot: {e}")
+
+    def _apply_cycle_snapshot(self, data: dict):
+        self._cycle = data
+        self.cycle_stats["snapshots"] += 1
+
+    def _write_through(self, fields: dict):
+        if self._cycle is not None:
+            self._cycle.update(copy.deepcopy(fields))
+
+    async def _update_cycle(self, fields: dict, local: dict = None):
+        """
+        Firestore update of current_cycle + write-through to the in-memory state.
+        `local` carries the resulting values when `fields` holds transforms (Increment).
+        """
+        def _update():
+            self._cycle_ref().update(fields)
+
+        await asyncio.to_thread(_update)
+        self._write_through(local if local is not None else fields)
+
+    async def _current(self) -> dict:
+        """Live cycle state for read-only checks (no copy, no Firestore read once cached)."""
+        if self._cycle is not None and firebase_service.is_active:
+            self.cycle_stats["memory_reads"] += 1
+            await self._check_rest_expiry(self._cycle)
+            return self._cycle
+        return await self.get_cycle_status()
+
+    async def _check_rest_expiry(self, data: dict):
+        """Auto-exits Admiral's Rest when its period has ended (rest_until: Timestamp or ISO string)."""
+        if data.get("in_admiral_rest") and data.get("rest_until"):
+            rest_until = data["rest_until"]
+            if hasattr(rest_until, 'timestamp'):
+                rest_until = datetime.fromtimestamp(rest_until.timestamp(), tz=timezone.utc)
+            elif isinstance(rest_until, str):
+                rest_until = datetime.fromisoformat(rest_until.replace("Z", "+00:00"))
+            if datetime.now(timezone.utc) > rest_until:
+                # Auto-exit rest mode
+                await self.deactivate_admiral_rest()
+                data["in_admiral_rest"] = False
+
     async def get_cycle_status(self) -> dict:
         """
         Retorna o status atual do ciclo de 10 trades Sniper.
         Returns: {sniper_wins, cycle_number, cycle_profit, in_admiral_rest, rest_until}
+        V11.20: Served from memory (listener + write-through); a copy is returned.
         """
         try:
             if not firebase_service.is_active or not firebase_service.db:
                 return self._default_cycle()
+
+            if self._cycle is not None:
+                self.cycle_stats["memory_reads"] += 1
+                await self._check_rest_expiry(self._cycle)
+                return copy.deepcopy(self._cycle)
             
             def _get():
-                doc = firebase_service.db.collection("vault_management").document("current_cycle").get()
+                doc = self._cycle_ref().get()
                 return doc.to_dict() if doc.exists else None
             
             data = await asyncio.to_thread(_get)
+            self.cycle_stats["document_reads"] += 1
             if not data:
                 # Initialize if not exists
                 await self.initialize_cycle()
                 return self._default_cycle()
-            
-            # Check if rest period has ended
-            if data.get("in_admiral_rest") and data.get("rest_until"):
-                rest_until = data["rest_until"]
-                if hasattr(rest_until, 'timestamp'):
-                    rest_until = datetime.fromtimestamp(rest_until.timestamp(), tz=timezone.utc)
-                if datetime.now(timezone.utc) > rest_until:
-                    # Auto-exit rest mode
-                    await self.deactivate_admiral_rest()
-                    data["in_admiral_rest"] = False
-                    
-            return data
+
+            self._cycle = data
+            self._start_cycle_listener()
+            await self._check_rest_expiry(data)
+            return copy.deepcopy(data)
             
         except Exception as e:
             logger.error(f"Error getting cycle status: {e}")
@@ -84,13 +166,19 @@ class VaultService:
             if not firebase_service.is_active or not firebase_service.db:
                 return
                 
+            default = self._default_cycle()
+
             def _init():
                 doc_ref = firebase_service.db.collection("vault_management").document("current_cycle")
                 if not doc_ref.get().exists:
-                    doc_ref.set(self._default_cycle())
+                    doc_ref.set(default)
                     logger.info("Vault cycle initialized.")
+                    return True
+                return False
             
-            await asyncio.to_thread(_init)
+            if await asyncio.to_thread(_init):
+                self._cycle = copy.deepcopy(default) # V11.20: Write-through
+                self._start_cycle_listener()
         except Exception as e:
             logger.error(f"Error initializing cycle: {e}")
     
@@ -104,7 +192,7 @@ class VaultService:
         - Drag Mode Standby: Lock for 3 trades (Flexible).
         """
         try:
-            current = await self.get_cycle_status()
+            current = await self._current()
             used_symbols = current.get("used_symbols_in_cycle", [])
             norm_symbol = symbol.replace(".P", "").upper()
             
@@ -177,12 +265,9 @@ class VaultService:
             
             total_trades = len(used_symbols)
             
-            def _update():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "used_symbols_in_cycle": used_symbols
-                })
-            
-            await asyncio.to_thread(_update)
+            await self._update_cycle({
+                "used_symbols_in_cycle": used_symbols
+            })
             logger.info(f"🔄 V10.1: {norm_symbol} adicionado ao ciclo (Trade #{current_index}). Progresso Total: {total_trades}.")
             
             # Se completou 10 trades, iniciar recálculo de compound
@@ -206,18 +291,15 @@ class VaultService:
             current = await self.get_cycle_status()
             new_cycle_number = current.get("cycle_number", 1) + 1
             
-            def _reset():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "used_symbols_in_cycle": [],
-                    "cycle_number": new_cycle_number,
-                    "total_trades_cycle": 0,
-                    "cycle_gains_count": 0,
-                    "cycle_losses_count": 0,
-                    "cycle_profit": 0.0,
-                    "started_at": datetime.now(timezone.utc).isoformat()
-                })
-            
-            await asyncio.to_thread(_reset)
+            await self._update_cycle({
+                "used_symbols_in_cycle": [],
+                "cycle_number": new_cycle_number,
+                "total_trades_cycle": 0,
+                "cycle_gains_count": 0,
+                "cycle_losses_count": 0,
+                "cycle_profit": 0.0,
+                "started_at": datetime.now(timezone.utc).isoformat()
+            })
             await firebase_service.log_event("VAULT", f"🔄 V9.0: CICLO #{new_cycle_number} INICIADO! Lista de exclusão resetada. 83 pares disponíveis.", "SUCCESS")
             logger.info(f"V9.0: Cycle symbols reset. New cycle #{new_cycle_number}")
             
@@ -234,13 +316,10 @@ class VaultService:
             
             entry_value = balance * 0.10  # [V10.6.2] Correct 10% margin rule
             
-            def _init():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "cycle_start_bankroll": balance,
-                    "next_entry_value": entry_value
-                })
-            
-            await asyncio.to_thread(_init)
+            await self._update_cycle({
+                "cycle_start_bankroll": balance,
+                "next_entry_value": entry_value
+            })
             logger.info(f"📊 V9.0 Compound: Banca travada em ${balance:.2f}. Entrada: ${entry_value:.2f}")
             await firebase_service.log_event("VAULT", f"📊 V9.0 COMPOUND: Banca do ciclo travada em ${balance:.2f}. Cada trade usará ${entry_value:.2f}.", "SUCCESS")
             
@@ -265,13 +344,10 @@ class VaultService:
             if not firebase_service.is_active or not firebase_service.db:
                 return
             
-            def _update():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "cycle_start_bankroll": new_balance,
-                    "next_entry_value": new_entry
-                })
-            
-            await asyncio.to_thread(_update)
+            await self._update_cycle({
+                "cycle_start_bankroll": new_balance,
+                "next_entry_value": new_entry
+            })
             
             emoji = "🚀" if profit_pct > 0 else "⚠️"
             logger.info(f"V9.0 Compound: Recálculo completo. Nova banca: ${new_balance:.2f} ({profit_pct:+.2f}%)")
@@ -285,8 +361,8 @@ class VaultService:
         V9.0: Retorna lista de pares já usados no ciclo atual.
         """
         try:
-            current = await self.get_cycle_status()
-            return current.get("used_symbols_in_cycle", [])
+            current = await self._current()
+            return list(current.get("used_symbols_in_cycle", []))
         except Exception as e:
             logger.error(f"Error getting used symbols: {e}")
             return []
@@ -353,12 +429,26 @@ class VaultService:
             new_profit = current.get("cycle_profit", 0) + pnl
             new_total_trades = current.get("total_trades_cycle", 0) + 1
             
+            # V11.19: Firestore Increment transforms (atomic, no read-modify-write of the document);
+            # the local new_* values above are only used for thresholds and logs
+            from firebase_admin import firestore
             update_data = {
+                "cycle_gains_count": firestore.Increment(1 if is_sniper_win else 0),
+                "cycle_losses_count": firestore.Increment(0 if (is_sniper_win or is_pnl_positive) else 1),
+                "cycle_profit": firestore.Increment(pnl),
+                "total_trades_cycle": firestore.Increment(1),
+                # V11.0: Mega Cycle
+                "mega_cycle_wins": firestore.Increment(1 if is_sniper_win else 0),
+                "mega_cycle_total": firestore.Increment(1),
+                "mega_cycle_profit": firestore.Increment(pnl)
+            }
+            
+            # V11.20: Same values for the in-memory cycle state (write-through)
+            local_data = {
                 "cycle_gains_count": new_wins_count,
                 "cycle_losses_count": new_losses_count,
                 "cycle_profit": new_profit,
                 "total_trades_cycle": new_total_trades,
-                # V11.0: Mega Cycle
                 "mega_cycle_wins": mega_wins,
                 "mega_cycle_total": mega_total,
                 "mega_cycle_profit": mega_profit
@@ -371,12 +461,10 @@ class VaultService:
                 update_data["mega_cycle_wins"] = 0
                 update_data["mega_cycle_total"] = 0
                 update_data["mega_cycle_profit"] = 0.0
+                local_data.update({"mega_cycle_number": mega_number, "mega_cycle_wins": 0, "mega_cycle_total": 0, "mega_cycle_profit": 0.0})
                 await firebase_service.log_event("VAULT", f"🏆🏆🏆 MEGA CICLO #{mega_number-1} CONCLUÍDO! 100 trades com ROI >= 100%! Lucro: ${mega_profit:.2f}", "SUCCESS")
             
-            def _update():
-                firebase_service.db.collection("vault_management").document("current_cycle").update(update_data)
-            
-            await asyncio.to_thread(_update)
+            await self._update_cycle(update_data, local=local_data)
             
             # [V10.6.2] Automated 10-Trade Cycle Recalibration
             if new_total_trades > 0 and new_total_trades % 10 == 0:
@@ -416,14 +504,20 @@ class VaultService:
             cycle_num = current.get("cycle_number", 1)
             
             # 1. Fetch trades for this cycle (Sniper & Surf)
-            def _get_history():
-                docs = (firebase_service.db.collection("trade_history").stream())
-                return [d.to_dict() for d in docs]
-            
-            all_trades = await asyncio.to_thread(_get_history)
+            started_at = current.get("started_at")
+            from services.trade_store import trade_store
+            await trade_store.initialize()
+            if trade_store.ready:
+                # V11.18: Indexed local query (only this cycle's trades, no collection stream)
+                all_trades = await trade_store.get_trades(since=started_at)
+            else:
+                def _get_history():
+                    docs = (firebase_service.db.collection("trade_history").stream())
+                    return [d.to_dict() for d in docs]
+
+                all_trades = await asyncio.to_thread(_get_history)
             
             # Filtro opcional: apenas trades após a data de início do ciclo
-            started_at = current.get("started_at")
             trades = all_trades  # Default for loop
             if started_at:
                 try:
@@ -485,10 +579,7 @@ class VaultService:
                 "used_symbols_in_cycle": list(used_symbols)
             }
             
-            def _push():
-                firebase_service.db.collection("vault_management").document("current_cycle").update(update_data)
-            
-            await asyncio.to_thread(_push)
+            await self._update_cycle(update_data)
             logger.info(f"✅ Sincronização concluída: #{new_wins}/20 Wins | Total Trades (Sniper): {len([t for t in all_trades if t.get('slot_type') == 'SNIPER'])} | Profit: ${new_profit:.2f} | Symbols: {len(used_symbols)}")
             await firebase_service.log_event("VAULT", f"🔄 SINCRONIA COMPLETA: #{new_wins}/20 | Trades (Sniper): {len([t for t in all_trades if t.get('slot_type') == 'SNIPER'])}/10 | Profit: ${new_profit:.2f}", "SUCCESS")
             
@@ -536,12 +627,12 @@ class VaultService:
             def _execute():
                 # Add to withdrawals subcollection
                 firebase_service.db.collection("vault_management").document("withdrawals").collection("history").add(withdrawal_record)
-                # Update vault total
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "vault_total": new_vault_total
-                })
             
             await asyncio.to_thread(_execute)
+            # Update vault total
+            await self._update_cycle({
+                "vault_total": new_vault_total
+            })
             await firebase_service.log_event("VAULT", f"💰 Retirada de ${amount:.2f} registrada. Cofre Total: ${new_vault_total:.2f}", "SUCCESS")
             
             return True
@@ -600,6 +691,7 @@ class VaultService:
                 firebase_service.db.collection("vault_management").document("current_cycle").set(new_data)
             
             await asyncio.to_thread(_update)
+            self._cycle = copy.deepcopy(new_data) # V11.20: Write-through (whole document replaced)
             await firebase_service.log_event("VAULT", f"🚀 Novo Ciclo #{new_cycle} iniciado!", "SUCCESS")
             
             return new_data
@@ -617,13 +709,10 @@ class VaultService:
             
             rest_until = datetime.now(timezone.utc) + timedelta(hours=hours)
             
-            def _activate():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "in_admiral_rest": True,
-                    "rest_until": rest_until.isoformat()
-                })
-            
-            await asyncio.to_thread(_activate)
+            await self._update_cycle({
+                "in_admiral_rest": True,
+                "rest_until": rest_until.isoformat()
+            })
             await firebase_service.log_event("VAULT", f"😴 Admiral's Rest ativado por {hours}h. Sistema em standby.", "WARNING")
             
             return True
@@ -637,13 +726,10 @@ class VaultService:
             if not firebase_service.is_active or not firebase_service.db:
                 return False
             
-            def _deactivate():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "in_admiral_rest": False,
-                    "rest_until": None
-                })
-            
-            await asyncio.to_thread(_deactivate)
+            await self._update_cycle({
+                "in_admiral_rest": False,
+                "rest_until": None
+            })
             await firebase_service.log_event("VAULT", "⚡ Admiral's Rest desativado. Sistema operacional.", "SUCCESS")
             
             return True
@@ -659,13 +745,10 @@ class VaultService:
             if not firebase_service.is_active or not firebase_service.db:
                 return False
             
-            def _set():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "cautious_mode": enabled,
-                    "min_score_threshold": min_score if enabled else 75
-                })
-            
-            await asyncio.to_thread(_set)
+            await self._update_cycle({
+                "cautious_mode": enabled,
+                "min_score_threshold": min_score if enabled else 75
+            })
             
             status = f"ATIVADO (Score mínimo: {min_score})" if enabled else "DESATIVADO"
             await firebase_service.log_event("VAULT", f"⚠️ Modo Cautela {status}", "WARNING" if enabled else "INFO")
@@ -683,12 +766,9 @@ class VaultService:
             if not firebase_service.is_active or not firebase_service.db:
                 return False
             
-            def _set():
-                firebase_service.db.collection("vault_management").document("current_cycle").update({
-                    "sniper_mode_active": enabled
-                })
-            
-            await asyncio.to_thread(_set)
+            await self._update_cycle({
+                "sniper_mode_active": enabled
+            })
             
             status = "AUTORIZADO 🟢" if enabled else "BLOQUEADO 🔴"
             await firebase_service.log_event("VAULT", f"⚓ Capitão Sniper {status} pelo Almirante.", "SUCCESS" if enabled else "WARNING")
@@ -704,7 +784,7 @@ class VaultService:
         Returns: (allowed: bool, reason: str)
         """
         try:
-            status = await self.get_cycle_status()
+            status = await self._current()
             
             # [V10.6.2] Master Toggle IGNORED for Autonomous Mode
             # if not status.get("sniper_mode_active", True):
@@ -744,7 +824,7 @@ class VaultService:
     async def get_min_score_threshold(self) -> int:
         """Retorna o threshold de score atual (75 normal, 85+ em modo cautela)."""
         try:
-            status = await self.get_cycle_status()
+            status = await self._current()
             return status.get("min_score_threshold", 75)
         except:
             return 75
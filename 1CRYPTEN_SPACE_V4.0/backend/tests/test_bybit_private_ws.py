@@ -0,0 +1,124 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from services.bybit_private_ws import BybitPrivateWS
+
+
+class FakeSocket:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+def rest_stub(monkeypatch, positions):
+    calls = []
+
+    async def get_positions(**_):
+        calls.append("positions")
+        return {"result": {"list": list(positions)}}
+
+    async def get_wallet_balance(**_):
+        return {"result": {"list": [{"totalEquity": "100"}]}}
+
+    http = SimpleNamespace(get_positions=get_positions, get_wallet_balance=get_wallet_balance)
+    monkeypatch.setitem(sys.modules, "services.bybit_rest", SimpleNamespace(bybit_rest_service=SimpleNamespace(http=http)))
+    return calls
+
+
+def position(size, side="Buy"):
+    return {"symbol": "SOLUSDT", "side": side, "size": str(size)}
+
+
+def fill(qty, closed, fee, pnl=None):
+    e = {"symbol": "SOLUSDT", "execQty": str(qty), "closedSize": str(closed), "execFee": str(fee), "execPrice": "100"}
+    if pnl is not None:
+        e["execPnl"] = str(pnl)
+    return e
+
+
+async def seeded_stream(monkeypatch, positions=()):
+    stream = BybitPrivateWS()
+    stream.ws = FakeSocket()
+    rest_stub(monkeypatch, positions)
+    await stream.resync()
+    return stream
+
+
+def test_close_pnl_subtracts_the_opening_fees(monkeypatch):
+    async def scenario():
+        stream = await seeded_stream(monkeypatch)
+        stream._apply_executions([fill(1, 0, 0.05), fill(1, 0, 0.05)], 0)
+        stream._apply_positions([position(2)], 0)
+        stream._apply_executions([fill(2, 2, 0.1, pnl=3.0)], 0)
+        stream._apply_positions([position(0)], 0)
+        return stream.pop_closed("SOLUSDT")
+
+    record = asyncio.run(scenario())
+    assert record["pnl"] == pytest.approx(3.0 - 0.1 - 0.1)  # REST closedPnl
+
+
+def test_flip_fill_defers_to_rest_pnl(monkeypatch):
+    async def scenario():
+        stream = await seeded_stream(monkeypatch)
+        stream._apply_executions([fill(1, 0, 0.1)], 0)
+        stream._apply_positions([position(1)], 0)
+        stream._apply_executions([fill(3, 1, 0.3, pnl=2.0)], 0)  # Closes 1, opens 2 short
+        stream._apply_positions([position(2, "Sell")], 0)
+        stream._apply_executions([fill(2, 2, 0.2, pnl=1.0)], 0)
+        stream._apply_positions([position(0)], 0)
+        closed = stream.pop_closed("SOLUSDT")
+        stream._apply_executions([fill(1, 0, 0.1)], 0)  # Next position is tracked again
+        stream._apply_positions([position(1)], 0)
+        stream._apply_executions([fill(1, 1, 0.1, pnl=0.5)], 0)
+        stream._apply_positions([position(0)], 0)
+        return closed, stream.pop_closed("SOLUSDT")
+
+    flipped, clean = asyncio.run(scenario())
+    assert flipped["pnl"] is None
+    assert clean["pnl"] == pytest.approx(0.5 - 0.1 - 0.1)
+
+
+def test_positions_open_at_seed_defer_to_rest_pnl(monkeypatch):
+    async def scenario():
+        stream = await seeded_stream(monkeypatch, [position(1)])
+        stream._apply_executions([fill(1, 0, 0.1)], 0)  # Added to a position opened before the seed
+        stream._apply_executions([fill(2, 2, 0.2, pnl=1.0)], 0)
+        stream._apply_positions([position(0)], 0)
+        return stream.pop_closed("SOLUSDT")
+
+    assert asyncio.run(scenario())["pnl"] is None
+
+
+def test_reconnect_reseeds_before_going_live(monkeypatch):
+    monkeypatch.setattr(settings, "PRIVATE_WS_CHECK_SEC", 0.001)
+
+    async def scenario():
+        stream = await seeded_stream(monkeypatch)
+        calls = rest_stub(monkeypatch, [position(1)])  # Opened while the socket was down
+        assert stream.live
+        stream.ws.connected = False
+        assert not stream.live and not stream.seeded
+        assert stream.stats["disconnects"] == 1
+
+        loop_task = asyncio.create_task(stream.run_consistency_loop())
+        await asyncio.sleep(0.02)
+        assert not calls  # No reseed while the socket is still down
+        stream.ws.connected = True
+        for _ in range(100):
+            await asyncio.sleep(0.005)
+            if stream.live:
+                break
+        loop_task.cancel()
+        return stream, calls
+
+    stream, calls = asyncio.run(scenario())
+    assert calls == ["positions"]
+    assert stream.live
+    assert "SOLUSDT" in stream.positions
+    assert stream._untracked == {"SOLUSDT"}
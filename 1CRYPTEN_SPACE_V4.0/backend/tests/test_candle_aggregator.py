@@ -0,0 +1,80 @@
+from services.candle_aggregator import CandleAggregator
+
+MIN = 60_000
+
+
+def make_aggregator(history=5):
+    aggregator = CandleAggregator(intervals={"1": MIN}, history={"1": history})
+    closed = []
+    aggregator.add_close_listener(lambda symbol, interval, bar: closed.append((symbol, list(bar))))
+    return aggregator, closed
+
+
+def test_quiet_gap_is_filled_with_flat_bars():
+    aggregator, closed = make_aggregator()
+    aggregator.ingest("SOLUSDT.P", [(0, 10.0, 1.0), (30_000, 12.0, 2.0)])
+    aggregator.ingest("SOLUSDT.P", [(3 * MIN + 5, 11.0, 1.0)])
+    bars = aggregator.get_bars("SOLUSDT", "1", 0)
+    assert bars == [
+        [0, 10.0, 12.0, 10.0, 12.0, 3.0, 34.0],
+        [MIN, 12.0, 12.0, 12.0, 12.0, 0.0, 0.0],
+        [2 * MIN, 12.0, 12.0, 12.0, 12.0, 0.0, 0.0],
+        [3 * MIN, 11.0, 11.0, 11.0, 11.0, 1.0, 11.0],
+    ]
+    assert [b for _, b in closed] == bars[:-1]
+    assert {s for s, _ in closed} == {"SOLUSDT"}
+
+
+def test_long_gap_is_capped_at_the_history_length():
+    aggregator, closed = make_aggregator(history=5)
+    aggregator.ingest("SOLUSDT", [(0, 10.0, 1.0)])
+    aggregator.ingest("SOLUSDT", [(1_000 * MIN, 11.0, 1.0)])
+    bars = aggregator.get_bars("SOLUSDT", "1", 0, include_current=False)
+    assert [b[0] for b in bars] == [(1_000 - 5 + i) * MIN for i in range(5)]
+    assert all(b[1:5] == [10.0] * 4 for b in bars)
+    assert len(closed) == 6  # The real bar + only the flat bars that can be held
+
+
+def test_late_print_for_a_closed_bar_is_ignored():
+    aggregator, closed = make_aggregator()
+    aggregator.ingest("SOLUSDT", [(0, 10.0, 1.0), (MIN, 11.0, 1.0)])
+    before = aggregator.get_bars("SOLUSDT", "1", 0)
+    aggregator.ingest("SOLUSDT", [(30_000, 99.0, 5.0)])
+    assert aggregator.get_bars("SOLUSDT", "1", 0) == before
+    assert len(closed) == 1
+
+
+def test_seed_merges_rest_history_behind_live_bars():
+    aggregator, _ = make_aggregator(history=10)
+    aggregator.ingest("SOLUSDT", [(3 * MIN + 10, 20.0, 1.0), (3 * MIN + 20, 19.0, 1.0), (4 * MIN, 21.0, 1.0)])
+    rest = [  # Bybit shape: newest first, strings
+        [str(4 * MIN), "20.5", "21.5", "20.5", "21.0", "9", "189"],
+        [str(3 * MIN), "18.0", "22.0", "17.0", "19.0", "7", "140"],
+        [str(2 * MIN), "17.0", "18.5", "16.5", "18.0", "5", "88"],
+        [str(MIN), "16.0", "17.5", "15.5", "17.0", "4", "66"],
+        [str(0), "15.0", "16.5", "14.5", "16.0", "3", "48"],
+    ]
+    aggregator.seed("SOLUSDT.P", "1", rest)
+    bars = aggregator.get_bars("SOLUSDT", "1", 0)
+    assert [b[0] for b in bars] == [0, MIN, 2 * MIN, 3 * MIN, 4 * MIN]
+    assert bars[2] == [2 * MIN, 17.0, 18.5, 16.5, 18.0, 5.0, 88.0]
+    # First live bar: REST open and wider range, the stream's close
+    assert bars[3] == [3 * MIN, 18.0, 22.0, 17.0, 19.0, 7.0, 140.0]
+    assert bars[4] == [4 * MIN, 21.0, 21.0, 21.0, 21.0, 1.0, 21.0]  # Forming bar stays live
+
+    aggregator.seed("SOLUSDT", "1", rest)  # Overlapping retry: nothing duplicated
+    assert aggregator.get_bars("SOLUSDT", "1", 0) == bars
+
+
+def test_seed_into_an_empty_series():
+    aggregator, _ = make_aggregator()
+    aggregator.seed("SOLUSDT", "1", [[str(MIN), "2", "3", "1", "2.5", "1", "2"], [str(0), "1", "2", "1", "2", "1", "1"]])
+    assert aggregator.get_bars("SOLUSDT", "1", 0, include_current=False) == [[0, 1.0, 2.0, 1.0, 2.0, 1.0, 1.0]]
+    assert aggregator.get_klines("SOLUSDT", "1", 1) == [[str(MIN), "2.0", "3.0", "1.0", "2.5", "1.0", "2.0"]]
+
+
+def test_is_backfilled_normalizes_the_symbol():
+    aggregator, _ = make_aggregator()
+    aggregator.backfilled.add("SOLUSDT")
+    assert aggregator.is_backfilled("solusdt.P")
+    assert not aggregator.is_backfilled("XRPUSDT")
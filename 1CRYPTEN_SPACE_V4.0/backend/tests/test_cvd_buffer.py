@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from services.cvd_buffer import CVDRingBuffer
+
+RES = 1000
+WINDOWS = {"10s": 10_000, "1m": 60_000}
+
+
+def brute_force(trades, now_ms, span):
+    """Sum of every delta whose 1s bucket still overlaps (now - span, now]."""
+    cutoff = now_ms - span
+    return sum(d for ts, d in trades if (ts // RES) * RES + RES > cutoff)
+
+
+def test_in_order_matches_brute_force():
+    rng = random.Random(7)
+    ring = CVDRingBuffer(RES, WINDOWS)
+    trades, ts = [], 1_700_000_000_000
+    for _ in range(1500):
+        ts += rng.choice([0, 5, 120, 900, 2500, 15_000])
+        delta = rng.uniform(-5000, 5000)
+        ring.append(ts, delta)
+        trades.append((ts, delta))
+        if rng.random() < 0.1:
+            for w, span in WINDOWS.items():
+                assert ring.score(w, ts) == pytest.approx(brute_force(trades, ts, span), abs=1e-6)
+
+
+def test_late_trades_fold_into_their_bucket():
+    rng = random.Random(11)
+    ring = CVDRingBuffer(RES, WINDOWS)
+    trades, ts = [], 1_700_000_000_000
+    for _ in range(1500):
+        ts += rng.choice([50, 300, 1000])  # Dense: every recent bucket has a slot
+        delta = rng.uniform(-5000, 5000)
+        ring.append(ts, delta)
+        trades.append((ts, delta))
+        if len(trades) > 50 and rng.random() < 0.3:  # Late prints only once the stream is warm
+            late = ts - rng.choice([400, 1500, 3000, 9000])
+            ring.append(late, -delta / 2)
+            trades.append((late, -delta / 2))
+        for w, span in WINDOWS.items():
+            assert ring.score(w, ts) == pytest.approx(brute_force(trades, ts, span), abs=1e-6)
+    # No slot was opened behind the newest bucket
+    assert ring._head <= (ts - 1_700_000_000_000) // RES + 1
+
+
+def test_late_trade_in_a_gap_is_clamped_to_the_next_bucket():
+    ring = CVDRingBuffer(RES, WINDOWS)
+    ring.append(10_000, 1.0)
+    ring.append(15_000, 2.0)
+    ring.append(12_500, 4.0)  # Bucket 12s never got a slot
+    assert ring._head == 2
+    assert ring.score("10s", 15_000) == pytest.approx(7.0)
+    # 10s bucket expires first; the late delta leaves with the 15s bucket
+    assert ring.score("10s", 21_000) == pytest.approx(6.0)
+    assert ring.score("10s", 26_000) == pytest.approx(0.0)
+
+
+def test_trade_older_than_the_ring_is_dropped():
+    ring = CVDRingBuffer(RES, {"5s": 5_000})
+    for i in range(20):
+        ring.append(100_000 + i * RES, 1.0)
+    ring.append(100_000, 50.0)  # Its slot was overwritten long ago
+    assert ring.score("5s", 119_000) == pytest.approx(6.0)
+
+
+def test_memory_is_fixed_by_the_largest_window():
+    ring = CVDRingBuffer(RES, WINDOWS)
+    before = ring.memory_bytes
+    for i in range(10_000):
+        ring.append(i * 10, 1.0)
+    assert ring.memory_bytes == before
+    assert ring.capacity == 61
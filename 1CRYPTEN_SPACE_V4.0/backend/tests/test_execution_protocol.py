@@ -0,0 +1,66 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from services import execution_protocol as execution_protocol_module
+from services.execution_protocol import ExecutionProtocol
+
+
+def instrument_stub(monkeypatch, tick="0.01"):
+    lookups = []
+
+    async def get_instrument_info(symbol):
+        lookups.append(symbol)
+        return {"priceFilter": {"tickSize": tick}} if tick else {}
+
+    monkeypatch.setitem(sys.modules, "services.bybit_rest",
+                        SimpleNamespace(bybit_rest_service=SimpleNamespace(get_instrument_info=get_instrument_info)))
+    return lookups
+
+
+def test_missing_tick_is_not_cached(monkeypatch):
+    lookups = instrument_stub(monkeypatch, tick=None)
+    protocol = ExecutionProtocol()
+    ladder = asyncio.run(protocol.prepare_ladder("SOLUSDT", "Buy", 100.0))
+    assert ladder["tick"] is None and not protocol._ladders
+    assert protocol.trigger_levels({"symbol": "SOLUSDT", "side": "Buy", "entry_price": 100.0}) is None
+
+    asyncio.run(protocol.prepare_ladder("SOLUSDT", "Buy", 100.0))
+    assert len(lookups) == 1  # Backoff: no lookup storm from the tick path
+
+    monkeypatch.setattr(protocol, "_tick_retry_at", {})
+    lookups = instrument_stub(monkeypatch)
+    ladder = asyncio.run(protocol.prepare_ladder("SOLUSDT", "Buy", 100.0))
+    assert lookups == ["SOLUSDT"] and ladder["tick"] is not None
+    assert protocol._ladders
+
+
+def test_rekey_moves_the_ladder_to_the_fill_price(monkeypatch):
+    instrument_stub(monkeypatch)
+    protocol = ExecutionProtocol()
+
+    async def scenario():
+        await protocol.prepare_ladder("SOLUSDT", "Sell", 100.0)
+        return await protocol.rekey_ladder("SOLUSDT", "Sell", 100.0, 100.37)
+
+    ladder = asyncio.run(scenario())
+    assert list(protocol._ladders) == [("SOLUSDT", False, 100.37)]
+    assert ladder["hard_stop"] == pytest.approx(protocol.hard_stop_price(100.37, "Sell"))
+    assert protocol.trigger_levels({"symbol": "SOLUSDT", "side": "Sell", "entry_price": 100.37}) is not None
+
+
+def test_full_cache_evicts_the_oldest_ladder(monkeypatch):
+    instrument_stub(monkeypatch)
+    monkeypatch.setattr(execution_protocol_module, "LADDER_CACHE_SIZE", 3)
+    protocol = ExecutionProtocol()
+
+    async def scenario():
+        for entry in (1.0, 2.0, 3.0, 4.0):
+            await protocol.prepare_ladder("SOLUSDT", "Buy", entry)
+
+    asyncio.run(scenario())
+    assert [key[2] for key in protocol._ladders] == [2.0, 3.0, 4.0]
+    protocol.discard_ladder("SOLUSDT.P", "Buy", 3.0)
+    assert [key[2] for key in protocol._ladders] == [2.0, 4.0]
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from services import indicator_engine as indicator_engine_module
+from services.candle_aggregator import CandleAggregator
+from services.indicator_engine import IndicatorEngine
+
+HOUR = 3_600_000
+
+
+def reference(bars, period=14, sma_period=20):
+    """From-scratch Wilder ATR/RSI (seeded with simple means) and SMA over closed bars."""
+    trs, gains, losses = [], [], []
+    for prev, bar in zip(bars, bars[1:]):
+        high, low, close, prev_close = bar[2], bar[3], bar[4], prev[4]
+        trs.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+        gains.append(max(close - prev_close, 0.0))
+        losses.append(max(prev_close - close, 0.0))
+    if len(trs) < period:
+        return None
+    atr, avg_gain, avg_loss = sum(trs[:period]) / period, sum(gains[:period]) / period, sum(losses[:period]) / period
+    for tr, gain, loss in zip(trs[period:], gains[period:], losses[period:]):
+        atr = (atr * (period - 1) + tr) / period
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    closes = [b[4] for b in bars[-sma_period:]]
+    rsi = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return {"atr": atr, "rsi": rsi, "sma": sum(closes) / len(closes)}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    aggregator = CandleAggregator(intervals={"60": HOUR}, history={"60": 200})
+    monkeypatch.setattr(indicator_engine_module, "candle_aggregator", aggregator)
+    engine = IndicatorEngine()
+    aggregator.add_close_listener(engine.on_bar_close)
+    return engine, aggregator
+
+
+def stream(aggregator, hours, seed=4, start_hour=0):
+    rng = random.Random(seed)
+    price = 100.0
+    for h in range(start_hour, start_hour + hours):
+        prints = []
+        for ts in sorted(rng.randrange(HOUR) for _ in range(6)):
+            price = max(1.0, price + rng.uniform(-2, 2))
+            prints.append((h * HOUR + ts, price, 1.0))
+        aggregator.ingest("SOLUSDT", prints)
+
+
+def assert_values(actual, expected):
+    for name in ("atr", "rsi", "sma"):
+        assert actual[name] == pytest.approx(expected[name], rel=1e-9), name
+
+
+def test_live_closes_match_the_wilder_reference(engine):
+    engine, aggregator = engine
+    stream(aggregator, 60)
+    closed = aggregator.get_bars("SOLUSDT", "60", 0, include_current=False)
+    assert len(closed) == 59
+    assert engine.is_ready("SOLUSDT.P")
+    assert_values(engine.get_values("SOLUSDT", live=False), reference(closed))
+
+
+def test_warmup_after_live_closes_is_a_no_op(engine):
+    engine, aggregator = engine
+    stream(aggregator, 40)
+    before = engine.get_values("SOLUSDT", live=False)
+    engine.warmup("SOLUSDT")
+    engine.warmup("SOLUSDT")
+    assert engine.get_values("SOLUSDT", live=False) == before
+
+
+def test_warmup_folds_rest_history_behind_live_bars(engine):
+    engine, aggregator = engine
+    stream(aggregator, 10, start_hour=30)  # Live bars before the backfill arrives
+    rng = random.Random(9)
+    rest = [[str(h * HOUR), "100", str(100 + rng.uniform(0, 3)), str(100 - rng.uniform(0, 3)), str(100 + rng.uniform(-2, 2)), "1", "100"]
+            for h in range(29, -1, -1)]
+    aggregator.seed("SOLUSDT", "60", rest)
+    engine.warmup("SOLUSDT")
+    closed = aggregator.get_bars("SOLUSDT", "60", 0, include_current=False)
+    assert_values(engine.get_values("SOLUSDT", live=False), reference(closed))
+
+
+def test_forming_preview_equals_the_committed_close(engine):
+    engine, aggregator = engine
+    stream(aggregator, 30)
+    preview = engine.get_values("SOLUSDT", live=True)
+    forming = aggregator.get_bars("SOLUSDT", "60", 1)[-1]
+    aggregator.ingest("SOLUSDT", [(int(forming[0]) + HOUR, forming[4], 1.0)])  # Closes it unchanged
+    assert_values(engine.get_values("SOLUSDT", live=False), preview)
@@ -0,0 +1,111 @@
+import asyncio
+import copy
+import json
+
+from services.paper_journal import PaperJournal
+
+
+def make_journal(tmp_path):
+    return PaperJournal(str(tmp_path / "paper_journal.log"), str(tmp_path / "paper_storage.json"))
+
+
+class PaperBook:
+    """Minimal paper state driven the way bybit_rest journals it."""
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.state = {"positions": [], "balance": 20.0, "history": []}
+        journal.attach(lambda: copy.deepcopy(self.state))
+
+    def open(self, symbol, price):
+        pos = {"symbol": symbol, "side": "Buy", "size": "1", "avgPrice": str(price), "stopLoss": "0"}
+        PaperJournal._apply(self.state, {"op": "open", "pos": pos})
+        self.journal.append("open", pos=pos)
+
+    def amend(self, symbol, stop):
+        PaperJournal._apply(self.state, {"op": "amend", "symbol": symbol, "fields": {"stopLoss": str(stop)}})
+        self.journal.append("amend", symbol=symbol, fields={"stopLoss": str(stop)})
+
+    def close(self, symbol, pnl):
+        record = {"op": "close", "symbol": symbol, "entry": {"symbol": symbol, "pnl": pnl},
+                  "balance": self.state["balance"] + pnl}
+        PaperJournal._apply(self.state, record)
+        self.journal.append("close", symbol=symbol, entry=record["entry"], balance=record["balance"])
+
+
+def replay(tmp_path):
+    return make_journal(tmp_path).replay(default_balance=20.0)
+
+
+def test_replay_rebuilds_the_live_state(tmp_path):
+    async def scenario():
+        book = PaperBook(make_journal(tmp_path))
+        book.open("SOLUSDT", 100)
+        book.amend("SOLUSDT", 101)
+        book.open("XRPUSDT", 2)
+        book.close("XRPUSDT", 1.5)
+        await book.journal.flush()
+        await book.journal.close()
+        return book.state
+
+    state = asyncio.run(scenario())
+    assert replay(tmp_path) == state
+
+
+def test_compaction_snapshot_plus_tail(tmp_path):
+    async def scenario():
+        book = PaperBook(make_journal(tmp_path))
+        for i in range(5):
+            book.open(f"S{i}USDT", 10 + i)
+            book.close(f"S{i}USDT", 0.1 * i)
+        await book.journal.compact()
+        book.open("TAILUSDT", 7)
+        book.amend("TAILUSDT", 6.9)
+        await book.journal.flush()
+        return book.state  # No final snapshot: simulates a crash after the last flush
+
+    state = asyncio.run(scenario())
+    with open(tmp_path / "paper_journal.log") as f:
+        tail = [json.loads(line) for line in f]
+    assert [r["op"] for r in tail] == ["open", "amend"]
+    with open(tmp_path / "paper_storage.json") as f:
+        assert json.load(f)["journal_seq"] == 10
+
+    journal = make_journal(tmp_path)
+    assert journal.replay(default_balance=20.0) == state
+    assert journal.stats["replayed"] == 2
+    assert len(state["history"]) == 5  # History is kept in full
+
+
+def test_torn_tail_and_duplicate_records_are_ignored(tmp_path):
+    async def scenario():
+        book = PaperBook(make_journal(tmp_path))
+        book.open("SOLUSDT", 100)
+        book.amend("SOLUSDT", 99)
+        await book.journal.flush()
+        return book.state
+
+    state = asyncio.run(scenario())
+    path = tmp_path / "paper_journal.log"
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines + [lines[-1], '{"seq": 3, "op": "clo']) + "\n")  # Retried batch + crash mid-write
+    assert replay(tmp_path) == state
+
+
+def test_sequence_gap_stops_the_replay(tmp_path):
+    path = tmp_path / "paper_journal.log"
+    records = [
+        {"seq": 1, "op": "open", "pos": {"symbol": "AUSDT", "avgPrice": "1"}},
+        {"seq": 3, "op": "open", "pos": {"symbol": "BUSDT", "avgPrice": "1"}},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    state = replay(tmp_path)
+    assert [p["symbol"] for p in state["positions"]] == ["AUSDT"]
+
+
+def test_snapshot_without_journal_seq_discards_the_journal(tmp_path):
+    (tmp_path / "paper_journal.log").write_text(json.dumps({"seq": 1, "op": "open", "pos": {"symbol": "OLDUSDT"}}) + "\n")
+    # Written by force_clear_all.py / a pre-V11.22 build
+    (tmp_path / "paper_storage.json").write_text(json.dumps({"positions": [], "balance": 20.0, "history": []}))
+    assert replay(tmp_path) == {"positions": [], "balance": 20.0, "history": []}
+    assert not (tmp_path / "paper_journal.log").exists()
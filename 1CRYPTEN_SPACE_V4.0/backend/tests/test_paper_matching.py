@@ -0,0 +1,102 @@
+import asyncio
+import math
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from services.execution_protocol import execution_protocol
+from services.paper_matching import PaperMatchingEngine
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    """Stands in for bybit_rest_service: paper positions + settle_paper_close."""
+    monkeypatch.setattr(settings, "PAPER_TICK_MATCHING", True)
+    fake = SimpleNamespace(paper_positions=[], settled=[], settle_results=[])
+
+    async def settle_paper_close(close_data):
+        fake.settled.append(close_data)
+        ok = fake.settle_results.pop(0) if fake.settle_results else True
+        if ok:
+            fake.paper_positions = [p for p in fake.paper_positions if p["symbol"] != close_data["symbol"]]
+        return ok
+
+    fake.settle_paper_close = settle_paper_close
+    monkeypatch.setitem(sys.modules, "services.bybit_rest", SimpleNamespace(bybit_rest_service=fake))
+    return fake
+
+
+def open_position(exchange, engine, side, stop_loss=0, take_profit=0, entry=100.0):
+    pos = {"symbol": "SOLUSDT", "side": side, "size": "2", "avgPrice": str(entry),
+           "stopLoss": str(stop_loss), "takeProfit": str(take_profit)}
+    exchange.paper_positions.append(pos)
+    engine.arm_position(pos)
+    return pos
+
+
+def run_batches(engine, batches):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        for prints in batches:
+            engine.on_trades("SOLUSDT", prints, loop)
+            for _ in range(5):  # call_soon_threadsafe -> task -> settle
+                await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+
+def test_band_takes_the_tighter_stop_and_mirrors_sells(exchange):
+    engine = PaperMatchingEngine()
+    open_position(exchange, engine, "Buy", stop_loss=98.0, take_profit=102.0)
+    assert engine.triggers["SOLUSDT"] == (execution_protocol.hard_stop_price(100.0, "Buy"), 102.0)
+    open_position(exchange, engine, "Sell", stop_loss=100.5)
+    assert engine.triggers["SOLUSDT"] == (-math.inf, 100.5)
+
+
+def test_wick_inside_a_batch_fills_at_that_print(exchange):
+    engine = PaperMatchingEngine()
+    open_position(exchange, engine, "Buy", stop_loss=99.5, take_profit=102.0)
+    run_batches(engine, [
+        [(1, 100.2, 1), (2, 99.4, 1), (3, 100.1, 1)],  # Wick crosses and recovers inside one message
+        [(4, 99.0, 1)],                                # Already filled: no second fire
+    ])
+    assert len(exchange.settled) == 1
+    fill = exchange.settled[0]
+    assert fill["exit_price"] == 99.4
+    assert fill["reason"].startswith("SNIPER_SL_SAFE ")  # The position's own stop, labelled by phase
+    assert engine.stats["sl_fills"] == 1 and "SOLUSDT" not in engine.triggers
+
+
+def test_gap_through_the_level_fills_at_the_print(exchange):
+    engine = PaperMatchingEngine()
+    open_position(exchange, engine, "Sell")  # No SL: the -50% ROI hard stop arms the band
+    hard = execution_protocol.hard_stop_price(100.0, "Sell")
+    run_batches(engine, [[(1, 100.3, 1), (2, hard + 0.7, 1)]])
+    assert exchange.settled[0]["exit_price"] == hard + 0.7
+    assert exchange.settled[0]["reason"].startswith("SNIPER_SL_HARD_STOP")
+
+    open_position(exchange, engine, "Buy", take_profit=102.0)
+    run_batches(engine, [[(3, 102.9, 1)]])
+    assert exchange.settled[1]["exit_price"] == 102.9
+    assert exchange.settled[1]["reason"].startswith("SNIPER_TP")
+
+
+def test_failed_settle_rearms_the_band(exchange):
+    engine = PaperMatchingEngine()
+    open_position(exchange, engine, "Buy", stop_loss=99.5)
+    exchange.settle_results = [False]
+    run_batches(engine, [[(1, 99.2, 1)]])
+    assert engine.stats["failed_fills"] == 1
+    assert engine.triggers["SOLUSDT"][0] == 99.5
+    run_batches(engine, [[(2, 99.3, 1)]])
+    assert [s["exit_price"] for s in exchange.settled] == [99.2, 99.3]
+    assert engine.stats["fills"] == 1
+
+
+def test_no_running_loop_keeps_the_band_armed(exchange):
+    engine = PaperMatchingEngine()
+    open_position(exchange, engine, "Buy", stop_loss=99.5)
+    engine.on_trades("SOLUSDT", [(1, 99.0, 1)], None)
+    assert engine.triggers["SOLUSDT"][0] == 99.5
@@ -0,0 +1,108 @@
+import random
+
+from services.pattern_detector import PatternDetector, sliding_max, sliding_min
+
+
+def baseline_scan(candles, trend, sma20):
+    """The inline scan trend analysis ran before V11.11 (reference output)."""
+    closes = [float(c[4]) for c in candles]
+    highs = [float(c[2]) for c in candles]
+    lows = [float(c[3]) for c in candles]
+    current = closes[-1]
+    pattern = 'none'
+
+    recent_low = min(lows[-5:])
+    recent_high = max(highs[-5:])
+    if trend == 'bullish' and current > sma20 and recent_low < sma20:
+        pattern = 'pullback_bounce'
+    elif trend == 'bearish' and current < sma20 and recent_high > sma20:
+        pattern = 'pullback_rejection'
+
+    if len(closes) >= 10:
+        prev_low = min(lows[-10:-5])
+        prev_high = max(highs[-10:-5])
+        curr_low = min(lows[-3:])
+        curr_high = max(highs[-3:])
+        if curr_low < prev_low and current > prev_low:
+            pattern = 'liquidity_sweep_long'
+            if trend == 'bearish': pattern = 'bear_trap'
+        elif curr_high > prev_high and current < prev_high:
+            pattern = 'liquidity_sweep_short'
+            if trend == 'bullish': pattern = 'bull_trap'
+
+    accumulation_boxes = []
+    for i in range(len(highs) - 10):
+        window_highs = highs[i:i + 10]
+        window_lows = lows[i:i + 10]
+        if max(window_highs) - min(window_lows) < closes[i] * 0.005:
+            accumulation_boxes.append({'top': max(window_highs), 'bottom': min(window_lows)})
+    if accumulation_boxes:
+        last_box = accumulation_boxes[-1]
+        if current > last_box['top'] and closes[-2] <= last_box['top']:
+            pattern = 'accumulation_box_exit_up'
+        elif current < last_box['bottom'] and closes[-2] >= last_box['bottom']:
+            pattern = 'accumulation_box_exit_down'
+
+    max_24h, min_24h = max(highs), min(lows)
+    liquidity_zones = [{'price': max_24h, 'type': 'high'}, {'price': min_24h, 'type': 'low'}]
+    if len(highs) >= 24:
+        max_12h, min_12h = max(highs[:12]), min(lows[:12])
+        if abs(max_12h - max_24h) / max_24h > 0.002:
+            liquidity_zones.append({'price': max_12h, 'type': 'high_secondary'})
+        if abs(min_12h - min_24h) / min_24h > 0.002:
+            liquidity_zones.append({'price': min_12h, 'type': 'low_secondary'})
+    return {'pattern': pattern, 'accumulation_boxes': accumulation_boxes, 'liquidity_zones': liquidity_zones}
+
+
+def make_series(rng, n, start=1_700_000_000_000):
+    """1H bars with quiet stretches (boxes) and wicks (sweeps)."""
+    bars, price = [], 100.0
+    for i in range(n):
+        vol = 0.0005 if (i // 15) % 2 else 0.01
+        o = price
+        c = o * (1 + rng.gauss(0, vol))
+        h = max(o, c) * (1 + abs(rng.gauss(0, vol / 2)))
+        lo = min(o, c) * (1 - abs(rng.gauss(0, vol / 2)))
+        bars.append([str(start + i * 3_600_000), str(o), str(h), str(lo), str(c), "0", "0"])
+        price = c
+    return bars
+
+
+def check(detector, frame, rng):
+    trend = rng.choice(['bullish', 'bearish', 'sideways'])
+    closes = [float(b[4]) for b in frame]
+    sma20 = sum(closes[-20:]) / min(20, len(closes))
+    got = detector.analyze("TESTUSDT", "60", frame, trend, sma20)
+    assert got == baseline_scan(frame, trend, sma20)
+
+
+def test_fixed_frames_match_the_baseline_scan():
+    rng = random.Random(3)
+    series = make_series(rng, 400)
+    detector = PatternDetector(lookback=24)
+    for end in range(24, len(series)):
+        # Same forming bar polled several times, then the next bar opens
+        for _ in range(rng.choice([1, 1, 2])):
+            frame = [list(b) for b in series[end - 24:end]]
+            frame[-1][4] = str(float(frame[-1][4]) * (1 + rng.gauss(0, 0.003)))
+            check(detector, frame, rng)
+    assert detector.stats["incremental"] > detector.stats["rebuilds"]
+
+
+def test_variable_frame_lengths_match_the_baseline_scan():
+    rng = random.Random(5)
+    series = make_series(rng, 600)
+    detector = PatternDetector(lookback=24)
+    end = 30
+    while end < len(series):
+        length = rng.choice([24, 24, 24, 20, 15, 12, 10])  # Short REST responses / new listings
+        check(detector, series[end - length:end], rng)
+        end += rng.choice([0, 1, 1, 1, 2, 5])
+
+
+def test_sliding_helpers_match_naive_windows():
+    rng = random.Random(9)
+    values = [rng.uniform(-10, 10) for _ in range(200)]
+    for window in (1, 3, 10, 50):
+        assert sliding_max(values, window) == [max(values[i:i + window]) for i in range(len(values) - window + 1)]
+        assert sliding_min(values, window) == [min(values[i:i + window]) for i in range(len(values) - window + 1)]
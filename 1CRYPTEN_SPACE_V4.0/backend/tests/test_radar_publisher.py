@@ -0,0 +1,56 @@
+import asyncio
+
+from services.firebase_service import firebase_service
+from services.radar_publisher import RadarPublisher
+
+
+def test_first_diff_is_the_full_snapshot():
+    publisher = RadarPublisher(score_step=2)
+    cvd = {"SOLUSDT.P": 120_400.6, "XRPUSDT.P": -3_000.0}
+    diff, current = publisher.build_diff(cvd, cvd.get)
+    assert diff == current
+    assert current["SOLUSDT_P"] == {"cvd": 120_401, "score": 24, "side": "LONG"}
+    assert current["XRPUSDT_P"] == {"cvd": -3_000, "score": 0, "side": "NEUTRAL"}
+
+
+def test_diff_only_carries_moved_symbols_and_deletions():
+    publisher = RadarPublisher(score_step=2)
+    publisher.published = {
+        "AUSDT_P": {"cvd": 100_000, "score": 20, "side": "LONG"},
+        "BUSDT_P": {"cvd": 100_000, "score": 20, "side": "LONG"},
+        "CUSDT_P": {"cvd": 12_000, "score": 2, "side": "LONG"},
+        "GONEUSDT_P": {"cvd": 0, "score": 0, "side": "NEUTRAL"},
+    }
+    cvd = {
+        "AUSDT.P": 104_000.0,   # Score 20 -> 20: quiet
+        "BUSDT.P": 110_000.0,   # Score 20 -> 22: moved a full step
+        "CUSDT.P": 9_000.0,     # Score 2 -> 1 but side LONG -> NEUTRAL
+        "NEWUSDT.P": 1_000.0,   # Not published yet
+    }
+    diff, _ = publisher.build_diff(cvd, cvd.get)
+    assert set(diff) == {"BUSDT_P", "CUSDT_P", "NEWUSDT_P", "GONEUSDT_P"}
+    assert diff["GONEUSDT_P"] is None
+    assert diff["CUSDT_P"]["side"] == "NEUTRAL"
+
+
+def test_publish_moves_the_baseline_only_after_a_successful_push(monkeypatch):
+    publisher = RadarPublisher(score_step=2)
+    sent = []
+
+    async def update_ok(diff):
+        sent.append(diff)
+        return True
+
+    async def update_failed(diff):
+        return False
+
+    cvd = {"AUSDT.P": 100_000.0}
+    monkeypatch.setattr(firebase_service, "update_radar_batch", update_failed)
+    assert asyncio.run(publisher.publish(cvd, cvd.get)) == 0
+    assert publisher.published == {}
+
+    monkeypatch.setattr(firebase_service, "update_radar_batch", update_ok)
+    assert asyncio.run(publisher.publish(cvd, cvd.get)) > 0
+    assert asyncio.run(publisher.publish(cvd, cvd.get)) == 0  # Nothing moved
+    assert len(sent) == 1 and publisher.stats["skipped"] == 1
+    assert publisher.published == {"AUSDT_P": {"cvd": 100_000, "score": 20, "side": "LONG"}}
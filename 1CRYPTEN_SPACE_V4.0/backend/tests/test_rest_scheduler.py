@@ -0,0 +1,73 @@
+import asyncio
+
+from services.rest_scheduler import (
+    PRIORITY_MARKET,
+    PRIORITY_ORDER,
+    RESERVED_SLOTS,
+    RestScheduler,
+)
+
+
+async def _call(scheduler, path, hold, log, priority=None, critical=False):
+    async with scheduler.slot(path, priority, critical):
+        log.append(("start", path))
+        await asyncio.sleep(hold)
+
+
+def test_market_fan_out_cannot_take_every_connection():
+    async def scenario():
+        scheduler = RestScheduler(max_in_flight=10)
+        log = []
+        market = [asyncio.create_task(_call(scheduler, f"/v5/market/kline?{i}", 0.05, log)) for i in range(30)]
+        await asyncio.sleep(0.01)
+        assert scheduler.in_flight[PRIORITY_MARKET] == 10 - RESERVED_SLOTS[PRIORITY_MARKET]
+        order = asyncio.create_task(_call(scheduler, "/v5/order/create", 0.0, log))
+        await asyncio.sleep(0.01)
+        assert order.done()  # Served from the reserved connections, not after the fan-out
+        await asyncio.gather(*market)
+    asyncio.run(scenario())
+
+
+def test_queued_requests_are_released_in_priority_order():
+    async def scenario():
+        scheduler = RestScheduler(max_in_flight=10)
+        log = []
+        # Saturate every connection with order traffic, then queue one request per class
+        busy = [asyncio.create_task(_call(scheduler, "/v5/order/create", 0.05, log)) for _ in range(10)]
+        await asyncio.sleep(0.005)
+        queued = [
+            asyncio.create_task(_call(scheduler, "/v5/market/tickers", 0.0, log)),
+            asyncio.create_task(_call(scheduler, "/v5/position/list", 0.0, log)),
+            asyncio.create_task(_call(scheduler, "/v5/position/trading-stop", 0.0, log)),
+        ]
+        await asyncio.gather(*busy, *queued)
+        tail = [path for _, path in log[10:]]
+        assert tail == ["/v5/position/trading-stop", "/v5/position/list", "/v5/market/tickers"]
+    asyncio.run(scenario())
+
+
+def test_critical_skips_caps_and_backoff():
+    async def scenario():
+        scheduler = RestScheduler(max_in_flight=2)
+        log = []
+        scheduler.on_rate_limited(None)  # IP-level backoff
+        blocked = asyncio.create_task(_call(scheduler, "/v5/order/create", 0.0, log))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        await asyncio.wait_for(_call(scheduler, "/v5/order/create", 0.0, log, critical=True), timeout=0.05)
+        assert scheduler.metrics["critical"]["requests"] == 1
+        await blocked
+    asyncio.run(scenario())
+
+
+def test_limits_are_tracked_per_path():
+    async def scenario():
+        scheduler = RestScheduler()
+        scheduler.observe_limits("/v5/position/list", 5, 0, 0)
+        bucket_list = scheduler.path_buckets["/v5/position/list"]
+        assert bucket_list.capacity == 5 and bucket_list.tokens <= 0
+        # Another endpoint of the same group keeps its own budget
+        log = []
+        await asyncio.wait_for(_call(scheduler, "/v5/position/closed-pnl", 0.0, log, priority=PRIORITY_ORDER), timeout=0.05)
+        assert log == [("start", "/v5/position/closed-pnl")]
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import asyncio
+import random
+import types
+
+import pytest
+
+import services.signal_queue as signal_queue_module
+from services.signal_queue import SignalPriorityQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"t": 1_000.0}
+    monkeypatch.setattr(signal_queue_module, "time", types.SimpleNamespace(time=lambda: now["t"]))
+    return now
+
+
+def sig(symbol, score):
+    return {"symbol": symbol, "score": score}
+
+
+def test_pops_best_score_then_newest(clock):
+    q = SignalPriorityQueue(maxsize=10, ttl=30)
+    q.put_nowait(sig("AUSDT", 91))
+    clock["t"] += 1
+    q.put_nowait(sig("BUSDT", 95))
+    clock["t"] += 1
+    q.put_nowait(sig("CUSDT", 91))
+    assert [q.get_nowait()["symbol"] for _ in range(3)] == ["BUSDT", "CUSDT", "AUSDT"]
+    with pytest.raises(asyncio.QueueEmpty):
+        q.get_nowait()
+
+
+def test_one_entry_per_symbol(clock):
+    q = SignalPriorityQueue(maxsize=10, ttl=30)
+    q.put_nowait(sig("SOLUSDT.P", 92))
+    q.put_nowait(sig("SOLUSDT", 90))  # Newer signal replaces the queued one, even with a lower score
+    assert q.qsize() == 1
+    assert q.get_nowait()["score"] == 90
+    assert q.stats["replaced"] == 1
+
+
+def test_stale_entries_are_evicted(clock):
+    q = SignalPriorityQueue(maxsize=10, ttl=30)
+    q.put_nowait(sig("AUSDT", 99))
+    clock["t"] += 20
+    q.put_nowait(sig("BUSDT", 90))
+    clock["t"] += 15  # AUSDT is 35s old
+    assert q.qsize() == 1
+    assert q.peek()["symbol"] == "BUSDT"
+    assert q.stats["expired"] == 1
+
+
+def test_overflow_drops_the_weakest(clock):
+    q = SignalPriorityQueue(maxsize=3, ttl=30)
+    for symbol, score in (("AUSDT", 92), ("BUSDT", 90), ("CUSDT", 95)):
+        q.put_nowait(sig(symbol, score))
+    q.put_nowait(sig("DUSDT", 89))  # Weaker than everything queued: dropped
+    q.put_nowait(sig("EUSDT", 93))  # Evicts BUSDT
+    assert [q.get_nowait()["symbol"] for _ in range(3)] == ["CUSDT", "EUSDT", "AUSDT"]
+    assert q.stats["dropped"] == 2
+
+
+def test_matches_a_sorted_reference(clock):
+    rng = random.Random(2)
+    q = SignalPriorityQueue(maxsize=1000, ttl=30)
+    live = {}
+    for _ in range(2000):
+        clock["t"] += rng.uniform(0, 2)
+        live = {k: v for k, v in live.items() if v[1] + 30 > clock["t"]}
+        if rng.random() < 0.6:
+            symbol = f"S{rng.randrange(40)}USDT"
+            score = rng.randrange(85, 100)
+            q.put_nowait(sig(symbol, score))
+            live[symbol] = (score, clock["t"])
+        elif live:
+            best = min(live, key=lambda k: (-live[k][0], -live[k][1]))
+            assert q.get_nowait()["symbol"] == best
+            del live[best]
+        assert q.qsize() == len(live)
+
+
+def test_get_waits_for_a_put(clock):
+    async def scenario():
+        q = SignalPriorityQueue()
+        getter = asyncio.create_task(q.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        await q.put(sig("AUSDT", 91))
+        assert (await asyncio.wait_for(getter, 1))["symbol"] == "AUSDT"
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import random
+
+from services.signal_scoring import PATTERN_BONUS, SIGNAL_THRESHOLD, SignalScorer, finalize_score
+
+
+def baseline_score(cvd_val, rsi, trend, pattern, trend_strength, drag_mode):
+    """Per-symbol scoring as monitor_and_generate ran it before V11.12. None = filtered out."""
+    abs_cvd = abs(cvd_val)
+    threshold = 5000 if drag_mode else 10000
+    if not abs_cvd > threshold:
+        return None
+    cvd_score = min(70.0, (abs_cvd / 200000) * 70.0) if abs_cvd > 50000 else 0
+    side_label = "Long" if cvd_val > 0 else "Short"
+    if side_label == "Long":
+        if rsi > 60:
+            return None
+        rsi_score = min(30.0, ((65 - rsi) / 35.0) * 30.0) if rsi < 65 else 0
+    else:
+        if rsi < 40:
+            return None
+        rsi_score = min(30.0, ((rsi - 35) / 35.0) * 30.0) if rsi > 35 else 0
+    if (trend == 'bullish' and side_label == 'Short') or (trend == 'bearish' and side_label == 'Long'):
+        return None
+    pattern_bonus = PATTERN_BONUS.get(pattern, 0)
+    whale_bonus = 20 if abs(cvd_val) > 250000 else 0
+    trend_bonus = 0
+    if (trend == 'bullish' and side_label == 'Long') or (trend == 'bearish' and side_label == 'Short'):
+        trend_bonus = min(10.0, trend_strength / 10)
+    return min(99, int(cvd_score + rsi_score + trend_bonus + pattern_bonus + whale_bonus + 15))
+
+
+def test_vectorized_scores_match_the_scalar_rules():
+    rng = random.Random(1)
+    patterns = list(PATTERN_BONUS) + ['none']
+    for _ in range(50):
+        symbols = [f"S{i}USDT.P" for i in range(300)]
+        cvd = {s: rng.choice([1, -1]) * rng.choice([rng.uniform(0, 60_000), rng.uniform(0, 400_000)]) for s in symbols}
+        rsi = {s: rng.uniform(10, 90) for s in symbols if rng.random() < 0.9}  # Missing = 50
+        excluded = {s.replace(".P", "") for s in rng.sample(symbols, 10)}
+        context = {s: (rng.choice(['bullish', 'bearish', 'sideways']), rng.choice(patterns), rng.uniform(0, 150)) for s in symbols}
+        drag_mode = rng.random() < 0.3
+
+        scorer = SignalScorer()
+        scorer.set_universe(symbols)
+        scorer.load_features(lambda s: cvd[s], rsi, excluded)
+        candidates = {c["symbol"]: c for c in scorer.score(drag_mode)}
+
+        for s in symbols:
+            expected = None if s.replace(".P", "") in excluded else baseline_score(cvd[s], rsi.get(s, 50), *context[s], drag_mode)
+            if s in candidates:
+                got = finalize_score(candidates[s], *context[s])
+                assert got == expected
+            else:
+                # Pruned symbols can never have reached the signal threshold
+                assert expected is None or expected < SIGNAL_THRESHOLD
+
+
+def test_candidates_are_ordered_by_partial_score():
+    scorer = SignalScorer()
+    scorer.set_universe(["AUSDT.P", "BUSDT.P", "CUSDT.P"])
+    cvd = {"AUSDT.P": 120_000.0, "BUSDT.P": 300_000.0, "CUSDT.P": -200_000.0}
+    scorer.load_features(lambda s: cvd[s], {"AUSDT.P": 30.0, "BUSDT.P": 40.0, "CUSDT.P": 70.0})
+    ranked = [c["symbol"] for c in scorer.score(False)]
+    partial = {c["symbol"]: c["partial_score"] for c in scorer.score(False)}
+    assert ranked == sorted(partial, key=lambda s: -partial[s])
+    assert scorer.last_scan_stats["universe"] == 3
+
+
+def test_update_rows_matches_a_full_reload():
+    rng = random.Random(4)
+    symbols = [f"S{i}USDT.P" for i in range(50)]
+    cvd = {s: rng.uniform(-300_000, 300_000) for s in symbols}
+    rsi = {s: rng.uniform(10, 90) for s in symbols}
+    scorer = SignalScorer()
+    scorer.set_universe(symbols)
+    scorer.load_features(lambda s: cvd[s], rsi)
+    for s in rng.sample(symbols, 5):
+        cvd[s] = rng.uniform(-300_000, 300_000)
+    rows = [scorer.norm_index[s.replace(".P", "")] for s in symbols]
+    scorer.update_rows(rows, lambda s: cvd[s], rsi)
+    reference = SignalScorer()
+    reference.set_universe(symbols)
+    reference.load_features(lambda s: cvd[s], rsi)
+    assert scorer.score(False) == reference.score(False)
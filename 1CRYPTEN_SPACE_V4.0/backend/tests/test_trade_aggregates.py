@@ -0,0 +1,103 @@
+import asyncio
+import time
+import types
+
+import pytest
+from firebase_admin import firestore
+
+from services.firebase_service import firebase_service
+from services.trade_aggregates import TradeAggregates
+from services.trade_store import trade_store
+
+
+def _merge(target: dict, update: dict):
+    for key, value in update.items():
+        if isinstance(value, dict):
+            _merge(target.setdefault(key, {}), value)
+        elif isinstance(value, firestore.Increment):
+            target[key] = target.get(key, 0) + value.value
+        else:
+            target[key] = value
+
+
+class FakeFirestore:
+    """trade_history + vault_management/trade_aggregates with slow reads."""
+
+    def __init__(self, aggregates=None, read_delay=0.05):
+        self.history = []
+        self.aggregates = aggregates
+        self.read_delay = read_delay
+
+    def collection(self, name):
+        return types.SimpleNamespace(
+            add=self._add,
+            stream=lambda: [types.SimpleNamespace(to_dict=lambda t=t: dict(t)) for t in self.history],
+            document=lambda _doc_id: types.SimpleNamespace(get=self._get, set=self._set),
+        )
+
+    def _add(self, trade):
+        self.history.append(dict(trade))
+        return None, types.SimpleNamespace(id=f"doc{len(self.history)}")
+
+    def _get(self):
+        snapshot = None if self.aggregates is None else dict(self.aggregates)
+        time.sleep(self.read_delay)  # Trades keep closing while the read is in flight
+        return types.SimpleNamespace(exists=snapshot is not None, to_dict=lambda: snapshot)
+
+    def _set(self, data, merge=False):
+        if not merge or self.aggregates is None:
+            self.aggregates = {} if merge else dict(data)
+        if merge:
+            _merge(self.aggregates, data)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeFirestore()
+    monkeypatch.setattr(firebase_service, "is_active", True)
+    monkeypatch.setattr(firebase_service, "db", db)
+
+    async def no_mirror(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(trade_store, "append", no_mirror)
+    monkeypatch.setattr(trade_store, "initialize", no_mirror)
+    monkeypatch.setattr(trade_store, "_conn", None)
+    return db
+
+
+def test_trades_closed_during_a_rebuild_are_counted_once(fake_db, monkeypatch):
+    import services.trade_aggregates as module
+    aggregates = TradeAggregates()
+    monkeypatch.setattr(module, "trade_aggregates", aggregates)
+    fake_db.history = [{"symbol": "SOLUSDT", "pnl": 1.0}]
+
+    async def scenario():
+        load = asyncio.create_task(aggregates.load())  # No document yet: rebuilds from history
+        await asyncio.sleep(0)
+        await asyncio.gather(*(firebase_service.log_trade({"symbol": "XRPUSDT", "pnl": -0.5}) for _ in range(3)))
+        await load
+
+    asyncio.run(scenario())
+    assert aggregates.total_trades == 4
+    assert aggregates.total_pnl == pytest.approx(-0.5)
+    assert fake_db.aggregates["total_trades"] == 4
+
+
+def test_trades_closed_during_a_load_are_counted_once(fake_db, monkeypatch):
+    import services.trade_aggregates as module
+    aggregates = TradeAggregates()
+    monkeypatch.setattr(module, "trade_aggregates", aggregates)
+    fake_db.aggregates = {"total_pnl": 10.0, "total_trades": 5, "wins": 3, "losses": 2, "symbols": {}}
+
+    async def scenario():
+        load = asyncio.create_task(aggregates.load())
+        await asyncio.sleep(0)
+        await firebase_service.log_trade({"symbol": "SOLUSDT", "pnl": 2.0})
+        await load
+        await firebase_service.log_trade({"symbol": "SOLUSDT", "pnl": -1.0})
+
+    asyncio.run(scenario())
+    assert (aggregates.total_trades, aggregates.wins, aggregates.losses) == (7, 4, 3)
+    assert aggregates.total_pnl == pytest.approx(11.0)
+    assert aggregates.symbols["SOLUSDT"] == {"trades": 2, "wins": 1, "pnl": pytest.approx(1.0)}
@@ -0,0 +1,82 @@
+import asyncio
+import types
+
+import pytest
+
+from services.firebase_service import firebase_service
+from services.trade_store import TradeStore, reset_local_store
+
+
+class FakeTradeHistory:
+    """In-memory stand-in for the Firestore trade_history collection."""
+
+    def __init__(self, docs):
+        self.docs = dict(docs)
+
+    def collection(self, name):
+        assert name == "trade_history"
+        return self
+
+    def stream(self):
+        return [types.SimpleNamespace(id=k, to_dict=lambda v=v: dict(v)) for k, v in self.docs.items()]
+
+    def document(self, doc_id):
+        return types.SimpleNamespace(get=lambda: types.SimpleNamespace(exists=doc_id in self.docs))
+
+
+def trade(symbol, pnl, ts):
+    return {"symbol": symbol, "pnl": pnl, "timestamp": ts, "slot_type": "SNIPER"}
+
+
+@pytest.fixture
+def firestore(monkeypatch):
+    history = FakeTradeHistory({
+        "a": trade("SOLUSDT", 2.0, "2026-01-01T10:00:00+00:00"),
+        "b": trade("XRPUSDT", -1.0, "2026-01-01T11:00:00+00:00"),
+    })
+    monkeypatch.setattr(firebase_service, "is_active", True)
+    monkeypatch.setattr(firebase_service, "db", history)
+    return history
+
+
+def open_store(path):
+    store = TradeStore(str(path))
+    asyncio.run(store.initialize())
+    return store
+
+
+def test_backfill_runs_once(tmp_path, firestore):
+    store = open_store(tmp_path / "trades.db")
+    assert store.ready
+    assert asyncio.run(store.total_pnl()) == pytest.approx(1.0)
+    store._conn.close()
+
+    firestore.docs["c"] = trade("SOLUSDT", 5.0, "2026-01-01T12:00:00+00:00")  # Logged while offline
+    store = open_store(tmp_path / "trades.db")
+    assert asyncio.run(store.total_pnl()) == pytest.approx(1.0)  # Newest mirrored doc still exists: no re-copy
+
+
+def test_history_reset_in_firestore_is_detected_at_startup(tmp_path, firestore):
+    store = open_store(tmp_path / "trades.db")
+    store._conn.close()
+
+    firestore.docs.clear()  # clear_all_history / force_clear_all
+    firestore.docs["new"] = trade("ETHUSDT", 3.0, "2026-02-01T09:00:00+00:00")
+    store = open_store(tmp_path / "trades.db")
+    assert store.ready
+    assert asyncio.run(store.total_pnl()) == pytest.approx(3.0)
+    assert [s["symbol"] for s in asyncio.run(store.symbol_stats())] == ["ETHUSDT"]
+
+
+def test_reset_local_store_clears_trades_and_flag(tmp_path, firestore):
+    path = tmp_path / "trades.db"
+    store = open_store(path)
+    asyncio.run(store.append(trade("BNBUSDT", 1.5, "2026-01-02T00:00:00+00:00")))  # Firestore write failed: no doc id
+    store._conn.close()
+
+    assert reset_local_store(str(path)) == 3
+    firestore.docs.clear()
+    store = open_store(path)
+    assert store.ready
+    assert asyncio.run(store.total_pnl()) == 0.0
+    assert reset_local_store(str(tmp_path / "missing.db")) == 0
@@ -0,0 +1,82 @@
+import asyncio
+import random
+import sys
+from types import SimpleNamespace
+
+from services.execution_protocol import ExecutionProtocol
+from services.trigger_book import TriggerBook
+
+
+def brute_crossed(levels, symbol, price):
+    return {key for key, (sym, down, up) in levels.items()
+            if sym == symbol and ((up is not None and price >= up) or (down is not None and price <= down))}
+
+
+def test_crossed_matches_brute_force():
+    rng = random.Random(25)
+    book, levels = TriggerBook(), {}
+    for step in range(2000):
+        key = ("captain", rng.randrange(40))
+        symbol = rng.choice(["SOLUSDT", "XRPUSDT"])
+        action = rng.random()
+        if action < 0.5:
+            down = rng.choice([None, round(rng.uniform(90, 100), 1)])
+            up = rng.choice([None, round(rng.uniform(100, 110), 1)])
+            book.arm(key, symbol, down, up)
+            levels[key] = (symbol, down, up)
+        elif action < 0.7:
+            book.disarm(key)
+            levels.pop(key, None)
+        else:
+            price = round(rng.uniform(88, 112), 1)
+            assert book.crossed(symbol + ".P", price) == brute_crossed(levels, symbol, price)
+
+
+def test_prune_only_touches_its_namespace():
+    book = TriggerBook()
+    for namespace in ("captain", "guardian"):
+        for slot_id in (1, 2):
+            book.arm((namespace, slot_id), "SOLUSDT", 95.0, 105.0)
+    book.prune("guardian", {("guardian", 2)})
+    assert book.crossed("SOLUSDT", 106.0) == {("captain", 1), ("captain", 2), ("guardian", 2)}
+
+
+def test_state_change_forces_an_evaluation():
+    book = TriggerBook()
+    slot = {"symbol": "SOLUSDT", "side": "Buy", "entry_price": 100.0, "current_stop": 99.0}
+    key = ("guardian", 1)
+    book.arm(key, "SOLUSDT", 99.0, 100.6, sig=book.signature(slot))
+    assert not book.should_evaluate(key, slot, set())
+    assert book.should_evaluate(key, {**slot, "current_stop": 100.0}, set())  # Stop moved elsewhere
+    assert book.should_evaluate(key, slot, {key})
+
+
+def test_skipped_prices_never_hide_a_protocol_action(monkeypatch):
+    async def get_instrument_info(symbol):
+        return {"priceFilter": {"tickSize": "0.01"}}
+
+    monkeypatch.setitem(sys.modules, "services.bybit_rest",
+                        SimpleNamespace(bybit_rest_service=SimpleNamespace(get_instrument_info=get_instrument_info)))
+    protocol = ExecutionProtocol()
+
+    async def gas_favorable(symbol, side):
+        return True
+
+    monkeypatch.setattr(protocol, "_check_gas_favorable", gas_favorable)
+    monkeypatch.setattr("services.execution_protocol.execution_protocol", protocol)
+    rng = random.Random(7)
+
+    async def scenario():
+        for side in ("Buy", "Sell"):
+            for stop in (0, 99.0, 100.0, 101.6, 103.0, 101.0, 97.0):
+                slot = {"symbol": "SOLUSDT", "side": side, "entry_price": 100.0, "current_stop": stop}
+                await protocol.prepare_ladder("SOLUSDT", side, 100.0)
+                book = TriggerBook()
+                assert book.arm_position(("guardian", 1), slot)
+                for _ in range(300):
+                    price = round(rng.uniform(97.5, 104.5), 2)
+                    result = await protocol.process_sniper_logic(slot, price, 0.0)
+                    if result != (False, None, None):
+                        assert ("guardian", 1) in book.crossed("SOLUSDT", price), (side, stop, price, result)
+
+    asyncio.run(scenario())